@@ -1 +1,92 @@
 # Commands module for StewardPro
+
+import json
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("stewardpro-generate-data")
+@click.option("--seed", default=42, type=int, help="Random seed, the same seed produces the same data")
+@click.option("--members", default=2000, type=int, help="Number of members to create")
+@click.option("--years", default=3, type=int, help="Years of weekly contributions, ending today")
+@click.option("--clear", is_flag=True, default=False, help="Remove previously generated data instead")
+@pass_context
+def generate_data(context, seed, members, years, clear):
+	"""Generate seeded synthetic StewardPro data for benchmarking"""
+	import frappe
+
+	from stewardpro.stewardpro.utils.synthetic_data import clear_synthetic_data, generate
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		if clear:
+			clear_synthetic_data()
+			click.echo("Synthetic data removed")
+			return
+
+		for doctype, count in generate(seed=seed, members=members, years=years).items():
+			click.echo(f"{doctype}: {count}")
+	finally:
+		frappe.destroy()
+
+
+@click.command("stewardpro-benchmark")
+@click.option("--iterations", default=5, type=int, help="Samples per case")
+@click.option("--group", "groups", multiple=True, type=click.Choice(["report", "api", "sms", "money"]), help="Only run these groups")
+@click.option("--transport", default="http", type=click.Choice(["http", "inprocess"]), help="How the provider simulator is reached")
+@click.option("--sms-latency", default=0.0, type=float, help="Seconds the provider simulator waits before answering")
+@click.option("--provider-jitter", default=0.0, type=float, help="Up to this many more seconds of random latency")
+@click.option("--provider-error-rate", default=0.0, type=float, help="Share of provider requests answered with HTTP 503")
+@click.option("--sms-balance", default=None, type=float, help="SMS balance in TZS before the simulator reports insufficient balance")
+@click.option("--sms-rate", default=None, type=int, help="SMS Messages per Second to use instead of the configured one")
+@click.option("--delivery-reports", is_flag=True, default=False, help="Queue a delivery report for every message (in-process transport only)")
+@click.option("--seed", default=None, type=int, help="Random seed of the provider simulator")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print results as JSON")
+@pass_context
+def benchmark(
+	context,
+	iterations,
+	groups,
+	transport,
+	sms_latency,
+	provider_jitter,
+	provider_error_rate,
+	sms_balance,
+	sms_rate,
+	delivery_reports,
+	seed,
+	as_json,
+):
+	"""Time StewardPro reports, APIs and bulk SMS and payment paths with query counts and p50/p95 latency"""
+	import frappe
+
+	from stewardpro.stewardpro.api.sms_delivery import queue_delivery_reports
+	from stewardpro.stewardpro.utils.benchmark import format_results, run
+
+	if delivery_reports and transport != "inprocess":
+		raise click.UsageError("--delivery-reports needs --transport inprocess")
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		frappe.set_user("Administrator")
+		results = run(
+			iterations=iterations,
+			groups=groups,
+			sms_latency=sms_latency,
+			transport=transport,
+			sms_rate=sms_rate,
+			jitter=provider_jitter,
+			error_rate=provider_error_rate,
+			balance=sms_balance,
+			delivery_url=queue_delivery_reports if delivery_reports else None,
+			seed=seed,
+		)
+		click.echo(json.dumps(results, indent=1, default=str) if as_json else format_results(results))
+	finally:
+		frappe.destroy()
+
+
+commands = [generate_data, benchmark]
@@ -26,7 +26,11 @@ add_to_apps_screen = [
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/stewardpro/css/stewardpro.css"
-app_include_js = "/assets/stewardpro/js/chart_utils.js"
+app_include_js = [
+	"/assets/stewardpro/js/chart_utils.js",
+	"/assets/stewardpro/js/document_profiler.js",
+	"/assets/stewardpro/js/item_catalog.js"
+]
 
 # include js, css files in header of web template
 # web_include_css = "/assets/stewardpro/css/stewardpro.css"
@@ -46,7 +50,8 @@ app_include_js = "/assets/stewardpro/js/chart_utils.js"
 # doctype_js = {"doctype" : "public/js/doctype.js"}
 doctype_list_js = {
 	"Member" : "stewardpro/stewardpro/doctype/member/member_list.js",
-	"Tithes and Offerings" : "stewardpro/stewardpro/doctype/tithes_and_offerings/tithes_and_offerings_list.js"
+	"Tithes and Offerings" : "stewardpro/stewardpro/doctype/tithes_and_offerings/tithes_and_offerings_list.js",
+	"Department Expense" : "stewardpro/stewardpro/doctype/department_expense/department_expense_list.js"
 }
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
@@ -161,6 +166,14 @@ doc_events = {
 		"after_insert": "stewardpro.stewardpro.doctype.treasury_budget.sync.handle_department_budget_change",
 		"on_update": "stewardpro.stewardpro.doctype.treasury_budget.sync.handle_department_budget_change",
 		"on_trash": "stewardpro.stewardpro.doctype.treasury_budget.sync.handle_department_budget_delete"
+	},
+	"Tithes and Offerings": {
+		"on_submit": "stewardpro.stewardpro.doctype.member.contribution_profile.handle_contribution_submit",
+		"on_cancel": "stewardpro.stewardpro.doctype.member.contribution_profile.handle_contribution_cancel"
+	},
+	"Member": {
+		"on_trash": "stewardpro.stewardpro.doctype.member.contribution_profile.clear_member_profile",
+		"after_rename": "stewardpro.stewardpro.doctype.member.contribution_profile.clear_member_profile"
 	}
 }
 # 	"*": {
@@ -178,7 +191,10 @@ scheduler_events = {
 		"stewardpro.stewardpro.doctype.fiscal_year.fiscal_year.auto_create_fiscal_year"
 	],
 	"cron": {
-		"0 0 * * 6": "stewardpro.stewardpro.tasks.send_weekly_sms_notification"
+		"0 0 * * 6": "stewardpro.stewardpro.tasks.send_weekly_sms_notification",
+		"0 20 * * *": "stewardpro.stewardpro.tasks.send_receipt_sms_digest",
+		"* * * * *": "stewardpro.stewardpro.api.sms_delivery.process_delivery_reports",
+		"*/5 * * * *": "stewardpro.stewardpro.api.sms_campaign.resume_deferred_messages"
 	}
 }
 
@@ -212,8 +228,8 @@ scheduler_events = {
 
 # Request Events
 # ----------------
-# before_request = ["stewardpro.utils.before_request"]
-# after_request = ["stewardpro.utils.after_request"]
+before_request = ["stewardpro.stewardpro.utils.instrumentation.before_request"]
+after_request = ["stewardpro.stewardpro.utils.instrumentation.after_request"]
 
 # Job Events
 # ----------
@@ -0,0 +1,43 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Sum
+
+from stewardpro.stewardpro.doctype.department_budget.budget_control import (
+	COMMITTED_STATUSES,
+	increment_budget_amounts,
+)
+
+
+def execute():
+	"""Compute committed amounts for Pending Approval and Approved draft expenses"""
+	BudgetItem = DocType("Department Budget Item")
+	DepartmentBudget = DocType("Department Budget")
+	Expense = DocType("Department Expense")
+	ExpenseDetail = DocType("Department Expense Detail")
+
+	frappe.qb.update(BudgetItem).set(BudgetItem.committed_amount, 0).run()
+	frappe.qb.update(DepartmentBudget).set(DepartmentBudget.committed_amount, 0).run()
+
+	rows = (
+		frappe.qb.from_(ExpenseDetail)
+		.inner_join(Expense)
+		.on(Expense.name == ExpenseDetail.parent)
+		.select(Expense.budget_reference, ExpenseDetail.item, Sum(ExpenseDetail.amount))
+		.where(ExpenseDetail.parenttype == "Department Expense")
+		.where(Expense.docstatus == 0)
+		.where(Expense.status.isin(COMMITTED_STATUSES))
+		.where(Expense.budget_reference.isnotnull())
+		.where(ExpenseDetail.item.isnotnull())
+		.groupby(Expense.budget_reference, ExpenseDetail.item)
+	).run()
+
+	commitments = {}
+	for budget, item, amount in rows:
+		if budget and item:
+			commitments.setdefault(budget, {})[item] = amount
+
+	for budget, item_amounts in commitments.items():
+		increment_budget_amounts(budget, item_amounts, "committed_amount")
@@ -0,0 +1,9 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+from stewardpro.stewardpro.utils.phone_numbers import update_member_normalized_contacts
+
+
+def execute():
+	"""Fill the E.164 phone number of existing Members"""
+	update_member_normalized_contacts()
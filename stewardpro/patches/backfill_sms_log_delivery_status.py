@@ -0,0 +1,21 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import Case, DocType
+
+
+def execute():
+	"""Derive the Delivery Status of existing SMS Logs from their free-text status"""
+	SMSLog = DocType("SMS Log")
+
+	(
+		frappe.qb.update(SMSLog)
+		.set(
+			SMSLog.delivery_status,
+			Case()
+			.when(SMSLog.status == "Success", "Sent")
+			.when(SMSLog.status.like("Failed%"), "Failed")
+			.else_("Unknown"),
+		)
+	).run()
@@ -0,0 +1,20 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.utils import today
+
+
+def execute():
+	"""Flag contributions dated before today as receipted, so the first receipt digest
+	does not text members about their whole giving history"""
+	TithesOfferings = DocType("Tithes and Offerings")
+
+	(
+		frappe.qb.update(TithesOfferings)
+		.set(TithesOfferings.receipt_sms_sent, 1)
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.receipt_sms_sent == 0)
+		.where(TithesOfferings.date < today())
+	).run()
@@ -0,0 +1,85 @@
+// Copyright (c) 2024, StewardPro Team and contributors
+// For license information, please see license.txt
+
+/**
+ * StewardPro Document Profiler
+ * Adds a "Profile Save" button that traces a rolled back save/submit and
+ * downloads the trace as JSON or folded stacks (flame graph input)
+ */
+
+frappe.provide('stewardpro.profiler');
+
+stewardpro.profiler = {
+	add_button: function(frm) {
+		if (frm.is_new() || !frappe.user.has_role('System Manager')) {
+			return;
+		}
+
+		frm.add_custom_button(__('Profile Save'), function() {
+			stewardpro.profiler.prompt(frm);
+		}, __('Diagnostics'));
+	},
+
+	prompt: function(frm) {
+		let actions = frm.doc.docstatus === 0 ? ['save', 'submit'] : ['cancel'];
+
+		frappe.prompt([
+			{
+				fieldname: 'action',
+				fieldtype: 'Select',
+				label: __('Action'),
+				options: actions,
+				default: actions[0]
+			},
+			{
+				fieldname: 'format',
+				fieldtype: 'Select',
+				label: __('Format'),
+				options: [
+					{ value: 'json', label: __('JSON trace') },
+					{ value: 'folded', label: __('Flame graph (folded stacks)') }
+				],
+				default: 'json'
+			}
+		], function(values) {
+			frappe.call({
+				method: 'stewardpro.stewardpro.api.profiler.profile_document_save',
+				args: {
+					doctype: frm.doc.doctype,
+					doc: frm.is_dirty() ? frm.doc : null,
+					name: frm.doc.name,
+					action: values.action,
+					format: values.format
+				},
+				freeze: true,
+				freeze_message: __('Profiling...'),
+				callback: function(r) {
+					if (r.message === undefined) {
+						return;
+					}
+
+					let is_json = values.format === 'json';
+					let content = is_json ? JSON.stringify(r.message, null, 1) : r.message;
+					let filename = `${frappe.scrub(frm.doc.doctype)}-${frm.doc.name}-${values.action}.${is_json ? 'json' : 'folded'}`;
+					stewardpro.profiler.download(filename, content);
+
+					if (is_json) {
+						frappe.show_alert({
+							message: __('{0} queries in {1} ms', [r.message.queries, r.message.elapsed_ms.toFixed(1)]),
+							indicator: r.message.error ? 'orange' : 'green'
+						});
+					}
+				}
+			});
+		}, __('Profile Document Save'), __('Profile'));
+	},
+
+	download: function(filename, content) {
+		let blob = new Blob([content], { type: 'text/plain' });
+		let link = document.createElement('a');
+		link.href = URL.createObjectURL(blob);
+		link.download = filename;
+		link.click();
+		URL.revokeObjectURL(link.href);
+	}
+};
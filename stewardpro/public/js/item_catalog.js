@@ -0,0 +1,79 @@
+// Copyright (c) 2024, StewardPro Team and contributors
+// For license information, please see license.txt
+
+/**
+ * StewardPro Item Catalog
+ * Keeps a versioned copy of the active items per department in the browser and
+ * only asks the server for what changed since the cached version
+ */
+
+frappe.provide('stewardpro.item_catalog');
+
+stewardpro.item_catalog = {
+	storage_key: 'stewardpro_item_catalog',
+	catalogs: null,
+
+	get: function(department) {
+		let key = department || '__all__';
+		let cached = this.load()[key];
+
+		return frappe.xcall('stewardpro.stewardpro.doctype.item.catalog.get_item_catalog', {
+			department: department || null,
+			version: cached ? cached.version : null
+		}).then((r) => {
+			let items;
+			if (r.status === 'not_modified') {
+				items = cached.items;
+			} else if (r.status === 'delta') {
+				items = this.merge(cached.items, r.items, r.removed);
+			} else {
+				items = r.items;
+			}
+
+			this.store(key, { version: r.version, items: items });
+			return items;
+		});
+	},
+
+	find: function(department, item_code) {
+		return this.get(department).then((items) => {
+			let item = items.find((item) => item.name === item_code);
+			if (item) {
+				return item;
+			}
+			// Inactive items (or items of another department) are not in the catalog
+			return frappe.db.get_value('Item', item_code,
+				['name', 'item_name', 'department', 'standard_cost', 'unit_of_measure', 'description']
+			).then((r) => r.message);
+		});
+	},
+
+	merge: function(items, changed, removed) {
+		let by_name = {};
+		items.forEach((item) => { by_name[item.name] = item; });
+		removed.forEach((name) => { delete by_name[name]; });
+		changed.forEach((item) => { by_name[item.name] = item; });
+
+		return Object.values(by_name).sort((a, b) => (a.item_name || '').localeCompare(b.item_name || ''));
+	},
+
+	load: function() {
+		if (!this.catalogs) {
+			try {
+				this.catalogs = JSON.parse(localStorage.getItem(this.storage_key)) || {};
+			} catch (e) {
+				this.catalogs = {};
+			}
+		}
+		return this.catalogs;
+	},
+
+	store: function(key, catalog) {
+		this.load()[key] = catalog;
+		try {
+			localStorage.setItem(this.storage_key, JSON.stringify(this.catalogs));
+		} catch (e) {
+			// Storage full or disabled; the in-memory copy still saves round trips
+		}
+	}
+};
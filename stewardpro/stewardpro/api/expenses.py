@@ -0,0 +1,213 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Bulk approval and submission of Department Expenses.
+
+The selected expenses are processed in one background job: item departments are
+fetched with one query for all of them. The expenses are then handled in chunks of
+``BULK_CHUNK_SIZE``, each in its own transaction: the chunk's budgets are locked and
+read once, the budget check is done per budget over the chunk, and the resulting
+committed / spent changes are applied once per budget before the commit instead of
+once per expense. Every expense is saved in its own savepoint, so one failing
+validation does not undo the others.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, fmt_money, today
+
+from stewardpro.stewardpro.doctype.department_budget.budget_control import (
+	apply_budget_deltas,
+	get_budget_availability,
+	get_commitment_deltas,
+	get_expense_commitment,
+	get_item_amounts,
+	is_enforced,
+)
+from stewardpro.stewardpro.doctype.department_expense.department_expense import (
+	clear_budget_caches_after_commit,
+)
+from stewardpro.stewardpro.doctype.item.item import get_item_departments
+
+BULK_ACTIONS = ("approve", "submit")
+MAX_BULK_EXPENSES = 500
+# Expenses saved per transaction; their budgets stay locked only that long
+BULK_CHUNK_SIZE = 20
+
+
+@frappe.whitelist()
+def bulk_process_expenses(names, action="approve", approved_by=None):
+	"""Queue approval or submission of the selected draft Department Expenses"""
+	if isinstance(names, str):
+		names = frappe.parse_json(names)
+	names = list(dict.fromkeys(names or []))
+
+	if action not in BULK_ACTIONS:
+		frappe.throw(_("Invalid bulk action: {0}").format(action))
+	if not names:
+		frappe.throw(_("Select at least one expense"))
+	if len(names) > MAX_BULK_EXPENSES:
+		frappe.throw(_("Select at most {0} expenses at a time").format(MAX_BULK_EXPENSES))
+	if action == "approve" and not approved_by:
+		frappe.throw(_("Approved By is required to approve expenses"))
+
+	frappe.has_permission("Department Expense", "submit" if action == "submit" else "write", throw=True)
+
+	job = frappe.enqueue(
+		process_expenses,
+		names=names,
+		action=action,
+		approved_by=approved_by,
+		user=frappe.session.user,
+		queue="long",
+		timeout=1800,
+	)
+
+	return {"queued": True, "job_id": getattr(job, "id", None), "count": len(names)}
+
+
+def process_expenses(names, action, approved_by=None, user=None):
+	"""Background job: approve or submit expenses and apply budget changes per budget"""
+	expenses = [frappe.get_doc("Department Expense", name) for name in names]
+	results = {name: None for name in names}
+
+	eligible = []
+	for expense in expenses:
+		error = get_ineligibility(expense, action)
+		if error:
+			results[expense.name] = {"name": expense.name, "status": "skipped", "message": error}
+		else:
+			eligible.append(expense)
+
+	item_departments = get_item_departments(
+		[row.item for expense in eligible for row in expense.expense_details]
+	)
+
+	for start in range(0, len(eligible), BULK_CHUNK_SIZE):
+		process_chunk(eligible[start : start + BULK_CHUNK_SIZE], action, approved_by, item_departments, results)
+		# Releases the budget locks, so interactive submits against these budgets only
+		# ever wait for one chunk
+		frappe.db.commit()
+
+		done = min(start + BULK_CHUNK_SIZE, len(eligible))
+		frappe.publish_progress(
+			done * 100 / len(eligible),
+			title=_("Processing Expenses"),
+			description=_("{0} of {1}").format(done, len(eligible)),
+		)
+
+	summary = {
+		"action": action,
+		"results": [results[name] for name in names],
+		"success": sum(1 for result in results.values() if result["status"] == "success"),
+	}
+	frappe.publish_realtime("expense_bulk_action_done", summary, user=user or frappe.session.user)
+	return summary
+
+
+def process_chunk(expenses, action, approved_by, item_departments, results):
+	"""Check, save and apply the budget changes of one chunk of expenses in one transaction"""
+	budgets = {}
+	for budget_name in sorted({expense.budget_reference for expense in expenses if expense.budget_reference}):
+		# Locked until the chunk is committed, in name order like every other budget update
+		budget = get_budget_availability(budget_name, for_update=True)
+		if budget:
+			budgets[budget_name] = budget
+
+	accepted, budget_messages = check_budgets(expenses, budgets, action)
+	for expense in expenses:
+		if expense not in accepted:
+			results[expense.name] = {"name": expense.name, "status": "failed", "message": budget_messages[expense.name]}
+
+	committed, spent = {}, {}
+	for expense in accepted:
+		expense.flags.preloaded_item_departments = item_departments
+		expense.flags.preloaded_budgets = budgets
+		expense.flags.in_bulk_budget_update = True
+		# Copied, not referenced: saving recalculates the amounts on the same row objects
+		previous = frappe._dict(
+			docstatus=expense.docstatus,
+			status=expense.status,
+			budget_reference=expense.budget_reference,
+			expense_details=[frappe._dict(item=row.item, amount=row.amount) for row in expense.expense_details],
+		)
+
+		frappe.db.savepoint("bulk_expense")
+		try:
+			if action == "approve":
+				expense.status = "Approved"
+				expense.approved_by = approved_by
+				expense.approval_date = today()
+				expense.save()
+			else:
+				expense.submit()
+		except Exception as e:
+			frappe.db.rollback(save_point="bulk_expense")
+			frappe.clear_messages()
+			results[expense.name] = {"name": expense.name, "status": "failed", "message": str(e)}
+		else:
+			get_commitment_deltas(expense, previous, committed)
+			if action == "submit" and expense.budget_reference:
+				items = spent.setdefault(expense.budget_reference, {})
+				for item, amount in get_item_amounts(expense).items():
+					items[item] = items.get(item, 0) + amount
+
+			results[expense.name] = {
+				"name": expense.name,
+				"status": "success",
+				"message": budget_messages.get(expense.name),
+			}
+
+	apply_budget_deltas(committed, "committed_amount")
+	apply_budget_deltas(spent, "spent_amount")
+	clear_budget_caches_after_commit(*budgets)
+
+
+def get_ineligibility(expense, action):
+	"""Why ``expense`` cannot take part in the bulk action, or None"""
+	if expense.docstatus != 0:
+		return _("Only draft expenses can be processed")
+	if action == "approve" and expense.status == "Approved":
+		return _("Already approved")
+	if expense.status == "Rejected":
+		return _("Rejected expenses cannot be processed")
+	return None
+
+
+def check_budgets(expenses, budgets, action):
+	"""Check the selection per budget; returns (accepted expenses, {name: message})
+
+	Submitted expenses release their own commitment, so it counts as available to
+	them. With budget limits enforced, submissions are accepted in selection order
+	until the budget runs out; approvals and unenforced submissions only get a
+	warning.
+	"""
+	enforce = action == "submit" and is_enforced()
+	available = {name: flt(budget.available_amount) for name, budget in budgets.items()}
+	accepted, messages = [], {}
+
+	for expense in expenses:
+		budget_name = expense.budget_reference
+		if budget_name not in available:
+			accepted.append(expense)
+			continue
+
+		held = sum(get_expense_commitment(expense).values())
+		needed = flt(expense.total_amount) if action == "submit" else flt(expense.total_amount) - held
+		if action == "submit":
+			available[budget_name] += held
+
+		if needed > available[budget_name]:
+			message = _("This expense ({0}) exceeds the remaining budget ({1}) of {2}").format(
+				fmt_money(expense.total_amount), fmt_money(available[budget_name]), budget_name
+			)
+			messages[expense.name] = message
+			if enforce:
+				# Give back what it would have released; it stays a draft
+				available[budget_name] -= held
+				continue
+
+		available[budget_name] -= needed
+		accepted.append(expense)
+
+	return accepted, messages
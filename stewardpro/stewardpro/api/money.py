@@ -2,10 +2,12 @@
 # For license information, please see license.txt
 
 import frappe
-import requests
 import json
 from frappe import _
 
+from stewardpro.stewardpro.api.sms import get_test_phone
+from stewardpro.stewardpro.utils.provider_simulator import get_provider_session
+
 
 def get_mobile_money_settings():
 	"""Get Mobile Money settings from StewardPro Settings"""
@@ -33,6 +35,7 @@ class MobileMoneyAPI:
 		self.api_key = settings.money_api_key
 		self.public_key = settings.money_public_key
 		self.base_url = settings.mobile_money_base_url
+		self.session = get_provider_session(self.base_url)
 
 	def send_payment_request(self, phone_number, amount, description=""):
 		"""Send payment request via Mobile Money"""
@@ -49,7 +52,7 @@ class MobileMoneyAPI:
 				"Content-Type": "application/json"
 			}
 
-			response = requests.post(
+			response = self.session.post(
 				self.base_url,
 				headers=headers,
 				data=json.dumps(payload),
@@ -74,7 +77,7 @@ def test_mobile_money_connection(**kwargs):
 	"""Test Mobile Money API connection"""
 	try:
 		mobile_money_api = MobileMoneyAPI()
-		test_phone = "255786540517"  # Test phone number
+		test_phone = get_test_phone()
 		test_amount = "1000"  # Test amount
 
 		result = mobile_money_api.send_payment_request(test_phone, test_amount, "StewardPro Test")
@@ -0,0 +1,70 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from stewardpro.stewardpro.utils.profiling import DocumentTrace
+
+PROFILE_ACTIONS = ("save", "submit", "cancel")
+PROFILE_FORMATS = ("json", "folded")
+
+
+@frappe.whitelist()
+def profile_document_save(doctype, name=None, doc=None, action="save", format="json"):
+	"""Save, submit or cancel a document inside a rolled back savepoint and return its trace.
+
+	Pass ``doc`` (the unsaved form as JSON) to profile pending changes, or ``name`` to
+	profile re-saving the stored document. Nothing is persisted: the savepoint is
+	rolled back and notifications are muted while the trace runs.
+	"""
+	frappe.only_for("System Manager")
+
+	if action not in PROFILE_ACTIONS:
+		frappe.throw(_("Invalid profile action: {0}").format(action))
+	if format not in PROFILE_FORMATS:
+		frappe.throw(_("Invalid profile format: {0}").format(format))
+
+	if doc:
+		document = frappe.get_doc(frappe.parse_json(doc))
+	elif name:
+		document = frappe.get_doc(doctype, name)
+	else:
+		frappe.throw(_("Either a document name or document data is required"))
+
+	# Each action needs the permission it would need outside the profiler
+	document.check_permission("write" if action == "save" else action)
+
+	savepoint = "stewardpro_profile"
+	mute_messages, mute_sms = frappe.flags.mute_messages, frappe.flags.mute_sms
+	frappe.flags.mute_messages = frappe.flags.mute_sms = True
+
+	frappe.db.savepoint(savepoint)
+	error = None
+	try:
+		with DocumentTrace() as trace:
+			try:
+				if action == "submit":
+					document.submit()
+				elif action == "cancel":
+					document.cancel()
+				else:
+					document.save()
+			except Exception as e:
+				# A failing validation is still worth profiling
+				error = str(e)
+	finally:
+		frappe.db.rollback(save_point=savepoint)
+		frappe.flags.mute_messages, frappe.flags.mute_sms = mute_messages, mute_sms
+		frappe.clear_messages()
+
+	if format == "folded":
+		return trace.folded()
+
+	return {
+		"doctype": doctype,
+		"name": document.name,
+		"action": action,
+		"error": error,
+		**trace.as_dict(),
+	}
@@ -7,6 +7,11 @@ import json
 from frappe import _
 from frappe.utils import nowdate, fmt_money, getdate
 
+from stewardpro.stewardpro.api.sms_templates import RECEIPT_SMS, WELCOME_SMS
+from stewardpro.stewardpro.api.sms_throttle import acquire_send_tokens, get_open_circuit, record_send_result
+from stewardpro.stewardpro.utils.phone_numbers import DEFAULT_COUNTRY_CODE, normalize_phone, normalize_phones
+from stewardpro.stewardpro.utils.provider_simulator import get_provider_session
+
 
 def get_sms_settings():
 	"""Get SMS settings from StewardPro Settings"""
@@ -35,25 +40,38 @@ class SMSAPI:
         self.api_secret = settings.sms_api_secret
         self.sender_id = settings.sms_sender_id
         self.base_url = settings.sms_base_url
+        self.country_code = settings.sms_default_country_code or DEFAULT_COUNTRY_CODE
+        # One keep-alive connection for every message sent through this instance
+        self.session = get_provider_session(self.base_url)
 
     def send_sms(self, recipients, message):
-        """Send SMS using Beem Africa API"""
+        """Send SMS using Beem Africa API
+
+        Sends wait for the shared rate limit. While the circuit breaker is open
+        nothing is sent and the result has ``circuit_open`` set, as it has when
+        this send is the one that opened it.
+        """
+        circuit = get_open_circuit()
+        if circuit:
+            return {"success": False, "error": f"SMS sending paused: {circuit['reason']}", "circuit_open": True}
+
+        result = self.post_sms(recipients, message)
+        if "status_code" in result and record_send_result(result):
+            result["circuit_open"] = True
+        return result
+
+    def post_sms(self, recipients, message):
         try:
             # Ensure recipients is a list
             if isinstance(recipients, str):
                 recipients = [recipients]
 
-            # Clean phone numbers (ensure they start with 255 for Tanzania)
-            clean_recipients = []
-            for phone in recipients:
-                phone = str(phone).strip()
-                if phone.startswith('0'):
-                    phone = '255' + phone[1:]
-                elif phone.startswith('+255'):
-                    phone = phone[1:]
-                elif not phone.startswith('255'):
-                    phone = '255' + phone
-                clean_recipients.append(phone)
+            # E.164 numbers without the "+" the provider expects, each number once
+            clean_recipients = list(dict.fromkeys(
+                number[1:] for number in normalize_phones(recipients, self.country_code) if number
+            ))
+            if not clean_recipients:
+                return {"success": False, "error": "No valid phone number"}
 
             payload = {
                 "api_key": self.api_key,
@@ -67,7 +85,9 @@ class SMSAPI:
                 "Content-Type": "application/json"
             }
 
-            response = requests.post(
+            acquire_send_tokens(len(clean_recipients))
+
+            response = self.session.post(
                 self.base_url,
                 headers=headers,
                 data=json.dumps(payload),
@@ -77,10 +97,16 @@ class SMSAPI:
             if response.status_code == 200:
                 result = response.json()
                 frappe.logger().info(f"SMS sent successfully: {result}")
-                return {"success": True, "response": result}
+                # Delivery reports refer to the request id
+                return {"success": True, "response": result, "message_id": result.get("request_id"), "status_code": 200}
             else:
                 frappe.logger().error(f"SMS failed: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
+                return {"success": False, "error": f"HTTP {response.status_code}: {response.text}", "status_code": response.status_code}
+
+        except requests.RequestException as e:
+            # No answer from the provider counts like a server error
+            frappe.logger().error(f"SMS API Error: {str(e)}")
+            return {"success": False, "error": str(e), "status_code": None}
 
         except Exception as e:
             frappe.logger().error(f"SMS API Error: {str(e)}")
@@ -96,24 +122,14 @@ def send_member_registration_sms(member_name, phone_number, **kwargs):
 
         sms_api = SMSAPI()
 
-        # Create welcome message with length check
-        base_message = "Welcome ! Your membership is registered. We're excited to have you join us. God bless! - Church Admin"
-        if len(f"Welcome {member_name}! Your membership is registered. We're excited to have you join us. God bless! - Church Admin") <= 140:
-            message = f"Welcome {member_name}! Your membership is registered. We're excited to have you join us. God bless! - Church Admin"
-        else:
-            # Use shorter template for long names
-            message = f"Welcome {member_name}! Membership registered. God bless! - Church"
-            # If still too long, truncate name
-            if len(message) > 140:
-                max_name_length = 140 - len("Welcome ! Membership registered. God bless! - Church")
-                truncated_name = member_name[:max_name_length-3] + "..." if len(member_name) > max_name_length else member_name
-                message = f"Welcome {truncated_name}! Membership registered. God bless! - Church"
+        # Fitted into one SMS segment
+        message = WELCOME_SMS.render({"member_name": member_name})
 
         result = sms_api.send_sms([phone_number], message)
 
         if result["success"]:
             # Log the SMS
-            create_sms_log("Member Registration", member_name, phone_number, message, "Success")
+            create_sms_log("Member Registration", member_name, phone_number, message, "Success", result.get("message_id"))
             return {"success": True, "message": "Welcome SMS sent successfully"}
         else:
             create_sms_log("Member Registration", member_name, phone_number, message, f"Failed: {result['error']}")
@@ -133,34 +149,19 @@ def send_tithe_offering_sms(member_name, phone_number, receipt_number, tithe_amo
 
         sms_api = SMSAPI()
 
-        # Format amounts
-        tithe_formatted = fmt_money(tithe_amount) if tithe_amount else "0"
-        offering_formatted = fmt_money(offering_amount) if offering_amount else "0"
-        total_formatted = fmt_money(total_amount)
-
-        # Create receipt message with length check
-        date_str = getdate(date).strftime('%d/%m/%Y')
-        full_message = f"Thank you {member_name}! Receipt #{receipt_number} {date_str} Total: {total_formatted}. God bless! - Church"
-
-        if len(full_message) <= 140:
-            message = full_message
-        else:
-            # Use shorter template
-            short_message = f"Thank you {member_name}! Receipt #{receipt_number} Total: {total_formatted}. God bless!"
-            if len(short_message) <= 140:
-                message = short_message
-            else:
-                # Truncate name if still too long
-                base_length = len(f"Thank you ! Receipt #{receipt_number} Total: {total_formatted}. God bless!")
-                max_name_length = 140 - base_length
-                truncated_name = member_name[:max_name_length-3] + "..." if len(member_name) > max_name_length else member_name
-                message = f"Thank you {truncated_name}! Receipt #{receipt_number} Total: {total_formatted}. God bless!"
+        # Fitted into one SMS segment
+        message = RECEIPT_SMS.render({
+            "member_name": member_name,
+            "receipt_number": receipt_number,
+            "date": getdate(date).strftime('%d/%m/%Y'),
+            "total": fmt_money(total_amount),
+        })
 
         result = sms_api.send_sms([phone_number], message)
 
         if result["success"]:
             # Log the SMS
-            create_sms_log("Tithe & Offering Receipt", member_name, phone_number, message, "Success")
+            create_sms_log("Tithe & Offering Receipt", member_name, phone_number, message, "Success", result.get("message_id"))
             return {"success": True, "message": "Receipt SMS sent successfully"}
         else:
             create_sms_log("Tithe & Offering Receipt", member_name, phone_number, message, f"Failed: {result['error']}")
@@ -171,7 +172,12 @@ def send_tithe_offering_sms(member_name, phone_number, receipt_number, tithe_amo
         return {"success": False, "error": str(e)}
 
 
-def create_sms_log(sms_type, recipient_name, phone_number, message, status):
+def get_delivery_status(status):
+    """Delivery Status of a new SMS Log from the send result status"""
+    return "Sent" if status == "Success" else "Failed"
+
+
+def create_sms_log(sms_type, recipient_name, phone_number, message, status, provider_message_id=None):
     """Create SMS log entry"""
     try:
         # Clean up status message if it's too long or contains complex error details
@@ -188,9 +194,11 @@ def create_sms_log(sms_type, recipient_name, phone_number, message, status):
             "doctype": "SMS Log",
             "sent_on": frappe.utils.now(),
             "sender": sender_id,
-            "receiver": phone_number,
+            "receiver": normalize_phone(phone_number) or phone_number,
             "message": message,
             "status": clean_status,
+            "delivery_status": get_delivery_status(status),
+            "provider_message_id": provider_message_id,
             "custom_sms_type": sms_type,
             "custom_recipient_name": recipient_name
         })
@@ -200,6 +208,32 @@ def create_sms_log(sms_type, recipient_name, phone_number, message, status):
         frappe.logger().error(f"SMS Log creation error: {str(e)}")
 
 
+def insert_sms_logs(sms_type, entries):
+    """Write SMS Log entries for a batch of messages with one insert.
+
+    ``entries`` are dicts with recipient_name, phone (E.164), message, status
+    and provider_message_id.
+    """
+    if not entries:
+        return
+
+    sender_id = frappe.db.get_single_value('StewardPro Settings', 'sms_sender_id') or "StewardPro"
+    now = frappe.utils.now()
+    user = frappe.session.user
+
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus",
+              "sent_on", "sender", "receiver", "message", "status", "delivery_status", "provider_message_id",
+              "custom_sms_type", "custom_recipient_name"]
+    values = [
+        (frappe.generate_hash(length=12), user, now, now, user, 0,
+         now, sender_id, entry["phone"], entry["message"], clean_error_message(entry["status"]),
+         get_delivery_status(entry["status"]), entry.get("provider_message_id"),
+         sms_type, entry.get("recipient_name"))
+        for entry in entries
+    ]
+    frappe.db.bulk_insert("SMS Log", fields, values)
+
+
 def clean_error_message(status):
     """Clean and shorten error messages for SMS log status"""
     if not status or status == "Success":
@@ -281,26 +315,14 @@ def send_bulk_welcome_sms(member_names, **kwargs):
                     })
                     continue
 
-                # Send welcome SMS with length check
-                full_message = f"Welcome {member_doc.full_name}! Your membership is registered. We're excited to have you join us. God bless! - Church Admin"
-                if len(full_message) <= 140:
-                    message = full_message
-                else:
-                    # Use shorter template for long names
-                    short_message = f"Welcome {member_doc.full_name}! Membership registered. God bless! - Church"
-                    if len(short_message) <= 140:
-                        message = short_message
-                    else:
-                        # Truncate name if still too long
-                        max_name_length = 140 - len("Welcome ! Membership registered. God bless! - Church")
-                        truncated_name = member_doc.full_name[:max_name_length-3] + "..." if len(member_doc.full_name) > max_name_length else member_doc.full_name
-                        message = f"Welcome {truncated_name}! Membership registered. God bless! - Church"
+                # Fitted into one SMS segment
+                message = WELCOME_SMS.render({"member_name": member_doc.full_name})
 
                 result = sms_api.send_sms([member_doc.contact], message)
 
                 if result["success"]:
                     # Log the SMS
-                    create_sms_log("Bulk Welcome SMS", member_doc.full_name, member_doc.contact, message, "Success")
+                    create_sms_log("Bulk Welcome SMS", member_doc.full_name, member_doc.contact, message, "Success", result.get("message_id"))
                     results.append({
                         "member": member_name,
                         "success": True,
@@ -376,34 +398,19 @@ def send_bulk_receipt_sms(record_names, **kwargs):
                     })
                     continue
 
-                # Format amounts
-                tithe_formatted = fmt_money(record_doc.tithe_amount) if record_doc.tithe_amount else "0"
-                offering_formatted = fmt_money(record_doc.offering_amount) if record_doc.offering_amount else "0"
-                total_formatted = fmt_money(record_doc.total_amount)
-
-                # Create receipt message with length check
-                date_str = getdate(record_doc.date).strftime('%d/%m/%Y')
-                full_message = f"Thank you {member_doc.full_name}! Receipt #{record_doc.receipt_number} {date_str} Total: {total_formatted}. God bless! - Church"
-
-                if len(full_message) <= 140:
-                    message = full_message
-                else:
-                    # Use shorter template
-                    short_message = f"Thank you {member_doc.full_name}! Receipt #{record_doc.receipt_number} Total: {total_formatted}. God bless!"
-                    if len(short_message) <= 140:
-                        message = short_message
-                    else:
-                        # Truncate name if still too long
-                        base_length = len(f"Thank you ! Receipt #{record_doc.receipt_number} Total: {total_formatted}. God bless!")
-                        max_name_length = 140 - base_length
-                        truncated_name = member_doc.full_name[:max_name_length-3] + "..." if len(member_doc.full_name) > max_name_length else member_doc.full_name
-                        message = f"Thank you {truncated_name}! Receipt #{record_doc.receipt_number} Total: {total_formatted}. God bless!"
+                # Fitted into one SMS segment
+                message = RECEIPT_SMS.render({
+                    "member_name": member_doc.full_name,
+                    "receipt_number": record_doc.receipt_number,
+                    "date": getdate(record_doc.date).strftime('%d/%m/%Y'),
+                    "total": fmt_money(record_doc.total_amount),
+                })
 
                 result = sms_api.send_sms([member_doc.contact], message)
 
                 if result["success"]:
                     # Log the SMS
-                    create_sms_log("Bulk Receipt SMS", member_doc.full_name, member_doc.contact, message, "Success")
+                    create_sms_log("Bulk Receipt SMS", member_doc.full_name, member_doc.contact, message, "Success", result.get("message_id"))
                     results.append({
                         "record": record_name,
                         "success": True,
@@ -442,13 +449,21 @@ def send_bulk_receipt_sms(record_names, **kwargs):
         return {"success": False, "error": str(e)}
 
 
+def get_test_phone():
+    """Test Phone Number of StewardPro Settings, used by the connection tests"""
+    test_phone = frappe.db.get_single_value('StewardPro Settings', 'provider_test_phone')
+    if not test_phone:
+        frappe.throw(_("Set a Test Phone Number in StewardPro Settings first."), title=_("Test Phone Number Missing"))
+    return test_phone
+
+
 @frappe.whitelist()
 def test_sms_connection(**kwargs):
     """Test SMS API connection"""
     try:
         sms_api = SMSAPI()
         test_message = "StewardPro SMS test - connection OK"
-        test_phone = "255786540517"  # Test phone number
+        test_phone = get_test_phone()
 
         result = sms_api.send_sms([test_phone], test_message)
         return result
@@ -0,0 +1,378 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Weekly SMS campaigns.
+
+Each campaign selects its whole audience with one set-based query, renders every
+message in one pass and hands them to ``dispatch_messages`` jobs of
+``DISPATCH_CHUNK_SIZE`` messages. A dispatch job sends identical messages in one
+provider request, paced by the shared SMS rate limit, and writes its SMS Log
+entries with one insert, so a Saturday run for the whole church is spread over
+short jobs that each finish well within the queue timeout. When the provider runs
+out of balance or keeps failing, the rest of a chunk waits in Redis until sending
+resumes.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Count, Max, NullIf, Sum
+from frappe.utils import add_days, cint, flt, fmt_money, formatdate, getdate
+
+from stewardpro.stewardpro.api.sms import SMSAPI, get_sms_settings, insert_sms_logs
+from stewardpro.stewardpro.api.sms_throttle import get_open_circuit
+from stewardpro.stewardpro.api.sms_templates import SMSTemplate, estimate_cost, get_message_info
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import get_fiscal_year
+from stewardpro.stewardpro.utils.phone_numbers import dedupe_recipients, normalize_phones
+
+# Messages per dispatch job
+DISPATCH_CHUNK_SIZE = 500
+
+# Recipients per provider request when several get the same message
+PROVIDER_BATCH_SIZE = 100
+
+DEFERRED_MESSAGES_KEY = "stewardpro:sms_deferred_messages"
+
+
+def get_weekly_givers(on_date):
+	"""Members with submitted contributions in the seven days before ``on_date``
+
+	The job runs early on Saturday, so the week ends with the Friday before and the
+	previous Sabbath, the main giving day, is included.
+	"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	Member = DocType("Member")
+
+	rows = (
+		frappe.qb.from_(TithesOfferings)
+		.inner_join(Member)
+		.on(TithesOfferings.member == Member.name)
+		.select(
+			Member.name.as_("recipient"),
+			Member.full_name.as_("recipient_name"),
+			Member.normalized_contact.as_("phone"),
+			Count(TithesOfferings.name).as_("contribution_count"),
+			Sum(TithesOfferings.total_amount).as_("total_amount"),
+		)
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.date[add_days(on_date, -7) : add_days(on_date, -1)])
+		.where(NullIf(Member.normalized_contact, "").isnotnull())
+		.groupby(Member.name, Member.full_name, Member.normalized_contact)
+	).run(as_dict=True)
+
+	for row in rows:
+		row.first_name = get_first_name(row.recipient_name)
+		row.total = fmt_money(row.total_amount)
+	return rows
+
+
+def get_lapsed_givers(on_date, weeks=None):
+	"""Active members whose last contribution is now exactly ``weeks`` weeks old.
+
+	Only members whose last contribution falls in the one week that just crossed
+	the threshold are selected, so a lapsed member is reminded once, not every week.
+	"""
+	weeks = cint(weeks) or cint(frappe.db.get_single_value("StewardPro Settings", "sms_lapsed_giving_weeks")) or 4
+	TithesOfferings = DocType("Tithes and Offerings")
+	Member = DocType("Member")
+	last_contribution = Max(TithesOfferings.date)
+	lapsed_since = add_days(on_date, -7 * weeks)
+
+	rows = (
+		frappe.qb.from_(Member)
+		.inner_join(TithesOfferings)
+		.on((TithesOfferings.member == Member.name) & (TithesOfferings.docstatus == 1))
+		.select(
+			Member.name.as_("recipient"),
+			Member.full_name.as_("recipient_name"),
+			Member.normalized_contact.as_("phone"),
+			last_contribution.as_("last_contribution"),
+		)
+		.where(Member.status == "Active")
+		.where(NullIf(Member.normalized_contact, "").isnotnull())
+		.groupby(Member.name, Member.full_name, Member.normalized_contact)
+		.having((last_contribution >= add_days(lapsed_since, -7)) & (last_contribution < lapsed_since))
+	).run(as_dict=True)
+
+	for row in rows:
+		row.first_name = get_first_name(row.recipient_name)
+	return rows
+
+
+def get_department_heads(on_date):
+	"""Heads of active departments with their budgets for the Fiscal Year of ``on_date``"""
+	Department = DocType("Department")
+	DepartmentBudget = DocType("Department Budget")
+	User = DocType("User")
+
+	fiscal_year = get_fiscal_year(on_date)
+	if not fiscal_year:
+		return []
+
+	rows = (
+		frappe.qb.from_(Department)
+		.inner_join(User)
+		.on(User.name == Department.department_head)
+		.inner_join(DepartmentBudget)
+		.on(
+			(DepartmentBudget.department == Department.name)
+			& (DepartmentBudget.fiscal_year == fiscal_year.name)
+			& (DepartmentBudget.docstatus < 2)
+		)
+		.select(
+			Department.name.as_("recipient"),
+			Department.department_name,
+			User.full_name.as_("recipient_name"),
+			Coalesce(NullIf(Department.contact_phone, ""), User.mobile_no).as_("phone"),
+			Sum(DepartmentBudget.total_budget_amount).as_("budget_amount"),
+			Sum(DepartmentBudget.spent_amount).as_("spent_amount"),
+			Sum(DepartmentBudget.committed_amount).as_("committed_amount"),
+		)
+		.where(Department.is_active == 1)
+		.groupby(Department.name, Department.department_name, User.full_name, Department.contact_phone, User.mobile_no)
+	).run(as_dict=True)
+
+	for row, phone in zip(rows, normalize_phones([row.phone for row in rows]), strict=True):
+		row.phone = phone
+		row.fiscal_year = fiscal_year.name
+		row.budget = fmt_money(row.budget_amount)
+		row.spent = fmt_money(row.spent_amount)
+		row.available = fmt_money(flt(row.budget_amount) - flt(row.spent_amount) - flt(row.committed_amount))
+	return [row for row in rows if row.phone]
+
+
+def get_first_name(full_name):
+	return (full_name or "").split(" ", 1)[0]
+
+
+CAMPAIGNS = {
+	"weekly_givers": frappe._dict(
+		label="Weekly Giving Thank You",
+		setting="sms_campaign_weekly_givers",
+		audience=get_weekly_givers,
+		template=SMSTemplate(
+			[
+				"Dear {first_name}, thank you for your {contribution_count} contribution(s) this week totalling {total}. God bless! - Church",
+				"Dear {first_name}, thank you for giving {total} this week. God bless! - Church",
+			],
+			truncate="first_name",
+		),
+	),
+	"lapsed_givers": frappe._dict(
+		label="Lapsed Giver Reminder",
+		setting="sms_campaign_lapsed_givers",
+		audience=get_lapsed_givers,
+		template=SMSTemplate(
+			[
+				"Dear {first_name}, we have missed you. We are praying for you and look forward to worshipping with you this Sabbath. God bless! - Church",
+				"Dear {first_name}, we have missed you and look forward to seeing you this Sabbath. God bless! - Church",
+			],
+			truncate="first_name",
+		),
+	),
+	"department_heads": frappe._dict(
+		label="Department Budget Summary",
+		setting="sms_campaign_department_heads",
+		audience=get_department_heads,
+		template=SMSTemplate(
+			[
+				"{department_name} budget {fiscal_year}: spent {spent} of {budget}, {available} available. - Church",
+				"{department_name} {fiscal_year}: spent {spent} of {budget}, {available} left",
+			],
+			truncate="department_name",
+		),
+	),
+}
+
+
+def get_campaign(campaign):
+	if campaign not in CAMPAIGNS:
+		frappe.throw(_("Unknown SMS campaign: {0}").format(campaign))
+	return CAMPAIGNS[campaign]
+
+
+def build_campaign_messages(campaign, on_date=None):
+	"""[{recipient_name, phone, message}] for everyone in the campaign's audience.
+
+	A number shared by several recipients (a family on one phone) is texted once.
+	"""
+	definition = get_campaign(campaign)
+	rows, _duplicates, _invalid = dedupe_recipients(definition.audience(getdate(on_date)))
+	rows = [frappe._dict(row) for row in rows]
+	texts = definition.template.render_many(rows)
+
+	return [
+		{"recipient_name": row.recipient_name, "phone": row.phone, "message": text}
+		for row, text in zip(rows, texts, strict=True)
+	]
+
+
+def run_campaign(campaign, on_date=None):
+	"""Select and render a campaign, then queue its dispatch jobs; returns the message count"""
+	on_date = getdate(on_date)
+	messages = build_campaign_messages(campaign, on_date)
+	sms_type = get_campaign(campaign).label
+
+	for index, start in enumerate(range(0, len(messages), DISPATCH_CHUNK_SIZE)):
+		frappe.enqueue(
+			dispatch_messages,
+			sms_type=sms_type,
+			messages=messages[start : start + DISPATCH_CHUNK_SIZE],
+			queue="long",
+			timeout=1800,
+			job_id=f"sms_campaign::{campaign}::{on_date}::{index}",
+			deduplicate=True,
+		)
+
+	estimate = estimate_cost([entry["message"] for entry in messages])
+	frappe.logger().info(
+		f"SMS campaign {campaign}: {len(messages)} messages, {estimate['segments']} segments queued"
+	)
+	return len(messages)
+
+
+def run_weekly_campaigns(on_date=None):
+	"""Run every campaign enabled in StewardPro Settings; returns {campaign: message count}"""
+	settings = frappe.get_cached_doc("StewardPro Settings")
+	return {
+		campaign: run_campaign(campaign, on_date)
+		for campaign, definition in CAMPAIGNS.items()
+		if settings.get(definition.setting)
+	}
+
+
+def dispatch_messages(sms_type, messages, on_progress=None):
+	"""Background job: send one chunk of messages and log them as ``sms_type``
+
+	``on_progress(done, total)`` is called after every provider request. Once the
+	SMS circuit breaker is open the messages not yet sent are set aside for
+	``resume_deferred_messages`` instead of being sent. The entries the provider
+	refused are returned under ``failed_messages``.
+	"""
+	sms_api = SMSAPI()
+
+	logs = []
+	deferred = []
+	failed = []
+	for message, group in group_by_message(messages).items():
+		for start in range(0, len(group), PROVIDER_BATCH_SIZE):
+			batch = group[start : start + PROVIDER_BATCH_SIZE]
+			if deferred:
+				deferred.extend(batch)
+				continue
+
+			# The send waits for the shared SMS rate limit
+			result = sms_api.send_sms([entry["phone"] for entry in batch], message)
+			if result.get("circuit_open"):
+				deferred.extend(batch)
+				continue
+
+			status = "Success" if result["success"] else f"Failed: {result['error']}"
+			if not result["success"]:
+				failed.extend(batch)
+			logs.extend(
+				{
+					"recipient_name": entry["recipient_name"],
+					"phone": entry["phone"],
+					"message": message,
+					"status": status,
+					"provider_message_id": result.get("message_id"),
+				}
+				for entry in batch
+			)
+			if on_progress:
+				on_progress(len(logs), len(messages))
+
+	insert_sms_logs(sms_type, logs)
+	if deferred:
+		defer_messages(sms_type, deferred)
+
+	sent = sum(1 for log in logs if log["status"] == "Success")
+	return {
+		"sms_type": sms_type,
+		"sent": sent,
+		"failed": len(logs) - sent,
+		"deferred": len(deferred),
+		"failed_messages": failed,
+	}
+
+
+def defer_messages(sms_type, messages):
+	"""Keep messages the circuit breaker stopped until sending resumes"""
+	frappe.cache().rpush(DEFERRED_MESSAGES_KEY, json.dumps({"sms_type": sms_type, "messages": messages}))
+	frappe.logger().warning(f"SMS sending paused: {len(messages)} {sms_type} messages deferred")
+
+
+def get_deferred_message_count():
+	chunks = frappe.cache().lrange(DEFERRED_MESSAGES_KEY, 0, -1)
+	return sum(len(json.loads(chunk)["messages"]) for chunk in chunks)
+
+
+@frappe.whitelist()
+def get_sms_sending_status():
+	"""Whether SMS sending is paused, why, and how many messages wait for it to resume"""
+	frappe.only_for("System Manager")
+	return {"circuit": get_open_circuit(), "deferred": get_deferred_message_count()}
+
+
+def resume_deferred_messages():
+	"""Scheduled job: queue the deferred messages again once the circuit is closed; returns their count"""
+	if get_open_circuit():
+		return 0
+
+	cache = frappe.cache()
+	chunks = cache.lrange(DEFERRED_MESSAGES_KEY, 0, -1)
+	if not chunks:
+		return 0
+	# Chunks deferred meanwhile are appended at the tail and kept
+	cache.ltrim(DEFERRED_MESSAGES_KEY, len(chunks), -1)
+
+	queued = 0
+	for chunk in chunks:
+		chunk = json.loads(chunk)
+		frappe.enqueue(
+			dispatch_messages,
+			sms_type=chunk["sms_type"],
+			messages=chunk["messages"],
+			queue="long",
+			timeout=1800,
+		)
+		queued += len(chunk["messages"])
+
+	frappe.logger().info(f"SMS sending resumed: {queued} deferred messages queued")
+	return queued
+
+
+def group_by_message(messages):
+	"""{message: [entries]} so identical texts go out in one provider request"""
+	groups = {}
+	for entry in messages:
+		groups.setdefault(entry["message"], []).append(entry)
+	return groups
+
+
+@frappe.whitelist()
+def preview_sms_campaign(campaign, on_date=None):
+	"""Recipient count, sample messages and cost estimate of a campaign, without sending anything"""
+	frappe.only_for("System Manager")
+
+	messages = build_campaign_messages(campaign, on_date)
+	return {
+		"campaign": campaign,
+		"label": _(get_campaign(campaign).label),
+		"count": len(messages),
+		"samples": [{**entry, **get_message_info(entry["message"])} for entry in messages[:5]],
+		"estimate": estimate_cost([entry["message"] for entry in messages]),
+		"date": formatdate(getdate(on_date)),
+	}
+
+
+@frappe.whitelist()
+def send_sms_campaign(campaign, on_date=None):
+	"""Queue a campaign now instead of waiting for the Saturday run"""
+	frappe.only_for("System Manager")
+	get_sms_settings()
+
+	return {"campaign": campaign, "queued": run_campaign(campaign, on_date)}
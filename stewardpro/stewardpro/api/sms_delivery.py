@@ -0,0 +1,213 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Delivery reports from the SMS provider.
+
+The provider calls ``receive_delivery_report`` once a message's delivery is
+known. The endpoint only checks the shared token and appends the reports to a
+Redis list, so a burst of callbacks costs no database writes. Every minute
+``process_delivery_reports`` drains the list and applies the reports with one
+UPDATE per resulting status, matched on the indexed (provider_message_id,
+receiver) of SMS Log. ``delivery_status`` holds one of ``DELIVERY_STATUSES``,
+indexed with ``sent_on``, so failed-delivery summaries and resends are range
+queries on that index.
+"""
+
+import hmac
+import json
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Count
+from frappe.utils import add_days, getdate, now
+from frappe.utils.password import get_decrypted_password
+from pypika.terms import Tuple
+
+from stewardpro.stewardpro.api.sms_campaign import DISPATCH_CHUNK_SIZE, dispatch_messages
+from stewardpro.stewardpro.utils.phone_numbers import normalize_phones
+
+DELIVERY_STATUSES = ("Queued", "Sent", "Delivered", "Failed", "Expired", "Unknown")
+# A late "sent" report never overwrites one of these
+FINAL_STATUSES = ("Delivered", "Failed", "Expired")
+UNDELIVERED_STATUSES = ("Failed", "Expired")
+
+# Provider status codes (Beem and common SMPP receipt states) by delivery status
+PROVIDER_STATUSES = {
+	"DELIVERED": "Delivered",
+	"DELIVRD": "Delivered",
+	"UNDELIVERED": "Failed",
+	"UNDELIV": "Failed",
+	"FAILED": "Failed",
+	"REJECTED": "Failed",
+	"REJECTD": "Failed",
+	"EXPIRED": "Expired",
+	"PENDING": "Sent",
+	"SENT": "Sent",
+	"ACCEPTED": "Sent",
+	"ACCEPTD": "Sent",
+	"ENROUTE": "Sent",
+}
+
+DELIVERY_REPORTS_KEY = "stewardpro:sms_delivery_reports"
+DRAIN_BATCH_SIZE = 1000
+UPDATE_CHUNK_SIZE = 500
+RESEND_TYPE = "SMS Resend"
+
+
+def check_token():
+	expected = get_decrypted_password(
+		"StewardPro Settings", "StewardPro Settings", "sms_delivery_report_token", raise_exception=False
+	)
+	token = frappe.get_request_header("X-StewardPro-Token") or frappe.form_dict.get("token")
+	if not expected or not token or not hmac.compare_digest(str(token), expected):
+		frappe.throw(_("Invalid delivery report token"), frappe.AuthenticationError)
+
+
+def parse_report(report):
+	"""{message_id, receiver, status} from one provider callback, or None"""
+	if not isinstance(report, dict):
+		return None
+
+	message_id = report.get("request_id") or report.get("message_id")
+	receiver = report.get("dest_addr") or report.get("receiver") or report.get("msisdn")
+	if not message_id or not receiver:
+		return None
+
+	status = PROVIDER_STATUSES.get(str(report.get("status") or "").strip().upper(), "Unknown")
+	return {"message_id": str(message_id), "receiver": str(receiver), "status": status}
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def receive_delivery_report():
+	"""Queue the delivery reports in the request body (one object or a list)"""
+	check_token()
+
+	payload = frappe.request.get_json(silent=True) if frappe.request else None
+	if payload is None:
+		payload = {key: value for key, value in frappe.form_dict.items() if key not in ("cmd", "token")}
+	reports = payload if isinstance(payload, list) else [payload]
+
+	return {"received": queue_delivery_reports(reports)}
+
+
+def queue_delivery_reports(reports):
+	"""Append the valid provider reports to the queue; returns how many were queued"""
+	cache = frappe.cache()
+	received = 0
+	for report in reports:
+		parsed = parse_report(report)
+		if parsed:
+			cache.rpush(DELIVERY_REPORTS_KEY, json.dumps(parsed))
+			received += 1
+
+	return received
+
+
+def process_delivery_reports():
+	"""Scheduled job: apply queued delivery reports to SMS Logs; returns the number applied"""
+	cache = frappe.cache()
+	processed = 0
+
+	while True:
+		raw = cache.lrange(DELIVERY_REPORTS_KEY, 0, DRAIN_BATCH_SIZE - 1)
+		if not raw:
+			break
+		# New reports are appended at the tail, so trimming the head cannot drop them
+		cache.ltrim(DELIVERY_REPORTS_KEY, len(raw), -1)
+
+		apply_delivery_reports([json.loads(report) for report in raw])
+		processed += len(raw)
+
+	return processed
+
+
+def apply_delivery_reports(reports):
+	numbers = normalize_phones([report["receiver"] for report in reports])
+
+	# The latest report per message wins
+	latest = {}
+	for report, number in zip(reports, numbers, strict=True):
+		if number:
+			latest[(report["message_id"], number)] = report["status"]
+
+	by_status = {}
+	for key, status in latest.items():
+		by_status.setdefault(status, []).append(key)
+
+	SMSLog = DocType("SMS Log")
+	reported_on = now()
+	for status, keys in by_status.items():
+		for start in range(0, len(keys), UPDATE_CHUNK_SIZE):
+			query = (
+				frappe.qb.update(SMSLog)
+				.set(SMSLog.delivery_status, status)
+				.set(SMSLog.delivered_on, reported_on)
+				.where(
+					Tuple(SMSLog.provider_message_id, SMSLog.receiver).isin(
+						[Tuple(*key) for key in keys[start : start + UPDATE_CHUNK_SIZE]]
+					)
+				)
+			)
+			if status not in FINAL_STATUSES:
+				query = query.where(SMSLog.delivery_status.notin(FINAL_STATUSES))
+			query.run()
+
+
+def get_date_range(from_date=None, to_date=None):
+	to_date = getdate(to_date)
+	from_date = getdate(from_date) if from_date else add_days(to_date, -7)
+	return f"{from_date} 00:00:00", f"{to_date} 23:59:59.999999"
+
+
+@frappe.whitelist()
+def get_delivery_summary(from_date=None, to_date=None):
+	"""Number of SMS Logs per delivery status sent in the period (last 7 days by default)"""
+	frappe.only_for("System Manager")
+
+	SMSLog = DocType("SMS Log")
+	start, end = get_date_range(from_date, to_date)
+	counts = dict(
+		(
+			frappe.qb.from_(SMSLog)
+			.select(SMSLog.delivery_status, Count(SMSLog.name))
+			.where(SMSLog.sent_on[start:end])
+			.groupby(SMSLog.delivery_status)
+		).run()
+	)
+
+	return {status: counts.get(status, 0) for status in DELIVERY_STATUSES}
+
+
+@frappe.whitelist()
+def resend_failed_messages(from_date=None, to_date=None):
+	"""Queue every failed or expired message of the period again, once per number and text"""
+	frappe.only_for("System Manager")
+
+	SMSLog = DocType("SMS Log")
+	start, end = get_date_range(from_date, to_date)
+	rows = (
+		frappe.qb.from_(SMSLog)
+		.select(SMSLog.receiver, SMSLog.custom_recipient_name, SMSLog.message)
+		.where(SMSLog.delivery_status.isin(UNDELIVERED_STATUSES))
+		.where(SMSLog.sent_on[start:end])
+		.distinct()
+	).run(as_dict=True)
+
+	numbers = normalize_phones([row.receiver for row in rows])
+	messages = [
+		{"recipient_name": row.custom_recipient_name, "phone": number, "message": row.message}
+		for row, number in zip(rows, numbers, strict=True)
+		if number and row.message
+	]
+
+	for start_index in range(0, len(messages), DISPATCH_CHUNK_SIZE):
+		frappe.enqueue(
+			dispatch_messages,
+			sms_type=RESEND_TYPE,
+			messages=messages[start_index : start_index + DISPATCH_CHUNK_SIZE],
+			queue="long",
+			timeout=1800,
+		)
+
+	return {"queued": len(messages)}
@@ -0,0 +1,336 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Combined receipt SMS per member.
+
+With "Receipt SMS" set to a digest mode in StewardPro Settings, submitting a
+Tithes and Offerings record no longer queues its own SMS. Instead the evening
+digest job (every day, or on the Sabbath only) sums every member's not yet
+receipted contributions with one grouped query, whatever their date, sends one
+message per member through the campaign dispatcher and marks the records as
+receipted with one update.
+
+Receipts for records picked in the list view go through ``get_receipt_eligibility``
+and ``send_selected_receipts``: the selection (or the list filters) is checked
+with one join, and the send runs as a background job whose progress the browser
+polls with ``get_receipt_progress``.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder import Case, DocType
+from frappe.query_builder.functions import Count, Max, Min, NullIf, Sum
+from frappe.utils import fmt_money, formatdate, getdate, now
+
+from stewardpro.stewardpro.api.sms import get_sms_settings
+from stewardpro.stewardpro.api.sms_campaign import DISPATCH_CHUNK_SIZE, dispatch_messages, get_first_name
+from stewardpro.stewardpro.api.sms_templates import RECEIPT_SMS, SMSTemplate, estimate_cost
+
+PER_CONTRIBUTION = "Per Contribution"
+DAILY_DIGEST = "Daily Digest"
+SABBATH_DIGEST = "Sabbath Digest"
+
+RECEIPT_DIGEST_TYPE = "Receipt Digest"
+BULK_RECEIPT_TYPE = "Bulk Receipt SMS"
+
+ELIGIBLE = "Eligible"
+# Reasons a selected record gets no receipt, in the order they are checked
+INELIGIBLE_REASONS = {
+	"not_submitted": "Not submitted",
+	"no_member": "No member assigned",
+	"no_phone": "Member has no phone number",
+	"invalid_phone": "Member's phone number is not valid",
+}
+
+MAX_SELECTED_RECEIPTS = 10000
+RECEIPT_PROGRESS_KEY = "stewardpro:receipt_sms_progress"
+RECEIPT_PROGRESS_TTL = 24 * 60 * 60
+
+# Contribution fields listed in the combined receipt; the field / church split of
+# the offering is not shown
+RECEIPT_CATEGORIES = [
+	("tithe_amount", "Tithe"),
+	("offering_amount", "Offering"),
+	("campmeeting_offering", "Camp Meeting"),
+	("church_building_offering", "Building"),
+]
+
+
+def get_receipt_mode():
+	return frappe.db.get_single_value("StewardPro Settings", "sms_receipt_mode", cache=True) or PER_CONTRIBUTION
+
+
+def is_digest_mode():
+	return get_receipt_mode() != PER_CONTRIBUTION
+
+
+def is_digest_day(mode, on_date=None):
+	"""Whether a digest run on ``on_date`` sends: every day, or on the Sabbath only"""
+	if mode == DAILY_DIGEST:
+		return True
+	return mode == SABBATH_DIGEST and getdate(on_date).weekday() == 5
+
+
+def get_receipt_digests(to_date, cutoff):
+	"""Per-member totals of every unreceipted contribution dated up to ``to_date`` and submitted
+	before ``cutoff``.
+
+	Contributions are not limited to the day or week being digested, so records entered
+	later with an earlier date, or submitted after the previous run, are receipted by
+	the next one.
+	"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	Member = DocType("Member")
+
+	return (
+		frappe.qb.from_(TithesOfferings)
+		.inner_join(Member)
+		.on(TithesOfferings.member == Member.name)
+		.select(
+			Member.name.as_("member"),
+			Member.full_name.as_("recipient_name"),
+			Member.normalized_contact.as_("phone"),
+			Min(TithesOfferings.date).as_("from_date"),
+			Max(TithesOfferings.date).as_("to_date"),
+			Count(TithesOfferings.name).as_("contribution_count"),
+			*[Sum(TithesOfferings[fieldname]).as_(fieldname) for fieldname, _label in RECEIPT_CATEGORIES],
+			Sum(TithesOfferings.total_amount).as_("total_amount"),
+		)
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.receipt_sms_sent == 0)
+		.where(TithesOfferings.date <= to_date)
+		.where(TithesOfferings.modified <= cutoff)
+		.where(NullIf(Member.normalized_contact, "").isnotnull())
+		.groupby(Member.name, Member.full_name, Member.normalized_contact)
+	).run(as_dict=True)
+
+
+DIGEST_SMS = SMSTemplate(
+	[
+		"Thank you {first_name}! Received {period}: {contributions}. Total {total}. God bless! - Church",
+		"Thank you {first_name}! Received {period}: total {total}. God bless! - Church",
+	],
+	truncate="first_name",
+)
+
+
+def get_digest_context(row):
+	if row.from_date == row.to_date:
+		period = formatdate(row.to_date)
+	else:
+		period = _("{0} to {1}").format(formatdate(row.from_date), formatdate(row.to_date))
+
+	return {
+		"first_name": get_first_name(row.recipient_name),
+		"period": period,
+		"contributions": ", ".join(
+			f"{label} {fmt_money(row[fieldname])}" for fieldname, label in RECEIPT_CATEGORIES if row.get(fieldname)
+		),
+		"total": fmt_money(row.total_amount),
+	}
+
+
+def mark_receipted(members, to_date, cutoff):
+	"""Flag the digested contributions so the next run does not receipt them again"""
+	TithesOfferings = DocType("Tithes and Offerings")
+
+	for start in range(0, len(members), DISPATCH_CHUNK_SIZE):
+		(
+			frappe.qb.update(TithesOfferings)
+			.set(TithesOfferings.receipt_sms_sent, 1)
+			.where(TithesOfferings.docstatus == 1)
+			.where(TithesOfferings.receipt_sms_sent == 0)
+			.where(TithesOfferings.date <= to_date)
+			.where(TithesOfferings.modified <= cutoff)
+			.where(TithesOfferings.member.isin(members[start : start + DISPATCH_CHUNK_SIZE]))
+		).run()
+
+
+def send_receipt_digests(on_date=None):
+	"""Send one combined receipt per member for every contribution not yet receipted"""
+	mode = get_receipt_mode()
+	to_date = getdate(on_date)
+	if not is_digest_day(mode, to_date):
+		return 0
+
+	# Records submitted while the digest runs wait for the next one
+	cutoff = now()
+	digests = get_receipt_digests(to_date, cutoff)
+	if not digests:
+		return 0
+
+	texts = DIGEST_SMS.render_many([get_digest_context(row) for row in digests])
+	messages = [
+		{"recipient_name": row.recipient_name, "phone": row.phone, "message": text}
+		for row, text in zip(digests, texts, strict=True)
+	]
+
+	mark_receipted([row.member for row in digests], to_date, cutoff)
+
+	for index, start in enumerate(range(0, len(messages), DISPATCH_CHUNK_SIZE)):
+		frappe.enqueue(
+			dispatch_messages,
+			sms_type=RECEIPT_DIGEST_TYPE,
+			messages=messages[start : start + DISPATCH_CHUNK_SIZE],
+			queue="long",
+			timeout=1800,
+			job_id=f"sms_receipt_digest::{to_date}::{index}",
+			deduplicate=True,
+		)
+
+	frappe.logger().info(f"Receipt digest up to {to_date}: {len(messages)} messages queued")
+	return len(messages)
+
+
+def get_selected_records(names=None, filters=None):
+	"""Names of the selected records, or of all records matching the list filters"""
+	if isinstance(names, str):
+		names = frappe.parse_json(names)
+	if isinstance(filters, str):
+		filters = frappe.parse_json(filters)
+
+	if names:
+		filters = [["Tithes and Offerings", "name", "in", names]]
+	elif not filters:
+		frappe.throw(_("Select records or set list filters first"))
+
+	# get_list applies the user's permissions
+	selected = frappe.get_list(
+		"Tithes and Offerings", filters=filters, pluck="name", limit_page_length=MAX_SELECTED_RECEIPTS + 1
+	)
+	if len(selected) > MAX_SELECTED_RECEIPTS:
+		frappe.throw(_("Receipts can be sent for at most {0} records at a time").format(MAX_SELECTED_RECEIPTS))
+	return selected
+
+
+def get_receipt_query(names):
+	"""Tithes and Offerings joined to their Member with the reason each one cannot be receipted"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	Member = DocType("Member")
+
+	reason = (
+		Case()
+		.when(TithesOfferings.docstatus != 1, "not_submitted")
+		.when(Member.name.isnull(), "no_member")
+		.when(NullIf(Member.contact, "").isnull(), "no_phone")
+		.when(NullIf(Member.normalized_contact, "").isnull(), "invalid_phone")
+		.else_(ELIGIBLE)
+	)
+
+	query = (
+		frappe.qb.from_(TithesOfferings)
+		.left_join(Member)
+		.on(Member.name == TithesOfferings.member)
+		.where(TithesOfferings.name.isin(names))
+	)
+	return query, reason, TithesOfferings, Member
+
+
+@frappe.whitelist()
+def get_receipt_eligibility(names=None, filters=None):
+	"""How many of the selected records can get a receipt SMS, and why the others cannot"""
+	selected = get_selected_records(names, filters)
+	counts = {}
+	if selected:
+		query, reason, TithesOfferings, _member = get_receipt_query(selected)
+		counts = dict(query.select(reason, Count(TithesOfferings.name)).groupby(reason).run())
+
+	return {
+		"total": len(selected),
+		"eligible": counts.pop(ELIGIBLE, 0),
+		"ineligible": [
+			{"reason": key, "label": _(label), "count": counts[key]}
+			for key, label in INELIGIBLE_REASONS.items()
+			if counts.get(key)
+		],
+	}
+
+
+@frappe.whitelist()
+def send_selected_receipts(names=None, filters=None):
+	"""Queue receipt SMS for the eligible selected records; returns the job id to poll"""
+	frappe.has_permission("Tithes and Offerings", "read", throw=True)
+	get_sms_settings()
+
+	selected = get_selected_records(names, filters)
+	job_id = f"receipt_sms::{frappe.generate_hash(length=10)}"
+	set_receipt_progress(job_id, status="queued", total=len(selected))
+
+	frappe.enqueue(
+		send_receipts,
+		names=selected,
+		job_id=job_id,
+		progress_key=job_id,
+		queue="long",
+		timeout=1800,
+	)
+	return {"queued": True, "job_id": job_id, "count": len(selected)}
+
+
+def send_receipts(names, progress_key):
+	"""Background job: render and send one receipt per eligible record"""
+	query, reason, TithesOfferings, Member = get_receipt_query(names)
+	rows = (
+		query.select(
+			TithesOfferings.name,
+			TithesOfferings.receipt_number,
+			TithesOfferings.date,
+			TithesOfferings.total_amount,
+			Member.full_name.as_("recipient_name"),
+			Member.normalized_contact.as_("phone"),
+		).where(reason == ELIGIBLE)
+	).run(as_dict=True)
+
+	texts = RECEIPT_SMS.render_many(
+		{
+			"member_name": row.recipient_name,
+			"receipt_number": row.receipt_number,
+			"date": getdate(row.date).strftime("%d/%m/%Y"),
+			"total": fmt_money(row.total_amount),
+		}
+		for row in rows
+	)
+	messages = [
+		{"recipient_name": row.recipient_name, "phone": row.phone, "message": text, "reference": row.name}
+		for row, text in zip(rows, texts, strict=True)
+	]
+
+	set_receipt_progress(progress_key, status="sending", total=len(messages), done=0)
+	result = dispatch_messages(
+		BULK_RECEIPT_TYPE,
+		messages,
+		on_progress=lambda done, total: set_receipt_progress(progress_key, status="sending", total=total, done=done),
+	)
+
+	# Sent and deferred receipts are flagged; failed ones stay eligible for another try
+	failed = {entry["reference"] for entry in result["failed_messages"]}
+	receipted = [row.name for row in rows if row.name not in failed]
+	if receipted:
+		(
+			frappe.qb.update(TithesOfferings)
+			.set(TithesOfferings.receipt_sms_sent, 1)
+			.where(TithesOfferings.name.isin(receipted))
+		).run()
+
+	set_receipt_progress(
+		progress_key,
+		status="done",
+		total=len(messages),
+		done=len(messages),
+		sent=result["sent"],
+		failed=result["failed"],
+		deferred=result["deferred"],
+		segments=estimate_cost(texts)["segments"],
+	)
+	return result
+
+
+def set_receipt_progress(key, **progress):
+	frappe.cache().set_value(f"{RECEIPT_PROGRESS_KEY}::{key}", progress, expires_in_sec=RECEIPT_PROGRESS_TTL)
+
+
+@frappe.whitelist()
+def get_receipt_progress(job_id):
+	"""Progress of a ``send_selected_receipts`` job: status, total, done and, when done, sent / failed / deferred"""
+	frappe.has_permission("Tithes and Offerings", "read", throw=True)
+	return frappe.cache().get_value(f"{RECEIPT_PROGRESS_KEY}::{job_id}") or {"status": "unknown"}
@@ -0,0 +1,220 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""SMS templates fitted to billable segments.
+
+A message is billed per segment: 160 GSM-7 characters (153 per part once split)
+or, as soon as one character is outside the GSM-7 alphabet, 70 UCS-2 code units
+(67 per part). ``count_segments`` gives the exact count, keeping GSM-7 escape
+pairs and UTF-16 surrogate pairs whole across parts like the handset does.
+
+An ``SMSTemplate`` is compiled once from its variants, richest first. Rendering
+transliterates the values to GSM-7 where a close equivalent exists (curly quotes,
+accented letters), so a name typed with an apostrophe from a phone keyboard does
+not switch the whole message to UCS-2, then picks the first variant that fits in
+``max_segments`` and, if none does, shortens the ``truncate`` field of the last
+variant until it fits.
+"""
+
+import unicodedata
+from functools import lru_cache
+from string import Formatter
+
+import frappe
+from frappe.utils import flt
+
+GSM7 = "GSM-7"
+UCS2 = "UCS-2"
+
+GSM7_BASIC = frozenset(
+	"@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+	"¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Sent as an escape character plus the character, so they take two units
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+# (single message, per part of a multipart message) in encoding units
+SEGMENT_LIMITS = {GSM7: (160, 153), UCS2: (70, 67)}
+
+GSM7_REPLACEMENTS = {
+	"‘": "'", "’": "'", "‚": "'", "ʼ": "'", "`": "'", "´": "'",
+	"“": '"', "”": '"', "„": '"',
+	"–": "-", "—": "-", "−": "-",
+	"…": "...", "\u00a0": " ", "\u202f": " ", "\t": " ",
+}
+
+ELLIPSIS = "..."
+
+
+def get_encoding(text):
+	"""GSM-7 if every character is in the GSM-7 alphabet, else UCS-2"""
+	for char in text:
+		if char not in GSM7_BASIC and char not in GSM7_EXTENDED:
+			return UCS2
+	return GSM7
+
+
+def get_unit_sizes(text, encoding):
+	if encoding == GSM7:
+		return [2 if char in GSM7_EXTENDED else 1 for char in text]
+	return [2 if ord(char) > 0xFFFF else 1 for char in text]
+
+
+def count_segments(text, encoding=None):
+	"""Number of billable segments ``text`` is sent as"""
+	if not text:
+		return 0
+
+	encoding = encoding or get_encoding(text)
+	single, per_part = SEGMENT_LIMITS[encoding]
+	sizes = get_unit_sizes(text, encoding)
+	if sum(sizes) <= single:
+		return 1
+
+	# Escape and surrogate pairs are never split across parts
+	parts, used = 1, 0
+	for size in sizes:
+		if used + size > per_part:
+			parts += 1
+			used = 0
+		used += size
+	return parts
+
+
+def get_message_info(text):
+	encoding = get_encoding(text)
+	return {"encoding": encoding, "characters": len(text), "segments": count_segments(text, encoding)}
+
+
+@lru_cache(maxsize=4096)
+def to_gsm7(value):
+	"""``value`` with characters outside GSM-7 replaced by their closest GSM-7 form when one exists"""
+	if get_encoding(value) == GSM7:
+		return value
+
+	chars = []
+	for char in value:
+		if char in GSM7_BASIC or char in GSM7_EXTENDED:
+			chars.append(char)
+			continue
+		replacement = GSM7_REPLACEMENTS.get(char)
+		if replacement is None:
+			# Drop combining accents: "ş" -> "s", "ā" -> "a"
+			decomposed = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+			replacement = decomposed if decomposed and get_encoding(decomposed) == GSM7 else char
+		chars.append(replacement)
+	return "".join(chars)
+
+
+class CompiledVariant:
+	"""A format string split once into literal text and (field, format spec) pairs"""
+
+	def __init__(self, source):
+		self.source = source
+		self.pieces = []
+		self.fields = set()
+		for literal, field, format_spec, _conversion in Formatter().parse(source):
+			if literal:
+				self.pieces.append((literal, None, None))
+			if field is not None:
+				self.pieces.append((None, field, format_spec))
+				self.fields.add(field)
+
+	def render(self, values):
+		return "".join(
+			literal if field is None else format(values[field], format_spec) for literal, field, format_spec in self.pieces
+		)
+
+
+class SMSTemplate:
+	"""Message variants, richest first, fitted into ``max_segments`` when rendered"""
+
+	def __init__(self, variants, truncate=None, max_segments=1):
+		if isinstance(variants, str):
+			variants = [variants]
+		self.variants = [CompiledVariant(variant) for variant in variants]
+		self.fields = set().union(*(variant.fields for variant in self.variants))
+		self.truncate = truncate
+		self.max_segments = max_segments
+
+	def get_values(self, context):
+		values = {}
+		for field in self.fields:
+			value = context.get(field)
+			values[field] = to_gsm7(str(value)) if value is not None else ""
+		return values
+
+	def render(self, context):
+		"""The fitted message for one recipient's ``context``"""
+		values = self.get_values(context)
+
+		best, best_segments = None, None
+		for variant in self.variants:
+			text = variant.render(values)
+			segments = count_segments(text)
+			if segments <= self.max_segments:
+				return text
+			if best is None or segments < best_segments:
+				best, best_segments = text, segments
+
+		shortened = self.shorten(self.variants[-1], values)
+		return shortened if shortened is not None else best
+
+	def render_many(self, contexts):
+		"""Fitted messages for every context, in order"""
+		return [self.render(context) for context in contexts]
+
+	def shorten(self, variant, values):
+		"""Longest truncation of the ``truncate`` field that fits, or None"""
+		if not self.truncate or self.truncate not in variant.fields:
+			return None
+
+		value = values[self.truncate]
+		low, high, fitted = 0, len(value) - 1, None
+		# Binary search on the kept length; segments grow monotonically with it
+		while low <= high:
+			keep = (low + high) // 2
+			candidate = variant.render({**values, self.truncate: value[:keep].rstrip() + ELLIPSIS})
+			if count_segments(candidate) <= self.max_segments:
+				fitted = candidate
+				low = keep + 1
+			else:
+				high = keep - 1
+		return fitted
+
+
+def estimate_cost(messages):
+	"""Segments and cost of sending ``messages`` (texts) at the configured price per segment"""
+	encodings = {GSM7: 0, UCS2: 0}
+	segments = 0
+	for message in messages:
+		encoding = get_encoding(message)
+		encodings[encoding] += 1
+		segments += count_segments(message, encoding)
+
+	cost_per_segment = flt(frappe.db.get_single_value("StewardPro Settings", "sms_cost_per_segment", cache=True))
+	return {
+		"messages": len(messages),
+		"segments": segments,
+		"gsm7_messages": encodings[GSM7],
+		"ucs2_messages": encodings[UCS2],
+		"cost_per_segment": cost_per_segment,
+		"estimated_cost": segments * cost_per_segment,
+	}
+
+
+WELCOME_SMS = SMSTemplate(
+	[
+		"Welcome {member_name}! Your membership is registered. We're excited to have you join us. God bless! - Church Admin",
+		"Welcome {member_name}! Membership registered. God bless! - Church",
+	],
+	truncate="member_name",
+)
+
+RECEIPT_SMS = SMSTemplate(
+	[
+		"Thank you {member_name}! Receipt #{receipt_number} {date} Total: {total}. God bless! - Church",
+		"Thank you {member_name}! Receipt #{receipt_number} Total: {total}. God bless!",
+	],
+	truncate="member_name",
+)
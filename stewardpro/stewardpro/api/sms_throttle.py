@@ -0,0 +1,183 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Shared send rate and circuit breaker for the SMS provider.
+
+Every ``SMSAPI.send_sms`` call takes one token per recipient from a token bucket
+kept in Redis, so all web and background workers together stay under the "SMS
+Messages per Second" setting. The bucket is refilled and drawn from in one Lua
+script, which makes it atomic across workers without a lock.
+
+The circuit breaker opens when the provider reports insufficient balance, or
+after ``SERVER_ERROR_THRESHOLD`` server errors (5xx or no answer) in a row.
+While it is open ``send_sms`` fails at once without calling the provider and the
+campaign dispatcher sets its remaining messages aside for
+``resume_deferred_messages``. After "SMS Pause Minutes" the next send is let
+through as a probe: success closes the circuit, another failure opens it again.
+The state is copied to StewardPro Settings so it can be seen there.
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, now_datetime
+
+DEFAULT_MESSAGES_PER_SECOND = 10
+DEFAULT_PAUSE_MINUTES = 15
+SERVER_ERROR_THRESHOLD = 3
+
+RATE_LIMIT_KEY = "stewardpro:sms_rate_limit"
+# Present while sending is paused; expires when the next send may probe the provider
+CIRCUIT_KEY = "stewardpro:sms_circuit"
+# Present from the moment the circuit opens until a send succeeds again
+CIRCUIT_TRIPPED_KEY = "stewardpro:sms_circuit_tripped"
+SERVER_ERRORS_KEY = "stewardpro:sms_server_errors"
+
+CLOSED = "Closed"
+OPEN = "Open"
+
+# KEYS[1] bucket; ARGV rate (tokens per second), capacity, now (seconds), tokens wanted.
+# Takes the tokens and returns 0, or returns the seconds to wait before they are there.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local wanted = tonumber(ARGV[4])
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local wait = 0
+if tokens >= wanted then
+	tokens = tokens - wanted
+else
+	wait = (wanted - tokens) / rate
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def get_messages_per_second():
+	rate = cint(frappe.db.get_single_value("StewardPro Settings", "sms_messages_per_second", cache=True))
+	return rate if rate > 0 else DEFAULT_MESSAGES_PER_SECOND
+
+
+def acquire_send_tokens(count=1):
+	"""Wait until ``count`` more messages may be sent under the shared rate"""
+	rate = get_messages_per_second()
+	# A full bucket holds one second of sends
+	capacity = rate
+	cache = frappe.cache()
+	bucket = cache.register_script(TOKEN_BUCKET_SCRIPT)
+	key = cache.make_key(RATE_LIMIT_KEY)
+
+	while count > 0:
+		wanted = min(count, capacity)
+		wait = float(bucket(keys=[key], args=[rate, capacity, time.time(), wanted]))
+		if wait > 0:
+			# Other workers may take the refill first, so ask again after waiting
+			time.sleep(wait)
+			continue
+		count -= wanted
+
+
+def get_open_circuit():
+	"""{reason, opened_on, retry_after} while sending is paused, else None"""
+	# ``expires`` skips the per-request copy, so a pause opened by another worker is seen at once
+	return frappe.cache().get_value(CIRCUIT_KEY, expires=True)
+
+
+def record_send_result(result):
+	"""Count a provider answer toward the circuit breaker; returns True if it opened the circuit"""
+	cache = frappe.cache()
+
+	if result.get("success"):
+		cache.delete(cache.make_key(SERVER_ERRORS_KEY))
+		if cache.exists(CIRCUIT_TRIPPED_KEY):
+			close_circuit()
+		return False
+
+	error = str(result.get("error") or "")
+	status_code = result.get("status_code")
+
+	if "insufficient balance" in error.lower():
+		open_circuit(_("Insufficient balance at the SMS provider"))
+		return True
+
+	if status_code is None or status_code >= 500:
+		key = cache.make_key(SERVER_ERRORS_KEY)
+		errors = cache.incr(key)
+		cache.expire(key, get_pause_minutes() * 60)
+		if errors >= SERVER_ERROR_THRESHOLD:
+			cause = f"HTTP {status_code}" if status_code else error[:140]
+			open_circuit(_("{0} server errors in a row from the SMS provider ({1})").format(errors, cause))
+			return True
+
+	return False
+
+
+def get_pause_minutes():
+	minutes = cint(frappe.db.get_single_value("StewardPro Settings", "sms_pause_minutes", cache=True))
+	return minutes if minutes > 0 else DEFAULT_PAUSE_MINUTES
+
+
+def open_circuit(reason):
+	"""Pause sending for the configured minutes"""
+	minutes = get_pause_minutes()
+	opened_on = now_datetime()
+	retry_after = add_to_date(opened_on, minutes=minutes)
+
+	cache = frappe.cache()
+	cache.set_value(
+		CIRCUIT_KEY,
+		{"reason": reason, "opened_on": opened_on, "retry_after": retry_after},
+		expires_in_sec=minutes * 60,
+	)
+	cache.set(cache.make_key(CIRCUIT_TRIPPED_KEY), 1)
+	cache.delete(cache.make_key(SERVER_ERRORS_KEY))
+
+	set_circuit_state(OPEN, reason, opened_on, retry_after)
+	frappe.logger().error(f"SMS sending paused until {retry_after}: {reason}")
+
+
+def close_circuit():
+	cache = frappe.cache()
+	cache.delete_value(CIRCUIT_KEY)
+	cache.delete(cache.make_key(CIRCUIT_TRIPPED_KEY), cache.make_key(SERVER_ERRORS_KEY))
+
+	set_circuit_state(CLOSED)
+	frappe.logger().info("SMS sending resumed")
+
+
+def set_circuit_state(status, reason=None, opened_on=None, retry_after=None):
+	frappe.db.set_single_value(
+		"StewardPro Settings",
+		{
+			"sms_circuit_status": status,
+			"sms_circuit_reason": reason,
+			"sms_circuit_opened_on": opened_on,
+			"sms_circuit_retry_after": retry_after,
+		},
+		update_modified=False,
+	)
+
+
+@frappe.whitelist()
+def resume_sms_sending():
+	"""Close the circuit now (e.g. after topping up the balance) and send the messages set aside"""
+	frappe.only_for("System Manager")
+
+	close_circuit()
+	frappe.enqueue(
+		"stewardpro.stewardpro.api.sms_campaign.resume_deferred_messages",
+		queue="long",
+		job_id="resume_deferred_sms",
+		deduplicate=True,
+	)
+	return {"status": CLOSED}
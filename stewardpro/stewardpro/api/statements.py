@@ -0,0 +1,209 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import hashlib
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Count, Sum
+from frappe.utils import cint, flt, formatdate, getdate
+from frappe.utils.background_jobs import is_job_enqueued
+
+from stewardpro.stewardpro.utils import statement_renderer
+
+STATEMENT_CATEGORIES = [
+	("tithe_amount", "Tithe"),
+	("offering_amount", "Offering"),
+	("offering_to_field", "Offering to Field"),
+	("offering_to_church", "Offering to Church"),
+	("campmeeting_offering", "Camp Meeting Offering"),
+	("church_building_offering", "Church Building Offering"),
+]
+
+STATEMENT_OUTPUTS = ("archive", "per_member")
+
+# Statements rendered per pool task; small batches are rendered in-process
+CHUNK_SIZE = 250
+
+
+def get_statement_totals(year, members=None):
+	"""Per-member category totals for a year in one grouped query"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	Member = DocType("Member")
+
+	query = (
+		frappe.qb.from_(TithesOfferings)
+		.inner_join(Member)
+		.on(TithesOfferings.member == Member.name)
+		.select(
+			TithesOfferings.member,
+			Member.full_name.as_("member_name"),
+			Member.address,
+			Member.city,
+			Count(TithesOfferings.name).as_("contribution_count"),
+			*[Sum(TithesOfferings[fieldname]).as_(fieldname) for fieldname, _label in STATEMENT_CATEGORIES],
+			Sum(TithesOfferings.total_amount).as_("total_amount"),
+		)
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.date >= getdate(f"{year}-01-01"))
+		.where(TithesOfferings.date <= getdate(f"{year}-12-31"))
+		.groupby(TithesOfferings.member, Member.full_name, Member.address, Member.city)
+		.orderby(Member.full_name)
+	)
+
+	if members:
+		query = query.where(TithesOfferings.member.isin(members))
+
+	data = query.run(as_dict=True)
+
+	# Plain floats so rows pickle cheaply into the render workers
+	for row in data:
+		for fieldname, _label in STATEMENT_CATEGORIES:
+			row[fieldname] = flt(row.get(fieldname))
+		row["total_amount"] = flt(row.get("total_amount"))
+
+	return data
+
+
+def get_statement_context(year):
+	"""Values shared by every statement, resolved once in the parent process"""
+	return {
+		"year": year,
+		"title": _("Annual Giving Statement"),
+		"organization": frappe.db.get_single_value("Website Settings", "app_name") or _("StewardPro"),
+		"currency": frappe.db.get_default("currency") or "",
+		"period_start": formatdate(f"{year}-01-01"),
+		"period_end": formatdate(f"{year}-12-31"),
+		"categories": [{"fieldname": fieldname, "label": _(label)} for fieldname, label in STATEMENT_CATEGORIES],
+		"labels": {
+			"period": _("Period"),
+			"contributions": _("Contributions"),
+			"category": _("Category"),
+			"amount": _("Amount"),
+			"total": _("Total"),
+			"footer": _("Thank you for your faithful giving."),
+		},
+	}
+
+
+def render_statements(statements, context, workers=None):
+	"""Render statements through the compiled template, in a process pool for large runs.
+
+	Yields (member, filename, html) tuples in the order of ``statements``.
+	"""
+	if len(statements) <= CHUNK_SIZE:
+		statement_renderer.init_worker(context)
+		yield from statement_renderer.render_chunk(statements)
+		return
+
+	chunks = [statements[i : i + CHUNK_SIZE] for i in range(0, len(statements), CHUNK_SIZE)]
+	workers = cint(workers) or min(os.cpu_count() or 1, len(chunks))
+
+	# Spawned workers only import the frappe-free renderer module, so they never
+	# inherit the parent's database connection
+	with ProcessPoolExecutor(
+		max_workers=workers,
+		mp_context=multiprocessing.get_context("spawn"),
+		initializer=statement_renderer.init_worker,
+		initargs=(context,),
+	) as executor:
+		for rendered in executor.map(statement_renderer.render_chunk, chunks):
+			yield from rendered
+
+
+@frappe.whitelist()
+def generate_giving_statements(year=None, output="archive", members=None):
+	"""Queue annual giving statements for all (or the given) members"""
+	frappe.only_for(("System Manager", "Treasurer"))
+
+	year = cint(year) or getdate().year
+	if output not in STATEMENT_OUTPUTS:
+		frappe.throw(_("Invalid statement output: {0}").format(output))
+
+	if isinstance(members, str):
+		members = frappe.parse_json(members)
+
+	job_id = f"giving_statements::{year}::{output}"
+	if members:
+		# Runs for different members must not be taken for duplicates of each other
+		job_id += "::" + hashlib.sha1(",".join(sorted(members)).encode()).hexdigest()[:10]
+
+	if is_job_enqueued(job_id):
+		return {"queued": False, "job_id": job_id, "year": year}
+
+	frappe.enqueue(
+		build_giving_statements,
+		year=year,
+		output=output,
+		members=members,
+		user=frappe.session.user,
+		queue="long",
+		timeout=1800,
+		job_id=job_id,
+		deduplicate=True,
+	)
+
+	return {"queued": True, "job_id": job_id, "year": year}
+
+
+def build_giving_statements(year, output="archive", members=None, user=None):
+	"""Background job: render statements and store them as private files"""
+	statements = get_statement_totals(year, members)
+	context = get_statement_context(year)
+	rendered = render_statements(statements, context)
+
+	if output == "per_member":
+		files = write_member_statements(rendered)
+		result = {"year": year, "count": len(files), "files": files}
+	else:
+		file_url, count = write_statement_archive(rendered, year)
+		result = {"year": year, "count": count, "file_url": file_url}
+
+	frappe.publish_realtime("giving_statements_ready", result, user=user or frappe.session.user)
+	return result
+
+
+def write_statement_archive(rendered, year):
+	"""Write every statement into one zip archive; returns (file_url, count)"""
+	buffer = io.BytesIO()
+	count = 0
+	with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+		for _member, filename, html in rendered:
+			archive.writestr(filename, html)
+			count += 1
+
+	file_doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": f"giving-statements-{year}.zip",
+			"is_private": 1,
+			"content": buffer.getvalue(),
+		}
+	).insert(ignore_permissions=True)
+
+	return file_doc.file_url, count
+
+
+def write_member_statements(rendered):
+	"""Attach each statement to its Member as a private file"""
+	files = []
+	for member, filename, html in rendered:
+		file_doc = frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": filename,
+				"attached_to_doctype": "Member",
+				"attached_to_name": member,
+				"is_private": 1,
+				"content": html,
+			}
+		).insert(ignore_permissions=True)
+		files.append(file_doc.file_url)
+
+	return files
@@ -0,0 +1,116 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.api import expenses
+from stewardpro.stewardpro.api.expenses import (
+	bulk_process_expenses,
+	check_budgets,
+	get_ineligibility,
+	process_expenses,
+)
+from stewardpro.stewardpro.doctype.department_budget.budget_control import get_budget_availability
+from stewardpro.stewardpro.doctype.department_budget.budget_test_records import (
+	get_budget_amounts,
+	make_approver,
+	make_budget,
+	make_department,
+	make_expense,
+	make_item,
+)
+
+
+class TestBulkExpenses(FrappeTestCase):
+	def setUp(self):
+		department = make_department()
+		self.chairs = chairs = make_item(department, "_Test Chairs")
+		tables = make_item(department, "_Test Tables")
+		self.approver = make_approver().name
+
+		# 200 budgeted, 60 of it committed by the approved expense A
+		self.budget = make_budget(department, [(chairs, 1, 100), (tables, 1, 100)])
+		self.a = make_expense(self.budget, [(chairs, 1, 60)], status="Approved", approved_by=self.approver)
+		self.b = make_expense(self.budget, [(chairs, 1, 150)], status="Draft")
+		self.c = make_expense(self.budget, [(tables, 1, 100)], status="Draft")
+		self.expenses = [self.a, self.b, self.c]
+		self.addCleanup(frappe.clear_messages)
+
+	def check(self, action, enforced):
+		budgets = {self.budget.name: get_budget_availability(self.budget.name)}
+		with patch.object(expenses, "is_enforced", return_value=enforced):
+			accepted, messages = check_budgets(self.expenses, budgets, action)
+		return [expense.name for expense in accepted], list(messages)
+
+	def process(self, action, enforced=False):
+		# The job commits after every chunk; keep the test's transaction open
+		with (
+			patch.object(expenses, "is_enforced", return_value=enforced),
+			patch.object(frappe.db, "commit"),
+		):
+			summary = process_expenses(
+				[expense.name for expense in self.expenses], action, approved_by=self.approver
+			)
+		return {result["name"]: result["status"] for result in summary["results"]}
+
+	def test_enforced_submit_skips_expenses_over_budget(self):
+		# A releases its own commitment; B no longer fits, C still does
+		self.assertEqual(self.check("submit", enforced=True), ([self.a.name, self.c.name], [self.b.name]))
+
+	def test_unenforced_submit_only_warns(self):
+		self.assertEqual(
+			self.check("submit", enforced=False),
+			([self.a.name, self.b.name, self.c.name], [self.b.name, self.c.name]),
+		)
+
+	def test_approval_only_warns(self):
+		self.assertEqual(
+			self.check("approve", enforced=True),
+			([self.a.name, self.b.name, self.c.name], [self.b.name, self.c.name]),
+		)
+
+	def test_expense_without_budget_is_accepted(self):
+		self.expenses = [make_expense(self.budget, [(self.chairs, 100, 100)], budget_reference=None)]
+		self.assertEqual(self.check("submit", enforced=True), ([self.expenses[0].name], []))
+
+	def test_ineligibility(self):
+		self.assertIsNone(get_ineligibility(self.a, "submit"))
+		self.assertIsNone(get_ineligibility(self.b, "approve"))
+		self.assertTrue(get_ineligibility(self.a, "approve"))
+
+		self.b.status = "Rejected"
+		self.b.save()
+		self.assertTrue(get_ineligibility(self.b, "submit"))
+
+		self.c.submit()
+		self.assertTrue(get_ineligibility(self.c, "submit"))
+
+	def test_bulk_approval_commits_the_amounts(self):
+		self.assertEqual(
+			self.process("approve"),
+			{self.a.name: "skipped", self.b.name: "success", self.c.name: "success"},
+		)
+		self.assertEqual(frappe.db.get_value("Department Expense", self.b.name, "status"), "Approved")
+		self.assertEqual(get_budget_amounts(self.budget).committed_amount, 310)
+
+	def test_enforced_bulk_submit_applies_the_budget_once(self):
+		self.assertEqual(
+			self.process("submit", enforced=True),
+			{self.a.name: "success", self.b.name: "failed", self.c.name: "success"},
+		)
+		self.assertEqual(frappe.db.get_value("Department Expense", self.b.name, "docstatus"), 0)
+
+		amounts = get_budget_amounts(self.budget)
+		self.assertEqual((amounts.committed_amount, amounts.spent_amount), (0, 160))
+		self.assertEqual(amounts.lines[self.chairs.name].spent_amount, 60)
+
+	def test_request_validation(self):
+		self.assertRaises(frappe.ValidationError, bulk_process_expenses, [], "approve", "Administrator")
+		self.assertRaises(frappe.ValidationError, bulk_process_expenses, [self.a.name], "delete")
+		self.assertRaises(frappe.ValidationError, bulk_process_expenses, [self.a.name], "approve")
+		self.assertRaises(
+			frappe.ValidationError, bulk_process_expenses, [f"E{i}" for i in range(501)], "submit"
+		)
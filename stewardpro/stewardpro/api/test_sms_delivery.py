@@ -0,0 +1,102 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.api.sms import get_delivery_status, insert_sms_logs
+from stewardpro.stewardpro.api.sms_delivery import (
+	apply_delivery_reports,
+	parse_report,
+	process_delivery_reports,
+	queue_delivery_reports,
+)
+from stewardpro.stewardpro.utils import phone_numbers
+
+
+class TestDeliveryStatusMapping(FrappeTestCase):
+	def test_provider_statuses(self):
+		for provider_status, status in (
+			("DELIVERED", "Delivered"),
+			("DELIVRD", "Delivered"),
+			(" delivered ", "Delivered"),
+			("UNDELIVERED", "Failed"),
+			("UNDELIV", "Failed"),
+			("REJECTD", "Failed"),
+			("EXPIRED", "Expired"),
+			("ACCEPTD", "Sent"),
+			("PENDING", "Sent"),
+			("SOMETHING_NEW", "Unknown"),
+			(None, "Unknown"),
+		):
+			report = parse_report({"request_id": 7, "dest_addr": "255712345678", "status": provider_status})
+			self.assertEqual(report["status"], status, provider_status)
+
+	def test_report_fields(self):
+		self.assertEqual(
+			parse_report({"message_id": "abc", "msisdn": "0712345678", "status": "DELIVRD"}),
+			{"message_id": "abc", "receiver": "0712345678", "status": "Delivered"},
+		)
+
+	def test_incomplete_reports_are_ignored(self):
+		self.assertIsNone(parse_report({"dest_addr": "255712345678", "status": "DELIVERED"}))
+		self.assertIsNone(parse_report({"request_id": 7, "status": "DELIVERED"}))
+		self.assertIsNone(parse_report(["not", "a", "report"]))
+
+	def test_send_result_status(self):
+		self.assertEqual(get_delivery_status("Success"), "Sent")
+		self.assertEqual(get_delivery_status("Failed: Invalid number"), "Failed")
+
+
+class TestDeliveryReports(FrappeTestCase):
+	def setUp(self):
+		self.message_id = f"test-{frappe.generate_hash(length=8)}"
+		insert_sms_logs(
+			"Test",
+			[
+				{"phone": "+255712000001", "message": "Hi", "status": "Success", "provider_message_id": self.message_id},
+				{"phone": "+255712000002", "message": "Hi", "status": "Success", "provider_message_id": self.message_id},
+			],
+		)
+		patcher = patch.object(phone_numbers, "get_default_country_code", return_value="255")
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def get_status(self, receiver):
+		return frappe.db.get_value(
+			"SMS Log", {"provider_message_id": self.message_id, "receiver": receiver}, "delivery_status"
+		)
+
+	def report(self, receiver, status):
+		return {"message_id": self.message_id, "receiver": receiver, "status": status}
+
+	def test_reports_match_any_number_form(self):
+		apply_delivery_reports([self.report("0712000001", "Delivered"), self.report("255712000002", "Failed")])
+
+		self.assertEqual(self.get_status("+255712000001"), "Delivered")
+		self.assertEqual(self.get_status("+255712000002"), "Failed")
+
+	def test_late_sent_report_keeps_final_status(self):
+		apply_delivery_reports([self.report("+255712000001", "Delivered")])
+		apply_delivery_reports([self.report("+255712000001", "Sent")])
+
+		self.assertEqual(self.get_status("+255712000001"), "Delivered")
+
+	def test_latest_report_in_a_batch_wins(self):
+		apply_delivery_reports([self.report("+255712000001", "Sent"), self.report("+255712000001", "Expired")])
+
+		self.assertEqual(self.get_status("+255712000001"), "Expired")
+
+	def test_queued_reports_are_applied(self):
+		received = queue_delivery_reports(
+			[
+				{"request_id": self.message_id, "dest_addr": "255712000001", "status": "DELIVERED"},
+				{"status": "DELIVERED"},
+			]
+		)
+
+		self.assertEqual(received, 1)
+		self.assertGreaterEqual(process_delivery_reports(), 1)
+		self.assertEqual(self.get_status("+255712000001"), "Delivered")
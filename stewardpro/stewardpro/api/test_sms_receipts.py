@@ -0,0 +1,105 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.api import sms_receipts
+from stewardpro.stewardpro.api.sms_receipts import get_receipt_eligibility, send_receipts
+
+
+def make_member(contact="0712345678"):
+	return frappe.get_doc({
+		"doctype": "Member",
+		"full_name": f"_Test Receipt Member {frappe.generate_hash(length=6)}",
+		"contact": contact,
+	}).insert()
+
+
+def make_contribution(member, submit=True):
+	doc = frappe.get_doc({
+		"doctype": "Tithes and Offerings",
+		"member": member.name,
+		"memnber_name": member.full_name,
+		"date": frappe.utils.today(),
+		"tithe_amount": 100,
+		"offering_amount": 50,
+	}).insert()
+	if submit:
+		doc.submit()
+	return doc
+
+
+class TestBulkReceipts(FrappeTestCase):
+	def setUp(self):
+		frappe.flags.mute_sms = True
+		self.addCleanup(setattr, frappe.flags, "mute_sms", False)
+
+		self.member = make_member()
+		self.eligible = [make_contribution(self.member), make_contribution(self.member)]
+		self.draft = make_contribution(self.member, submit=False)
+
+		self.no_phone = make_contribution(make_member())
+		frappe.db.set_value("Member", self.no_phone.member, {"contact": "", "normalized_contact": None})
+
+		self.invalid_phone = make_contribution(make_member(contact="123"))
+
+		self.no_member = make_contribution(make_member())
+		self.no_member.db_set("member", "_Test Deleted Member")
+
+		self.all = [self.draft, self.no_phone, self.invalid_phone, self.no_member, *self.eligible]
+
+	def get_counts(self, result):
+		return {row["reason"]: row["count"] for row in result["ineligible"]}
+
+	def test_eligibility_of_selected_names(self):
+		result = get_receipt_eligibility(names=json.dumps([doc.name for doc in self.all]))
+
+		self.assertEqual(result["total"], 6)
+		self.assertEqual(result["eligible"], 2)
+		self.assertEqual(
+			self.get_counts(result),
+			{"not_submitted": 1, "no_phone": 1, "invalid_phone": 1, "no_member": 1},
+		)
+
+	def test_eligibility_of_list_filters(self):
+		filters = [["Tithes and Offerings", "member", "=", self.member.name]]
+		result = get_receipt_eligibility(filters=json.dumps(filters))
+
+		self.assertEqual(result["total"], 3)
+		self.assertEqual(result["eligible"], 2)
+		self.assertEqual(self.get_counts(result), {"not_submitted": 1})
+
+	def test_selection_is_required(self):
+		self.assertRaises(frappe.ValidationError, get_receipt_eligibility)
+
+	def test_only_sent_and_deferred_receipts_are_flagged(self):
+		sent = self.eligible[0]
+		failed = self.eligible[1]
+		deferred = make_contribution(self.member)
+
+		def dispatch(sms_type, messages, on_progress=None):
+			failed_messages = [entry for entry in messages if entry["reference"] == failed.name]
+			return {
+				"sms_type": sms_type,
+				"sent": 1,
+				"failed": len(failed_messages),
+				"deferred": 1,
+				"failed_messages": failed_messages,
+			}
+
+		with patch.object(sms_receipts, "dispatch_messages", side_effect=dispatch):
+			result = send_receipts([doc.name for doc in (*self.all, deferred)], "test_receipts")
+
+		self.assertEqual(result["failed"], 1)
+		flags = {
+			doc.name: frappe.db.get_value("Tithes and Offerings", doc.name, "receipt_sms_sent")
+			for doc in (sent, failed, deferred, self.draft, self.no_phone)
+		}
+		self.assertEqual(
+			flags,
+			{sent.name: 1, failed.name: 0, deferred.name: 1, self.draft.name: 0, self.no_phone.name: 0},
+		)
@@ -0,0 +1,85 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.api.sms_templates import (
+	GSM7,
+	UCS2,
+	SMSTemplate,
+	count_segments,
+	get_encoding,
+	to_gsm7,
+)
+
+
+class TestSegmentCounting(FrappeTestCase):
+	def test_encoding(self):
+		self.assertEqual(get_encoding("Receipt #12 Total: 5,000.00 @ church"), GSM7)
+		self.assertEqual(get_encoding("Price in € [approx]"), GSM7)
+		self.assertEqual(get_encoding("Asante Şükrü"), UCS2)
+		self.assertEqual(get_encoding("Thanks 🙏"), UCS2)
+
+	def test_gsm7_limits(self):
+		self.assertEqual(count_segments(""), 0)
+		self.assertEqual(count_segments("a" * 160), 1)
+		self.assertEqual(count_segments("a" * 161), 2)
+		self.assertEqual(count_segments("a" * 306), 2)
+		self.assertEqual(count_segments("a" * 307), 3)
+
+	def test_gsm7_extended_characters_take_two_units(self):
+		self.assertEqual(count_segments("€" * 80), 1)
+		self.assertEqual(count_segments("€" * 81), 2)
+
+	def test_escape_pair_is_not_split(self):
+		# 306 units would fit two parts, but the escape pair cannot straddle them
+		self.assertEqual(count_segments("a" * 152 + "€" + "a" * 152), 3)
+
+	def test_ucs2_limits(self):
+		self.assertEqual(count_segments("ş" * 70), 1)
+		self.assertEqual(count_segments("ş" * 71), 2)
+		self.assertEqual(count_segments("ş" * 134), 2)
+		self.assertEqual(count_segments("ş" * 135), 3)
+
+	def test_surrogate_pair_is_not_split(self):
+		self.assertEqual(count_segments("😀" * 35), 1)
+		self.assertEqual(count_segments("a" * 66 + "😀" + "a" * 66), 3)
+
+
+class TestSMSTemplate(FrappeTestCase):
+	def test_transliteration(self):
+		self.assertEqual(to_gsm7("O’Brien"), "O'Brien")
+		self.assertEqual(to_gsm7("Zoë – “Neema”"), 'Zoe - "Neema"')
+		self.assertEqual(to_gsm7("Şükrü"), "Sükrü")
+		# No GSM-7 equivalent, so the character is kept
+		self.assertEqual(to_gsm7("王"), "王")
+
+	def test_apostrophe_keeps_message_gsm7(self):
+		template = SMSTemplate("Thank you {member_name}!")
+		self.assertEqual(get_encoding(template.render({"member_name": "N’gwale"})), GSM7)
+
+	def test_first_fitting_variant_is_used(self):
+		template = SMSTemplate(["Dear {name}, " + "x" * 140, "Hi {name}"])
+		self.assertTrue(template.render({"name": "Ann"}).startswith("Dear Ann"))
+		self.assertEqual(template.render({"name": "A" * 20}), "Hi " + "A" * 20)
+
+	def test_truncates_when_no_variant_fits(self):
+		template = SMSTemplate(["Dear {name}, thank you!", "Hi {name}!"], truncate="name")
+		message = template.render({"name": "N" * 200})
+
+		self.assertEqual(count_segments(message), 1)
+		self.assertEqual(len(message), 160)
+		self.assertTrue(message.startswith("Hi NNN"))
+		self.assertTrue(message.endswith("...!"))
+
+	def test_max_segments(self):
+		template = SMSTemplate("{text}", truncate="text", max_segments=2)
+		self.assertEqual(count_segments(template.render({"text": "a" * 500})), 2)
+
+	def test_missing_values_render_empty(self):
+		template = SMSTemplate("Receipt #{receipt_number} for {member_name}")
+		self.assertEqual(template.render({"member_name": "Ann"}), "Receipt # for Ann")
+
+	def test_render_many_keeps_order(self):
+		template = SMSTemplate("Hi {name}")
+		self.assertEqual(template.render_many([{"name": "A"}, {"name": "B"}]), ["Hi A", "Hi B"])
@@ -0,0 +1,134 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.api import sms_throttle
+from stewardpro.stewardpro.api.sms_throttle import (
+	CIRCUIT_KEY,
+	CIRCUIT_TRIPPED_KEY,
+	RATE_LIMIT_KEY,
+	SERVER_ERROR_THRESHOLD,
+	acquire_send_tokens,
+	close_circuit,
+	get_open_circuit,
+	record_send_result,
+)
+
+
+class FakeClock:
+	"""Stands in for the ``time`` module; sleeping moves the clock on"""
+
+	def __init__(self, now=1_000_000.0):
+		self.now = now
+		self.slept = []
+
+	def time(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.slept.append(seconds)
+		self.now += seconds
+
+
+class TestTokenBucket(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(cache.make_key(RATE_LIMIT_KEY))
+		self.clock = FakeClock()
+		for patcher in (
+			patch.object(sms_throttle, "time", self.clock),
+			patch.object(sms_throttle, "get_messages_per_second", return_value=5),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def tearDown(self):
+		cache = frappe.cache()
+		cache.delete(cache.make_key(RATE_LIMIT_KEY))
+
+	def test_full_bucket_sends_without_waiting(self):
+		acquire_send_tokens(5)
+		self.assertEqual(self.clock.slept, [])
+
+	def test_empty_bucket_waits_for_the_refill(self):
+		acquire_send_tokens(5)
+		acquire_send_tokens(1)
+		self.assertAlmostEqual(sum(self.clock.slept), 0.2)
+
+	def test_large_batch_is_spread_over_seconds(self):
+		acquire_send_tokens(15)
+		self.assertAlmostEqual(sum(self.clock.slept), 2.0)
+
+	def test_idle_time_refills_up_to_capacity(self):
+		acquire_send_tokens(5)
+		self.clock.now += 60
+		acquire_send_tokens(5)
+		self.assertEqual(self.clock.slept, [])
+		acquire_send_tokens(1)
+		self.assertAlmostEqual(sum(self.clock.slept), 0.2)
+
+
+class TestCircuitBreaker(FrappeTestCase):
+	def setUp(self):
+		close_circuit()
+
+	def tearDown(self):
+		close_circuit()
+
+	def server_error(self):
+		return record_send_result({"success": False, "status_code": 503, "error": "Service unavailable"})
+
+	def test_opens_after_consecutive_server_errors(self):
+		for _i in range(SERVER_ERROR_THRESHOLD - 1):
+			self.assertFalse(self.server_error())
+		self.assertIsNone(get_open_circuit())
+
+		self.assertTrue(self.server_error())
+		self.assertIsNotNone(get_open_circuit())
+		self.assertEqual(frappe.db.get_single_value("StewardPro Settings", "sms_circuit_status"), "Open")
+
+	def test_success_resets_the_error_count(self):
+		for _i in range(SERVER_ERROR_THRESHOLD - 1):
+			self.server_error()
+		record_send_result({"success": True})
+		self.assertFalse(self.server_error())
+		self.assertIsNone(get_open_circuit())
+
+	def test_client_errors_are_not_counted(self):
+		for _i in range(SERVER_ERROR_THRESHOLD):
+			self.assertFalse(record_send_result({"success": False, "status_code": 400, "error": "Bad request"}))
+		self.assertIsNone(get_open_circuit())
+
+	def test_no_answer_counts_as_server_error(self):
+		for _i in range(SERVER_ERROR_THRESHOLD):
+			opened = record_send_result({"success": False, "status_code": None, "error": "Read timed out"})
+		self.assertTrue(opened)
+
+	def test_insufficient_balance_opens_at_once(self):
+		opened = record_send_result(
+			{"success": False, "status_code": 400, "error": "Insufficient balance. Current balance: 0.00 TZS"}
+		)
+		self.assertTrue(opened)
+		self.assertIsNotNone(get_open_circuit())
+
+	def test_successful_probe_closes_the_circuit(self):
+		record_send_result({"success": False, "error": "Insufficient balance"})
+		# The pause has run out, so the next send goes through as a probe
+		frappe.cache().delete_value(CIRCUIT_KEY)
+		self.assertTrue(frappe.cache().exists(CIRCUIT_TRIPPED_KEY))
+
+		record_send_result({"success": True})
+		self.assertFalse(frappe.cache().exists(CIRCUIT_TRIPPED_KEY))
+		self.assertEqual(frappe.db.get_single_value("StewardPro Settings", "sms_circuit_status"), "Closed")
+
+	def test_failed_probe_opens_the_circuit_again(self):
+		record_send_result({"success": False, "error": "Insufficient balance"})
+		frappe.cache().delete_value(CIRCUIT_KEY)
+		self.assertIsNone(get_open_circuit())
+
+		record_send_result({"success": False, "error": "Insufficient balance"})
+		self.assertIsNotNone(get_open_circuit())
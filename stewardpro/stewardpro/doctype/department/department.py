@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import nowdate, getdate
 
+from stewardpro.stewardpro.doctype.department_budget.budget_variance import clear_budget_variance_cache
+
 
 class Department(Document):
 	def validate(self):
@@ -27,6 +29,12 @@ class Department(Document):
 		"""Set default budget year if not provided"""
 		if not self.budget_year:
 			self.budget_year = getdate(nowdate()).year
+
+	def on_update(self):
+		"""Budget variance rows carry the department name and only cover active departments"""
+		if self.has_value_changed("department_name") or self.has_value_changed("is_active") or self.has_value_changed("department_code"):
+			budgets = frappe.get_all("Department Budget", filters={"department": self.name}, pluck="name")
+			frappe.db.after_commit.add(lambda: clear_budget_variance_cache(*budgets))
 			
 	def get_child_departments(self):
 		"""Get all child departments"""
@@ -0,0 +1,181 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Budget availability checks and atomic spent / committed updates for Department Expenses.
+
+The stored ``spent_amount`` / ``remaining_amount`` of a budget and its items are the
+running figures, and ``committed_amount`` holds what Pending Approval and Approved
+expenses will spend once submitted (kept current by applying the change on every
+save); validation reads them with one primary key lookup instead of summing
+expenses. On submit and cancel the budget row is locked with
+``SELECT ... FOR UPDATE`` before the check and the increments, so two expenses
+submitted at the same time against the same budget are serialized. With
+"Enforce Budget Limits" enabled in StewardPro Settings an expense exceeding the
+remaining budget is rejected; otherwise the user only gets a warning.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.utils import flt, fmt_money
+
+AVAILABILITY_FIELDS = ["name", "department", "is_active", "total_budget_amount", "spent_amount", "committed_amount"]
+
+# Expense statuses whose amounts are committed against the budget until submit
+COMMITTED_STATUSES = ("Pending Approval", "Approved")
+
+
+def is_enforced():
+	return bool(frappe.db.get_single_value("StewardPro Settings", "enforce_budget_limits", cache=True))
+
+
+def get_budget_availability(budget_reference, for_update=False):
+	"""Stored totals of a budget and the amount neither spent nor committed, or None"""
+	budget = frappe.db.get_value(
+		"Department Budget", budget_reference, AVAILABILITY_FIELDS, as_dict=True, for_update=for_update
+	)
+	if budget:
+		budget.available_amount = (
+			flt(budget.total_budget_amount) - flt(budget.spent_amount) - flt(budget.committed_amount)
+		)
+	return budget
+
+
+@frappe.whitelist()
+def get_budget_position(budget_reference):
+	"""Total, spent, committed and available amounts of a budget for the expense form"""
+	frappe.has_permission("Department Budget", "read", doc=budget_reference, throw=True)
+	return get_budget_availability(budget_reference)
+
+
+def check_budget_availability(budget, amount, enforce=None):
+	"""Warn, or throw when limits are enforced, if ``amount`` exceeds the available budget"""
+	if flt(amount) <= flt(budget.available_amount):
+		return
+
+	message = _("This expense ({0}) exceeds the remaining budget ({1}) of {2}").format(
+		fmt_money(amount), fmt_money(budget.available_amount), budget.name
+	)
+	if enforce is None:
+		enforce = is_enforced()
+	if enforce:
+		frappe.throw(message, title=_("Budget Exceeded"))
+	frappe.msgprint(_("Warning: {0}").format(message), alert=True)
+
+
+def apply_expense_to_budget(expense, sign=1):
+	"""Add (sign=1) or remove (sign=-1) a submitted expense from its budget's spent amounts"""
+	budget = get_budget_availability(expense.budget_reference, for_update=True)
+	if not budget:
+		return
+
+	if sign > 0:
+		# Re-checked under the row lock: concurrent submits see each other's spend
+		check_budget_availability(budget, expense.total_amount)
+
+	item_amounts = get_item_amounts(expense)
+	increment_budget_amounts(budget.name, {item: sign * amount for item, amount in item_amounts.items()}, "spent_amount")
+
+
+def get_expense_commitment(expense):
+	"""{(budget, item): amount} an unsubmitted Pending Approval / Approved expense holds"""
+	if (
+		not expense
+		or expense.docstatus != 0
+		or expense.status not in COMMITTED_STATUSES
+		or not expense.budget_reference
+	):
+		return {}
+
+	return {(expense.budget_reference, item): amount for item, amount in get_item_amounts(expense).items()}
+
+
+def update_budget_commitment(expense, previous=None, release=False):
+	"""Apply the change in committed amounts between ``previous`` and ``expense``.
+
+	``release`` drops whatever ``expense`` itself held (used when it is deleted).
+	"""
+	if release:
+		deltas = get_commitment_deltas(None, expense)
+	else:
+		deltas = get_commitment_deltas(expense, previous)
+
+	apply_budget_deltas(deltas, "committed_amount")
+
+
+def get_commitment_deltas(expense, previous=None, deltas=None):
+	"""Add the change in commitment from ``previous`` to ``expense`` into {budget: {item: delta}}"""
+	deltas = {} if deltas is None else deltas
+	current, before = get_expense_commitment(expense), get_expense_commitment(previous)
+
+	for key in set(current) | set(before):
+		delta = current.get(key, 0) - before.get(key, 0)
+		if delta:
+			budget, item = key
+			items = deltas.setdefault(budget, {})
+			items[item] = items.get(item, 0) + delta
+
+	return deltas
+
+
+def apply_budget_deltas(deltas, fieldname):
+	"""Increment ``fieldname`` for every budget in {budget: {item: delta}}, one budget at a time"""
+	for budget in sorted(deltas):
+		# Budgets are always locked in name order, so concurrent updates cannot deadlock
+		if get_budget_availability(budget, for_update=True):
+			increment_budget_amounts(budget, deltas[budget], fieldname)
+
+
+def get_item_amounts(expense):
+	item_amounts = {}
+	for detail in expense.expense_details:
+		if detail.item:
+			item_amounts[detail.item] = item_amounts.get(detail.item, 0) + flt(detail.amount)
+	return item_amounts
+
+
+def increment_budget_amounts(budget_name, item_deltas, fieldname):
+	"""Atomically add per-item deltas to ``fieldname`` of the budget lines and the budget.
+
+	Each item's delta goes to its first budget line, as the budget form shows it;
+	items without a budget line are not counted against the budget.
+	"""
+	item_deltas = {item: delta for item, delta in item_deltas.items() if delta}
+	if not item_deltas:
+		return
+
+	budget_lines = {}
+	for line in frappe.get_all(
+		"Department Budget Item",
+		filters={"parent": budget_name, "parenttype": "Department Budget", "item": ["in", list(item_deltas)]},
+		fields=["name", "item"],
+		order_by="idx",
+	):
+		budget_lines.setdefault(line.item, line.name)
+
+	BudgetItem = DocType("Department Budget Item")
+	total_delta = 0
+	for item, line_name in budget_lines.items():
+		delta = item_deltas[item]
+		total_delta += delta
+		query = (
+			frappe.qb.update(BudgetItem)
+			.set(BudgetItem[fieldname], BudgetItem[fieldname] + delta)
+			.where(BudgetItem.name == line_name)
+		)
+		if fieldname == "spent_amount":
+			query = query.set(BudgetItem.remaining_amount, BudgetItem.remaining_amount - delta)
+		query.run()
+
+	if total_delta:
+		DepartmentBudget = DocType("Department Budget")
+		query = (
+			frappe.qb.update(DepartmentBudget)
+			.set(DepartmentBudget[fieldname], DepartmentBudget[fieldname] + total_delta)
+			.set(DepartmentBudget.modified, frappe.utils.now())
+			.where(DepartmentBudget.name == budget_name)
+		)
+		if fieldname == "spent_amount":
+			query = query.set(DepartmentBudget.remaining_amount, DepartmentBudget.remaining_amount - total_delta)
+		query.run()
+		frappe.clear_document_cache("Department Budget", budget_name)
@@ -0,0 +1,105 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Sum
+from frappe.utils import flt
+
+BUDGET_ITEMS_CACHE_KEY = "stewardpro:budget_items"
+
+
+def get_budget_items(budget_reference):
+	"""Budget lines with item names, live spent/remaining and committed amounts, cached per budget"""
+	if not budget_reference:
+		return []
+
+	cache = frappe.cache()
+	budget_items = cache.hget(BUDGET_ITEMS_CACHE_KEY, budget_reference)
+	if budget_items is None:
+		budget_items = build_budget_items(budget_reference)
+		cache.hset(BUDGET_ITEMS_CACHE_KEY, budget_reference, budget_items)
+
+	return budget_items
+
+
+def build_budget_items(budget_reference):
+	BudgetItem = DocType("Department Budget Item")
+	Item = DocType("Item")
+
+	rows = (
+		frappe.qb.from_(BudgetItem)
+		.left_join(Item)
+		.on(Item.name == BudgetItem.item)
+		.select(
+			BudgetItem.name,
+			BudgetItem.item,
+			Coalesce(Item.item_name, BudgetItem.item).as_("item_name"),
+			BudgetItem.description,
+			BudgetItem.quantity,
+			BudgetItem.unit_price,
+			BudgetItem.budgeted_amount,
+			BudgetItem.committed_amount,
+		)
+		.where(BudgetItem.parent == budget_reference)
+		.where(BudgetItem.parenttype == "Department Budget")
+		.orderby(BudgetItem.idx)
+	).run(as_dict=True)
+
+	spent = get_spent_by_item(budget_reference)
+	# An item's spending belongs to its first budget line, as in increment_budget_amounts
+	spent_lines = {}
+	for row in rows:
+		spent_lines.setdefault(row.item, row.name)
+
+	budget_items = []
+	for row in rows:
+		spent_amount = spent.get(row.item, 0) if spent_lines.get(row.item) == row.name else 0
+		budget_items.append({
+			"item": row.item,
+			"item_name": row.item_name,
+			"description": row.description,
+			"quantity": row.quantity,
+			"unit_price": row.unit_price,
+			"budgeted_amount": row.budgeted_amount,
+			"spent_amount": spent_amount,
+			"remaining_amount": flt(row.budgeted_amount) - spent_amount,
+			"committed_amount": flt(row.committed_amount),
+			"available_amount": flt(row.budgeted_amount) - spent_amount - flt(row.committed_amount)
+		})
+
+	return budget_items
+
+
+def get_spent_by_item(budget_reference):
+	"""Submitted expense amounts per item for a budget, aggregated in the database"""
+	Expense = DocType("Department Expense")
+	ExpenseDetail = DocType("Department Expense Detail")
+
+	rows = (
+		frappe.qb.from_(ExpenseDetail)
+		.inner_join(Expense)
+		.on(Expense.name == ExpenseDetail.parent)
+		.select(ExpenseDetail.item, Sum(ExpenseDetail.amount))
+		.where(Expense.budget_reference == budget_reference)
+		.where(Expense.docstatus == 1)
+		.groupby(ExpenseDetail.item)
+	).run()
+
+	return {item: flt(amount) for item, amount in rows}
+
+
+def get_budgets_with_item(item):
+	"""Department Budgets that have a line for ``item``"""
+	return frappe.get_all(
+		"Department Budget Item",
+		filters={"item": item, "parenttype": "Department Budget"},
+		pluck="parent",
+		distinct=True,
+	)
+
+
+def clear_budget_items_cache(*budget_references):
+	budget_references = [budget for budget in budget_references if budget]
+	if budget_references:
+		frappe.cache().hdel(BUDGET_ITEMS_CACHE_KEY, *budget_references)
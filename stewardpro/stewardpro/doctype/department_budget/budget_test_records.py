@@ -0,0 +1,103 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+"""Budgets, items and expenses for the budget control and bulk expense tests"""
+
+import frappe
+
+TEST_FISCAL_YEAR = "2088"
+
+
+def get_test_fiscal_year():
+	# Far future year, clear of real Fiscal Years and of the 209x years the Fiscal Year tests delete
+	if not frappe.db.exists("Fiscal Year", TEST_FISCAL_YEAR):
+		frappe.get_doc({
+			"doctype": "Fiscal Year",
+			"year": TEST_FISCAL_YEAR,
+			"year_start_date": f"{TEST_FISCAL_YEAR}-01-01",
+			"year_end_date": f"{TEST_FISCAL_YEAR}-12-31",
+		}).insert()
+	return TEST_FISCAL_YEAR
+
+
+def make_department():
+	code = frappe.generate_hash(length=6).upper()
+	return frappe.get_doc({
+		"doctype": "Department",
+		"department_name": f"_Test Budget Department {code}",
+		"department_code": code,
+	}).insert()
+
+
+def make_item(department, item_name, standard_cost=100):
+	return frappe.get_doc({
+		"doctype": "Item",
+		"item_name": item_name,
+		"department": department.name,
+		"unit_of_measure": "Nos",
+		"standard_cost": standard_cost,
+	}).insert()
+
+
+def make_budget(department, lines):
+	"""A submitted, active budget; ``lines`` are (item, quantity, unit_price)"""
+	budget = frappe.get_doc({
+		"doctype": "Department Budget",
+		"department": department.name,
+		"fiscal_year": get_test_fiscal_year(),
+		"is_active": 1,
+		"budget_items": [
+			{"item": item.name, "quantity": quantity, "unit_price": unit_price}
+			for item, quantity, unit_price in lines
+		],
+	}).insert()
+	budget.submit()
+	return budget
+
+
+def make_approver():
+	return frappe.get_doc({
+		"doctype": "Member",
+		"full_name": f"_Test Budget Approver {frappe.generate_hash(length=6)}",
+		"contact": "0712345678",
+	}).insert()
+
+
+def make_expense(budget, lines, status="Pending Approval", **values):
+	"""A draft expense against ``budget``; ``lines`` are (item, quantity, unit_price)"""
+	return frappe.get_doc({
+		"doctype": "Department Expense",
+		"naming_series": "EXP-.YYYY.-",
+		"expense_date": frappe.utils.today(),
+		"department": budget.department,
+		"budget_reference": budget.name,
+		"payment_mode": "Cash",
+		"status": status,
+		"expense_details": [
+			{
+				"item": item.name,
+				"expense_category": "Equipment",
+				"expense_description": item.item_name,
+				"quantity": quantity,
+				"unit_price": unit_price,
+			}
+			for item, quantity, unit_price in lines
+		],
+		**values,
+	}).insert()
+
+
+def get_budget_amounts(budget):
+	"""Stored committed and spent amounts of the budget and of each item's line"""
+	amounts = frappe.db.get_value(
+		"Department Budget", budget.name, ["committed_amount", "spent_amount"], as_dict=True
+	)
+	amounts.lines = {
+		line.item: line
+		for line in frappe.get_all(
+			"Department Budget Item",
+			filters={"parent": budget.name, "parenttype": "Department Budget"},
+			fields=["item", "committed_amount", "spent_amount"],
+		)
+	}
+	return amounts
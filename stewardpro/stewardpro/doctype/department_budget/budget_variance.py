@@ -0,0 +1,311 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Budget vs actual variance per budget and per budget line.
+
+Budgeted amounts come from ``Department Budget Item`` grouped by (budget, item) and
+actuals from submitted ``Department Expense Detail`` rows grouped by (budget, item,
+expense_category) - one aggregate query each, whatever the number of budgets. The
+merged dataset holds both the per-budget summary and the per-item lines (with their
+category split and the amounts committed by unsubmitted expenses), so both report
+views read the same numbers. It is cached per (fiscal_year, department); a change
+to a budget or its expenses drops only the datasets that budget appears in.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Count, Sum
+from frappe.utils import flt
+
+from stewardpro.stewardpro.doctype.department_budget.budget_items import get_budgets_with_item
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import get_fiscal_year_dates
+
+BUDGET_VARIANCE_CACHE_KEY = "stewardpro:budget_variance"
+
+UNBUDGETED = "Unbudgeted"
+
+
+def get_variance_dataset(filters):
+	"""{"budgets": [...], "lines": [...]} for the fiscal_year / department filters"""
+	fiscal_year = filters.get("fiscal_year") or None
+	department = filters.get("department") or None
+	key = json.dumps([fiscal_year, department])
+
+	cache = frappe.cache()
+	dataset = cache.hget(BUDGET_VARIANCE_CACHE_KEY, key)
+	if dataset is None:
+		dataset = build_variance_dataset(fiscal_year, department)
+		cache.hset(BUDGET_VARIANCE_CACHE_KEY, key, dataset)
+
+	return dataset
+
+
+def build_variance_dataset(fiscal_year=None, department=None):
+	budgets = get_budgets(fiscal_year, department)
+	if not budgets:
+		return {"budgets": [], "lines": []}
+
+	names = [budget.budget_name for budget in budgets]
+	budgeted = get_budgeted_by_item(names)
+	actuals = get_actual_by_item_and_category(names, get_fiscal_year_dates(fiscal_year))
+
+	lines = {}
+	for row in budgeted:
+		key = (row.budget, row.item or None)
+		line = lines.get(key)
+		if not line:
+			line = lines[key] = make_line(row.budget, row.item, row.item_name)
+		line["allocated_amount"] += flt(row.budgeted_amount)
+		line["committed_amount"] += flt(row.committed_amount)
+
+	for row in actuals:
+		key = (row.budget, row.item or None)
+		line = lines.get(key)
+		if not line:
+			line = lines[key] = make_line(row.budget, row.item, row.item_name)
+		amount = flt(row.actual_amount)
+		line["actual_expenses"] += amount
+		line["categories"].append({
+			"expense_category": row.expense_category,
+			"actual_expenses": amount,
+			"expense_count": row.expense_count,
+		})
+
+	budget_map = {budget.budget_name: budget for budget in budgets}
+	for budget in budgets:
+		budget["actual_expenses"] = 0
+
+	line_list = []
+	for (budget_name, _item), line in lines.items():
+		budget = budget_map[budget_name]
+		budget["actual_expenses"] += line["actual_expenses"]
+		line.update({
+			"department": budget.department,
+			"department_name": budget.department_name,
+			"department_code": budget.department_code,
+			"fiscal_year": budget.fiscal_year,
+		})
+		set_variance(line)
+		if not line["allocated_amount"] and line["actual_expenses"]:
+			line["status"] = UNBUDGETED
+		line_list.append(line)
+
+	for budget in budgets:
+		set_variance(budget)
+
+	# Lines in report order: department, then budget, then item
+	order = {budget.budget_name: position for position, budget in enumerate(budgets)}
+	line_list.sort(key=lambda line: (order[line["budget_name"]], line["item_name"] or ""))
+
+	return {"budgets": budgets, "lines": line_list}
+
+
+def make_line(budget, item, item_name):
+	return {
+		"budget_name": budget,
+		"item": item or None,
+		"item_name": item_name or item or _("No Item"),
+		"allocated_amount": 0,
+		"actual_expenses": 0,
+		"committed_amount": 0,
+		"categories": [],
+	}
+
+
+def set_variance(row):
+	allocated = flt(row.get("allocated_amount"))
+	actual = flt(row.get("actual_expenses"))
+	utilization = (actual / allocated * 100) if allocated > 0 else 0
+	row.update({
+		"balance": allocated - actual,
+		"available_amount": allocated - actual - flt(row.get("committed_amount")),
+		"utilization_percentage": utilization,
+		"status": get_utilization_status(utilization),
+	})
+
+
+def get_utilization_status(utilization_percentage):
+	if utilization_percentage > 100:
+		return "Over Budget"
+	elif utilization_percentage > 90:
+		return "Near Limit"
+	elif utilization_percentage > 50:
+		return "On Track"
+	return "Under Utilized"
+
+
+def get_budgets(fiscal_year=None, department=None):
+	DepartmentBudget = DocType("Department Budget")
+	Department = DocType("Department")
+
+	query = (
+		frappe.qb.from_(DepartmentBudget)
+		.left_join(Department)
+		.on(DepartmentBudget.department == Department.name)
+		.select(
+			DepartmentBudget.department,
+			Department.department_name,
+			Department.department_code,
+			DepartmentBudget.total_budget_amount.as_("allocated_amount"),
+			DepartmentBudget.committed_amount,
+			DepartmentBudget.fiscal_year,
+			DepartmentBudget.name.as_("budget_name"),
+		)
+		.where(DepartmentBudget.docstatus >= 0)
+		.where(Department.is_active == 1)
+		.orderby(Department.department_name)
+		.orderby(DepartmentBudget.name)
+	)
+
+	if fiscal_year:
+		query = query.where(DepartmentBudget.fiscal_year == fiscal_year)
+	if department:
+		query = query.where(DepartmentBudget.department == department)
+
+	return query.run(as_dict=True)
+
+
+def get_budgeted_by_item(budgets):
+	BudgetItem = DocType("Department Budget Item")
+	Item = DocType("Item")
+
+	return (
+		frappe.qb.from_(BudgetItem)
+		.left_join(Item)
+		.on(Item.name == BudgetItem.item)
+		.select(
+			BudgetItem.parent.as_("budget"),
+			BudgetItem.item,
+			Coalesce(Item.item_name, BudgetItem.item).as_("item_name"),
+			Sum(BudgetItem.budgeted_amount).as_("budgeted_amount"),
+			Sum(BudgetItem.committed_amount).as_("committed_amount"),
+		)
+		.where(BudgetItem.parenttype == "Department Budget")
+		.where(BudgetItem.parent.isin(budgets))
+		.groupby(BudgetItem.parent, BudgetItem.item, Item.item_name)
+	).run(as_dict=True)
+
+
+def get_actual_by_item_and_category(budgets, date_range=None):
+	Expense = DocType("Department Expense")
+	ExpenseDetail = DocType("Department Expense Detail")
+	Item = DocType("Item")
+
+	query = (
+		frappe.qb.from_(ExpenseDetail)
+		.inner_join(Expense)
+		.on(Expense.name == ExpenseDetail.parent)
+		.left_join(Item)
+		.on(Item.name == ExpenseDetail.item)
+		.select(
+			Expense.budget_reference.as_("budget"),
+			ExpenseDetail.item,
+			Coalesce(Item.item_name, ExpenseDetail.item).as_("item_name"),
+			ExpenseDetail.expense_category,
+			Sum(ExpenseDetail.amount).as_("actual_amount"),
+			Count(Expense.name.distinct()).as_("expense_count"),
+		)
+		.where(ExpenseDetail.parenttype == "Department Expense")
+		.where(Expense.docstatus == 1)
+		.where(Expense.budget_reference.isin(budgets))
+		.groupby(Expense.budget_reference, ExpenseDetail.item, Item.item_name, ExpenseDetail.expense_category)
+	)
+
+	if date_range:
+		query = query.where(Expense.expense_date[date_range[0] : date_range[1]])
+
+	return query.run(as_dict=True)
+
+
+@frappe.whitelist()
+def get_variance_drilldown(budget, item=None, expense_category=None, fiscal_year=None):
+	"""Submitted expense detail rows behind one budget line (or one of its categories)"""
+	frappe.has_permission("Department Budget", "read", doc=budget, throw=True)
+
+	Expense = DocType("Department Expense")
+	ExpenseDetail = DocType("Department Expense Detail")
+
+	query = (
+		frappe.qb.from_(ExpenseDetail)
+		.inner_join(Expense)
+		.on(Expense.name == ExpenseDetail.parent)
+		.select(
+			Expense.name.as_("expense"),
+			Expense.expense_date,
+			Expense.status,
+			ExpenseDetail.item,
+			ExpenseDetail.expense_category,
+			ExpenseDetail.expense_description,
+			ExpenseDetail.quantity,
+			ExpenseDetail.unit_price,
+			ExpenseDetail.amount,
+		)
+		.where(ExpenseDetail.parenttype == "Department Expense")
+		.where(Expense.docstatus == 1)
+		.where(Expense.budget_reference == budget)
+		.orderby(Expense.expense_date, order=frappe.qb.desc)
+		.orderby(Expense.name)
+	)
+
+	# An empty item selects the lines recorded without an item
+	if item:
+		query = query.where(ExpenseDetail.item == item)
+	else:
+		query = query.where(ExpenseDetail.item.isnull() | (ExpenseDetail.item == ""))
+	if expense_category:
+		query = query.where(ExpenseDetail.expense_category == expense_category)
+
+	date_range = get_fiscal_year_dates(fiscal_year)
+	if date_range:
+		query = query.where(Expense.expense_date[date_range[0] : date_range[1]])
+
+	return query.run(as_dict=True)
+
+
+def get_budgets_using_item(item):
+	"""Budgets with a line for ``item`` or a submitted expense for it"""
+	Expense = DocType("Department Expense")
+	ExpenseDetail = DocType("Department Expense Detail")
+
+	budgets = set(get_budgets_with_item(item))
+	budgets.update(
+		budget
+		for (budget,) in (
+			frappe.qb.from_(ExpenseDetail)
+			.inner_join(Expense)
+			.on(Expense.name == ExpenseDetail.parent)
+			.select(Expense.budget_reference)
+			.distinct()
+			.where(ExpenseDetail.parenttype == "Department Expense")
+			.where(ExpenseDetail.item == item)
+			.where(Expense.budget_reference.isnotnull())
+		).run()
+	)
+	return list(budgets)
+
+
+def clear_budget_variance_cache(*budgets):
+	"""Drop the cached datasets that include any of ``budgets``"""
+	budgets = [budget for budget in budgets if budget]
+	if budgets:
+		clear_budget_variance_scopes(
+			frappe.get_all(
+				"Department Budget", filters={"name": ["in", budgets]}, fields=["fiscal_year", "department"]
+			)
+		)
+
+
+def clear_budget_variance_scopes(scopes):
+	"""Drop the cached datasets of (fiscal_year, department) scopes and of the filters they fall under"""
+	keys = {
+		json.dumps([fiscal_year, department])
+		for scope in scopes
+		if scope
+		for fiscal_year in dict.fromkeys([scope.fiscal_year or None, None])
+		for department in dict.fromkeys([scope.department or None, None])
+	}
+	if keys:
+		frappe.cache().hdel(BUDGET_VARIANCE_CACHE_KEY, *keys)
@@ -5,6 +5,8 @@ frappe.ui.form.on("Department Budget", {
 	refresh: function(frm) {
 		// Set item filter for budget items table
 		set_item_filter_for_budget_items(frm);
+
+		stewardpro.profiler.add_button(frm);
 	},
 
 	department: function(frm) {
@@ -22,7 +24,7 @@ frappe.ui.form.on("Department Budget Item", {
 		// Auto-populate cost and description when item is selected
 		let row = locals[cdt][cdn];
 		if (row.item) {
-			frappe.db.get_value('Item', row.item, ['standard_cost', 'description'], function(r) {
+			stewardpro.item_catalog.find(frm.doc.department, row.item).then(function(r) {
 				if (r) {
 					if (r.standard_cost && !row.unit_price) {
 						frappe.model.set_value(cdt, cdn, 'unit_price', r.standard_cost);
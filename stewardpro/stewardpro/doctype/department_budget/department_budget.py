@@ -4,6 +4,11 @@
 import frappe
 from frappe.model.document import Document
 
+from stewardpro.stewardpro.doctype.department_budget.budget_items import clear_budget_items_cache
+from stewardpro.stewardpro.doctype.department_budget.budget_variance import clear_budget_variance_scopes
+from stewardpro.stewardpro.doctype.item.item import get_item_departments
+from stewardpro.stewardpro.utils.profiling import profiled
+
 
 class DepartmentBudget(Document):
 
@@ -11,10 +16,31 @@ class DepartmentBudget(Document):
 		"""Validate Department Budget"""
 		self.calculate_total_budget_amount()
 		self.calculate_allocated_amount()
+		self.load_stored_amounts()
 		self.calculate_spent_amount()
 		self.calculate_remaining_amount()
 		self.validate_budget_items()
+		self.validate_item_departments()
 	
+	def get_item_departments(self):
+		"""Departments of every item in budget_items, fetched in one query per save"""
+		if self.flags.item_departments is None:
+			self.flags.item_departments = get_item_departments([row.item for row in self.budget_items])
+		return self.flags.item_departments
+
+	@profiled
+	def validate_item_departments(self):
+		"""Validate that all items belong to the budget department"""
+		self.flags.item_departments = None
+		if not self.department:
+			return
+
+		item_departments = self.get_item_departments()
+		for row in self.budget_items:
+			if row.item and item_departments.get(row.item) != self.department:
+				frappe.throw(f"Item '{row.item}' belongs to department '{item_departments.get(row.item)}' but this budget is for department '{self.department}'")
+
+	@profiled
 	def calculate_total_budget_amount(self):
 		"""Calculate total budget amount from budget items"""
 		total = 0
@@ -24,6 +50,7 @@ class DepartmentBudget(Document):
 
 		self.total_budget_amount = total
 
+	@profiled
 	def calculate_allocated_amount(self):
 		"""Calculate total allocated amount from budget items"""
 		total = 0
@@ -33,6 +60,7 @@ class DepartmentBudget(Document):
 		
 		self.allocated_amount = total
 	
+	@profiled
 	def calculate_spent_amount(self):
 		"""Calculate total spent amount from expenses"""
 		# This will be calculated from Expense doctype when implemented
@@ -43,10 +71,43 @@ class DepartmentBudget(Document):
 		
 		self.spent_amount = total
 	
+	@profiled
+	def load_stored_amounts(self):
+		"""Take spent and committed amounts from the database, not from the (possibly stale) form.
+
+		Expenses keep them current with atomic increments under the budget row lock;
+		the lock is taken here too, so an increment cannot land between this read
+		and the write of the save. Only the backfill patch derives them.
+		"""
+		if self.is_new():
+			self.committed_amount = 0
+			for item in self.budget_items:
+				item.spent_amount = 0
+				item.committed_amount = 0
+			return
+
+		self.committed_amount = frappe.db.get_value(
+			"Department Budget", self.name, "committed_amount", for_update=True
+		) or 0
+		stored = {
+			row.name: row
+			for row in frappe.get_all(
+				"Department Budget Item",
+				filters={"parent": self.name, "parenttype": "Department Budget"},
+				fields=["name", "spent_amount", "committed_amount"],
+			)
+		}
+		for item in self.budget_items:
+			row = stored.get(item.name)
+			item.spent_amount = row.spent_amount if row else 0
+			item.committed_amount = row.committed_amount if row else 0
+
+	@profiled
 	def calculate_remaining_amount(self):
 		"""Calculate remaining budget amount"""
 		self.remaining_amount = self.total_budget_amount - self.spent_amount
 	
+	@profiled
 	def validate_budget_items(self):
 		"""Validate budget items"""
 		if not self.budget_items:
@@ -85,4 +146,22 @@ class DepartmentBudget(Document):
 	def on_submit(self):
 		"""Actions on submit"""
 		self.is_active = 1
+
+	def on_change(self):
+		"""Drop the cached budget lines and variance after any save, submit or cancel"""
+		# The datasets of the previous fiscal year and department too, if they changed
+		self.clear_caches_after_commit([self, self.get_doc_before_save()])
+
+	def on_trash(self):
+		self.clear_caches_after_commit([self])
+
+	def clear_caches_after_commit(self, scopes):
+		name = self.name
+
+		def clear_caches():
+			clear_budget_items_cache(name)
+			clear_budget_variance_scopes(scopes)
+
+		# Cleared earlier, a concurrent read could cache the uncommitted figures again
+		frappe.db.after_commit.add(clear_caches)
 	
\ No newline at end of file
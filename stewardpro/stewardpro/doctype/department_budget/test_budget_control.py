@@ -0,0 +1,113 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.doctype.department_budget import budget_control
+from stewardpro.stewardpro.doctype.department_budget.budget_test_records import (
+	get_budget_amounts,
+	make_approver,
+	make_budget,
+	make_department,
+	make_expense,
+	make_item,
+)
+
+
+class TestBudgetControl(FrappeTestCase):
+	def setUp(self):
+		self.department = make_department()
+		self.chairs = make_item(self.department, "_Test Chairs")
+		self.tables = make_item(self.department, "_Test Tables")
+		# 1000 for chairs and 500 for tables
+		self.budget = make_budget(self.department, [(self.chairs, 10, 100), (self.tables, 5, 100)])
+		self.addCleanup(frappe.clear_messages)
+
+	def assertAmounts(self, committed, spent, chairs=None):
+		"""Budget totals, and (committed, spent) of the chairs line when given"""
+		amounts = get_budget_amounts(self.budget)
+		self.assertEqual((amounts.committed_amount, amounts.spent_amount), (committed, spent))
+		if chairs is not None:
+			line = amounts.lines[self.chairs.name]
+			self.assertEqual((line.committed_amount, line.spent_amount), chairs)
+
+	def enforced(self, enforce=True):
+		return patch.object(budget_control, "is_enforced", return_value=enforce)
+
+	def test_draft_commits_nothing(self):
+		make_expense(self.budget, [(self.chairs, 2, 100)], status="Draft")
+		self.assertAmounts(0, 0)
+
+	def test_pending_approval_commits_the_amounts(self):
+		make_expense(self.budget, [(self.chairs, 2, 100), (self.tables, 1, 50)])
+		self.assertAmounts(250, 0, chairs=(200, 0))
+
+	def test_approval_and_edits_commit_only_the_difference(self):
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)])
+
+		expense.status = "Approved"
+		expense.approved_by = make_approver().name
+		expense.save()
+		self.assertAmounts(200, 0, chairs=(200, 0))
+
+		expense.expense_details[0].quantity = 3
+		expense.save()
+		self.assertAmounts(300, 0, chairs=(300, 0))
+
+	def test_rejection_releases_the_commitment(self):
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)])
+		expense.status = "Rejected"
+		expense.save()
+		self.assertAmounts(0, 0, chairs=(0, 0))
+
+	def test_submit_moves_the_commitment_to_spent(self):
+		make_expense(self.budget, [(self.tables, 1, 100)])
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)])
+		self.assertAmounts(300, 0, chairs=(200, 0))
+
+		# Released once: only the other expense's commitment is left
+		expense.submit()
+		self.assertAmounts(100, 200, chairs=(0, 200))
+
+	def test_submit_approved_expense(self):
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)], status="Approved", approved_by=make_approver().name)
+		expense.submit()
+		self.assertAmounts(0, 200, chairs=(0, 200))
+
+	def test_cancel_reverses_the_spend(self):
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)])
+		expense.submit()
+		expense.cancel()
+		self.assertAmounts(0, 0, chairs=(0, 0))
+
+	def test_deleting_a_draft_releases_the_commitment(self):
+		expense = make_expense(self.budget, [(self.chairs, 2, 100)])
+		expense.delete()
+		self.assertAmounts(0, 0, chairs=(0, 0))
+
+	def test_enforced_limit_rejects_overspend(self):
+		expense = make_expense(self.budget, [(self.chairs, 16, 100)])
+
+		frappe.db.savepoint("overspend")
+		with self.enforced():
+			self.assertRaises(frappe.ValidationError, expense.submit)
+		frappe.db.rollback(save_point="overspend")
+
+		self.assertAmounts(1600, 0)
+
+	def test_enforced_limit_allows_the_whole_budget(self):
+		expense = make_expense(self.budget, [(self.chairs, 15, 100)])
+		with self.enforced():
+			expense.submit()
+		self.assertAmounts(0, 1500)
+
+	def test_unenforced_limit_only_warns(self):
+		expense = make_expense(self.budget, [(self.chairs, 16, 100)])
+		frappe.clear_messages()
+		with self.enforced(False):
+			expense.submit()
+		self.assertTrue(frappe.message_log)
+		self.assertAmounts(0, 1600)
@@ -15,6 +15,7 @@ class DepartmentBudgetItem(Document):
 		from frappe.types import DF
 
 		budgeted_amount: DF.Currency
+		committed_amount: DF.Currency
 		description: DF.SmallText | None
 		item: DF.Link
 		parent: DF.Data
@@ -48,13 +49,14 @@ class DepartmentBudgetItem(Document):
 	def validate_item_department(self):
 		"""Validate that the item belongs to the same department as the budget"""
 		if self.item and self.parent:
-			# Get the department from the parent Department Budget
-			parent_doc = frappe.get_doc("Department Budget", self.parent)
+			# Reuse the parent's item map when validated as part of the parent save
+			parent_doc = getattr(self, "parent_doc", None) or frappe.get_doc("Department Budget", self.parent)
 			if parent_doc.department:
-				# Get the item's department
-				item_doc = frappe.get_doc("Item", self.item)
-				if item_doc.department != parent_doc.department:
-					frappe.throw(f"Item '{self.item}' belongs to department '{item_doc.department}' but this budget is for department '{parent_doc.department}'")
+				item_department = parent_doc.get_item_departments().get(self.item)
+				if item_department is None:
+					item_department = frappe.db.get_value("Item", self.item, "department")
+				if item_department != parent_doc.department:
+					frappe.throw(f"Item '{self.item}' belongs to department '{item_department}' but this budget is for department '{parent_doc.department}'")
 
 	def calculate_remaining_amount(self):
 		"""Calculate remaining amount"""
@@ -3,11 +3,14 @@
 
 frappe.ui.form.on("Department Expense", {
 	refresh: function(frm) {
+		stewardpro.profiler.add_button(frm);
+
 		// Set item filter for expense details table
 		set_item_filter_for_expense_details(frm);
 
 		// Set budget reference filter based on department
 		set_budget_reference_filter(frm);
+		show_budget_availability(frm);
 		frm.set_value("approval_date", frappe.datetime.get_today());
 		frm.set_query('approved_by', () => {
 			return {
@@ -104,6 +107,25 @@ function calculate_total_amount(frm) {
 	frm.set_value('total_amount', total);
 }
 
+function show_budget_availability(frm) {
+	if (!frm.doc.budget_reference) return;
+
+	frappe.call({
+		method: "stewardpro.stewardpro.doctype.department_budget.budget_control.get_budget_position",
+		args: { budget_reference: frm.doc.budget_reference },
+		callback: function(r) {
+			const budget = r.message;
+			if (!budget) return;
+
+			const color = budget.available_amount < 0 ? "red" : budget.available_amount < (frm.doc.total_amount || 0) ? "orange" : "green";
+			frm.dashboard.add_indicator(__("Budget {0}", [format_currency(budget.total_budget_amount)]), "blue");
+			frm.dashboard.add_indicator(__("Spent {0}", [format_currency(budget.spent_amount)]), "grey");
+			frm.dashboard.add_indicator(__("Committed {0}", [format_currency(budget.committed_amount)]), "orange");
+			frm.dashboard.add_indicator(__("Available {0}", [format_currency(budget.available_amount)]), color);
+		}
+	});
+}
+
 function set_budget_reference_filter(frm) {
 	if (frm.doc.department) {
 		frm.set_query('budget_reference', function() {
@@ -218,8 +240,9 @@ function get_budget_items_html(budget_items) {
 						<th width="9%">${__('Unit Price')}</th>
 						<th width="9%">${__('Budgeted')}</th>
 						<th width="8%">${__('Remaining')}</th>
-						<th width="10%">${__('Expense Qty')}</th>
-						<th width="10%">${__('Amount')}</th>
+						<th width="8%">${__('Committed')}</th>
+						<th width="8%">${__('Expense Qty')}</th>
+						<th width="8%">${__('Amount')}</th>
 					</tr>
 				</thead>
 				<tbody>
@@ -239,6 +262,7 @@ function get_budget_items_html(budget_items) {
 				<td>${format_currency(item.unit_price)}</td>
 				<td>${format_currency(item.budgeted_amount)}</td>
 				<td>${format_currency(item.remaining_amount)}</td>
+				<td>${format_currency(item.committed_amount || 0)}</td>
 				<td>
 					<input type="number"
 						   class="form-control quantity-input"
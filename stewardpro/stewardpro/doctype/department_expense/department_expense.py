@@ -4,6 +4,18 @@
 import frappe
 from frappe.model.document import Document
 
+from stewardpro.stewardpro.doctype.department_budget.budget_control import (
+	apply_expense_to_budget,
+	check_budget_availability,
+	get_budget_availability,
+	get_expense_commitment,
+	update_budget_commitment,
+)
+from stewardpro.stewardpro.doctype.department_budget.budget_items import clear_budget_items_cache, get_budget_items
+from stewardpro.stewardpro.doctype.department_budget.budget_variance import clear_budget_variance_cache
+from stewardpro.stewardpro.doctype.item.item import get_item_departments
+from stewardpro.stewardpro.utils.profiling import profiled
+
 
 class DepartmentExpense(Document):
 	# begin: auto-generated types
@@ -36,10 +48,12 @@ class DepartmentExpense(Document):
 	def validate(self):
 		"""Validate Department Expense"""
 		self.validate_expense_details()
+		self.validate_item_departments()
 		self.calculate_total_amount()
 		self.validate_budget_reference()
 		self.validate_approval()
 	
+	@profiled
 	def validate_expense_details(self):
 		"""Validate expense details"""
 		if not self.expense_details:
@@ -51,6 +65,26 @@ class DepartmentExpense(Document):
 			if detail.unit_price <= 0:
 				frappe.throw(f"Unit price must be greater than zero for item: {detail.expense_description}")
 
+	def get_item_departments(self):
+		"""Departments of every item in expense_details, fetched in one query per save"""
+		if self.flags.item_departments is None:
+			self.flags.item_departments = get_item_departments([row.item for row in self.expense_details])
+		return self.flags.item_departments
+
+	@profiled
+	def validate_item_departments(self):
+		"""Validate that all items belong to the expense department"""
+		# Bulk processing preloads one map for all selected expenses
+		self.flags.item_departments = self.flags.preloaded_item_departments
+		if not self.department:
+			return
+
+		item_departments = self.get_item_departments()
+		for row in self.expense_details:
+			if row.item and item_departments.get(row.item) != self.department:
+				frappe.throw(f"Item '{row.item}' belongs to department '{item_departments.get(row.item)}' but this expense is for department '{self.department}'")
+
+	@profiled
 	def calculate_total_amount(self):
 		"""Calculate total amount from expense details"""
 		total = 0
@@ -60,10 +94,15 @@ class DepartmentExpense(Document):
 				total += detail.amount
 		self.total_amount = total
 	
+	@profiled
 	def validate_budget_reference(self):
 		"""Validate budget reference and check budget availability"""
 		if self.budget_reference:
-			budget = frappe.get_doc("Department Budget", self.budget_reference)
+			budget = (self.flags.preloaded_budgets or {}).get(self.budget_reference) or get_budget_availability(
+				self.budget_reference
+			)
+			if not budget:
+				frappe.throw(f"Budget {self.budget_reference} not found")
 
 			# Check if budget is active
 			if not budget.is_active:
@@ -73,40 +112,17 @@ class DepartmentExpense(Document):
 			if budget.department != self.department:
 				frappe.throw(f"Department mismatch. Budget is for {budget.department}, expense is for {self.department}")
 
-			# Check budget availability (if budget has remaining_amount field)
-			if hasattr(budget, 'remaining_amount') and budget.remaining_amount is not None:
-				if budget.remaining_amount < self.total_amount:
-					frappe.msgprint(
-						f"Warning: This expense ({self.total_amount}) exceeds remaining budget ({budget.remaining_amount})",
-						alert=True
-					)
-			elif hasattr(budget, 'total_budget_amount') and budget.total_budget_amount:
-				# Calculate remaining amount if not available
-				spent_amount = self.get_total_spent_for_budget(budget.name)
-				remaining = budget.total_budget_amount - spent_amount
-				if remaining < self.total_amount:
-					frappe.msgprint(
-						f"Warning: This expense ({self.total_amount}) exceeds remaining budget ({remaining})",
-						alert=True
-					)
-	
-	def get_total_spent_for_budget(self, budget_name):
-		"""Calculate total amount spent for a specific budget"""
-		from frappe.query_builder import DocType
-		from frappe.query_builder.functions import Sum
-
-		Expense = DocType("Department Expense")
-
-		result = (
-			frappe.qb.from_(Expense)
-			.select(Sum(Expense.total_amount).as_("total_spent"))
-			.where(Expense.budget_reference == budget_name)
-			.where(Expense.docstatus == 1)
-			.where(Expense.name != self.name)  # Exclude current expense
-		).run(as_dict=True)
-
-		return result[0].total_spent or 0 if result else 0
-
+			# Drafts only get a warning; submit re-checks under the budget row lock.
+			# Bulk processing checks the selected expenses per budget instead.
+			if self.docstatus == 0 and not self.flags.in_bulk_budget_update:
+				# What this expense already commits is part of committed_amount
+				held = get_expense_commitment(self.get_doc_before_save())
+				budget.available_amount += sum(
+					amount for (budget_name, _item), amount in held.items() if budget_name == budget.name
+				)
+				check_budget_availability(budget, self.total_amount, enforce=False)
+
+	@profiled
 	def validate_approval(self):
 		"""Validate approval requirements"""
 		if self.status == "Approved" and not self.approved_by:
@@ -122,63 +138,53 @@ class DepartmentExpense(Document):
 		if self.status == "Draft":
 			self.status = "Pending Approval"
 	
+	def on_update(self):
+		"""Keep the budget's committed amounts in step with this draft's status and lines"""
+		# Submit runs on_update before on_submit, which releases the commitment itself
+		if not self.flags.in_bulk_budget_update and self._action != "submit":
+			self.update_committed_amount()
+
 	def on_submit(self):
 		"""Actions on submit"""
+		if self.flags.in_bulk_budget_update:
+			# Applied once per budget by the bulk job
+			return
+
+		# Release the commitment first so it is not counted twice in the availability check
+		self.update_committed_amount()
 		self.update_budget_spent_amount()
 
 	def on_cancel(self):
 		"""Actions on cancel"""
 		self.update_budget_spent_amount(reverse=True)
 
+	def on_change(self):
+		"""Spent amounts of the budget (and a previously referenced one) have changed"""
+		previous = self.get_doc_before_save()
+		clear_budget_caches_after_commit(self.budget_reference, previous and previous.budget_reference)
+
+	def on_trash(self):
+		"""A deleted draft no longer commits any budget"""
+		update_budget_commitment(self, release=True)
+		clear_budget_caches_after_commit(self.budget_reference)
+
 	@frappe.whitelist()
 	def get_budget_items(self, budget_reference):
 		"""Get budget items for the selected budget reference"""
-		if not budget_reference:
-			return []
-
-		budget = frappe.get_doc("Department Budget", budget_reference)
-		budget_items = []
-
-		for item in budget.budget_items:
-			budget_items.append({
-				"item": item.item,
-				"item_name": frappe.db.get_value("Item", item.item, "item_name"),
-				"description": item.description,
-				"quantity": item.quantity,
-				"unit_price": item.unit_price,
-				"budgeted_amount": item.budgeted_amount,
-				"spent_amount": item.spent_amount or 0,
-				"remaining_amount": item.remaining_amount or item.budgeted_amount
-			})
-
-		return budget_items
+		return get_budget_items(budget_reference)
+
+	@profiled
+	def update_committed_amount(self):
+		"""Apply the change in committed amounts since the last save"""
+		update_budget_commitment(self, self.get_doc_before_save())
 
+	@profiled
 	def update_budget_spent_amount(self, reverse=False):
-		"""Update the spent amount in the related budget"""
+		"""Update the spent amount in the related budget under a row lock"""
 		if not self.budget_reference:
 			return
 
-		budget = frappe.get_doc("Department Budget", self.budget_reference)
-
-		# Process each expense detail
-		for expense_detail in self.expense_details:
-			# Find matching budget item by item
-			for budget_item in budget.budget_items:
-				if budget_item.item == expense_detail.item:
-					if reverse:
-						budget_item.spent_amount = (budget_item.spent_amount or 0) - expense_detail.amount
-					else:
-						budget_item.spent_amount = (budget_item.spent_amount or 0) + expense_detail.amount
-
-					budget_item.remaining_amount = budget_item.budgeted_amount - budget_item.spent_amount
-					break
-
-		# Recalculate budget totals
-		if hasattr(budget, 'calculate_spent_amount'):
-			budget.calculate_spent_amount()
-		if hasattr(budget, 'calculate_remaining_amount'):
-			budget.calculate_remaining_amount()
-		budget.save()
+		apply_expense_to_budget(self, sign=-1 if reverse else 1)
 
 	def get_budget_impact(self):
 		"""Get the impact of this expense on the budget"""
@@ -209,25 +215,17 @@ class DepartmentExpense(Document):
 		return (current_spent + self.total_amount) > budget.total_budget_amount
 
 
+def clear_budget_caches_after_commit(*budgets):
+	"""Drop the cached lines and variance of ``budgets`` once the new amounts are committed"""
+	def clear_caches():
+		clear_budget_items_cache(*budgets)
+		clear_budget_variance_cache(*budgets)
+
+	# Cleared earlier, a concurrent read could cache the uncommitted figures again
+	frappe.db.after_commit.add(clear_caches)
+
+
 @frappe.whitelist()
 def get_budget_items_for_reference(budget_reference):
 	"""Get budget items for the selected budget reference - static method"""
-	if not budget_reference:
-		return []
-
-	budget = frappe.get_doc("Department Budget", budget_reference)
-	budget_items = []
-
-	for item in budget.budget_items:
-		budget_items.append({
-			"item": item.item,
-			"item_name": frappe.db.get_value("Item", item.item, "item_name"),
-			"description": item.description,
-			"quantity": item.quantity,
-			"unit_price": item.unit_price,
-			"budgeted_amount": item.budgeted_amount,
-			"spent_amount": item.spent_amount or 0,
-			"remaining_amount": item.remaining_amount or item.budgeted_amount
-		})
-
-	return budget_items
+	return get_budget_items(budget_reference)
@@ -0,0 +1,119 @@
+// Copyright (c) 2025, Innocent P Metumba and contributors
+// For license information, please see license.txt
+
+// List View bulk approval and submission for Department Expenses
+frappe.listview_settings['Department Expense'] = {
+	onload: function(listview) {
+		listview.page.add_action_item(__('Approve Selected'), function() {
+			approve_selected_expenses(listview);
+		});
+
+		listview.page.add_action_item(__('Submit Selected'), function() {
+			submit_selected_expenses(listview);
+		});
+
+		frappe.realtime.off('expense_bulk_action_done');
+		frappe.realtime.on('expense_bulk_action_done', function(summary) {
+			show_bulk_action_results(summary);
+			listview.refresh();
+		});
+	}
+};
+
+function get_selected_drafts(listview) {
+	let selected = listview.get_checked_items();
+	let drafts = selected.filter(doc => doc.docstatus === 0);
+
+	if (drafts.length === 0) {
+		frappe.msgprint({
+			title: __('No Draft Expenses Selected'),
+			message: __('Select one or more draft expenses.'),
+			indicator: 'orange'
+		});
+	}
+
+	return drafts;
+}
+
+function approve_selected_expenses(listview) {
+	let drafts = get_selected_drafts(listview);
+	if (drafts.length === 0) {
+		return;
+	}
+
+	frappe.prompt([
+		{
+			fieldname: 'approved_by',
+			fieldtype: 'Link',
+			options: 'Member',
+			label: __('Approved By'),
+			reqd: 1
+		}
+	], function(values) {
+		run_bulk_action(drafts, 'approve', values.approved_by);
+	}, __('Approve {0} Expenses', [drafts.length]), __('Approve'));
+}
+
+function submit_selected_expenses(listview) {
+	let drafts = get_selected_drafts(listview);
+	if (drafts.length === 0) {
+		return;
+	}
+
+	frappe.confirm(
+		__('Submit {0} expenses? Their amounts will be recorded as spent against their budgets.', [drafts.length]),
+		function() {
+			run_bulk_action(drafts, 'submit');
+		}
+	);
+}
+
+function run_bulk_action(drafts, action, approved_by) {
+	frappe.call({
+		method: 'stewardpro.stewardpro.api.expenses.bulk_process_expenses',
+		args: {
+			names: drafts.map(doc => doc.name),
+			action: action,
+			approved_by: approved_by
+		},
+		freeze: true,
+		callback: function(r) {
+			if (r.message && r.message.queued) {
+				frappe.show_alert({
+					message: __('Processing {0} expenses in the background', [r.message.count]),
+					indicator: 'blue'
+				});
+			}
+		}
+	});
+}
+
+function show_bulk_action_results(summary) {
+	let failed = summary.results.filter(result => result.status !== 'success');
+	let warnings = summary.results.filter(result => result.status === 'success' && result.message);
+	let title = summary.action === 'approve' ? __('Bulk Approval') : __('Bulk Submission');
+
+	let message = `<p>${__('{0} of {1} expenses processed successfully.', [summary.success, summary.results.length])}</p>`;
+
+	if (failed.length || warnings.length) {
+		message += `<table class="table table-bordered">
+			<thead><tr><th>${__('Expense')}</th><th>${__('Result')}</th><th>${__('Message')}</th></tr></thead>
+			<tbody>`;
+		failed.concat(warnings).forEach(result => {
+			let label = result.status === 'success' ? __('Warning') : (result.status === 'skipped' ? __('Skipped') : __('Failed'));
+			message += `<tr>
+				<td><a href="/app/department-expense/${encodeURIComponent(result.name)}">${frappe.utils.escape_html(result.name)}</a></td>
+				<td>${label}</td>
+				<td>${frappe.utils.escape_html(result.message || '')}</td>
+			</tr>`;
+		});
+		message += '</tbody></table>';
+	}
+
+	frappe.msgprint({
+		title: title,
+		message: message,
+		indicator: failed.length ? 'orange' : 'green',
+		wide: true
+	});
+}
@@ -3,6 +3,8 @@
 
 import frappe
 from frappe.model.document import Document
+
+from stewardpro.stewardpro.utils.profiling import profiled
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -34,11 +36,13 @@ class DepartmentExpenseDetail(Document):
 		self.calculate_amount()
 		self.validate_item_department()
 
+	@profiled
 	def validate_quantity(self):
 		"""Validate quantity is positive"""
 		if self.quantity <= 0:
 			frappe.throw("Quantity must be greater than zero")
 
+	@profiled
 	def calculate_amount(self):
 		"""Calculate amount based on quantity and unit price"""
 		if self.quantity and self.unit_price:
@@ -46,13 +50,15 @@ class DepartmentExpenseDetail(Document):
 		else:
 			self.amount = 0
 
+	@profiled
 	def validate_item_department(self):
 		"""Validate that the item belongs to the same department as the expense"""
 		if self.item and self.parent:
-			# Get parent expense document
-			parent_doc = frappe.get_doc("Department Expense", self.parent)
+			# Reuse the parent's item map when validated as part of the parent save
+			parent_doc = getattr(self, "parent_doc", None) or frappe.get_doc("Department Expense", self.parent)
 			if parent_doc.department:
-				# Get item's department
-				item_doc = frappe.get_doc("Item", self.item)
-				if item_doc.department != parent_doc.department:
-					frappe.throw(f"Item '{self.item}' belongs to department '{item_doc.department}' but this expense is for department '{parent_doc.department}'")
+				item_department = parent_doc.get_item_departments().get(self.item)
+				if item_department is None:
+					item_department = frappe.db.get_value("Item", self.item, "department")
+				if item_department != parent_doc.department:
+					frappe.throw(f"Item '{self.item}' belongs to department '{item_department}' but this expense is for department '{parent_doc.department}'")
@@ -0,0 +1,169 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Date → Fiscal Year resolution over a sorted interval index.
+
+Fiscal Years are non-overlapping date ranges, so sorting them by start date lets a
+date be resolved with one ``bisect`` instead of a query. The rows are cached in
+Redis under ``FISCAL_YEARS_KEY`` (cleared by the Fiscal Year controller) and the
+built index is memoized on ``frappe.local`` for the rest of the request.
+
+Disabled Fiscal Years are kept for overlap checks and lookups by name but no
+date resolves to them. The calendar ``year`` report filter always means
+January–December; the ``fiscal_year`` filter selects a Fiscal Year.
+"""
+
+from bisect import bisect_right
+from datetime import date, timedelta
+
+import frappe
+from frappe.query_builder import Case
+from frappe.utils import add_months, cint, getdate
+
+FISCAL_YEARS_KEY = "fiscal_years"
+
+
+class FiscalYearIndex:
+	def __init__(self, fiscal_years):
+		self.all_fiscal_years = sorted(fiscal_years, key=lambda fy: fy.from_date)
+		self.all_starts = [fy.from_date for fy in self.all_fiscal_years]
+		self.by_name = {fy.name: fy for fy in self.all_fiscal_years}
+		# Only enabled years take part in date resolution
+		self.fiscal_years = [fy for fy in self.all_fiscal_years if not fy.disabled]
+		self.starts = [fy.from_date for fy in self.fiscal_years]
+
+	def __len__(self):
+		return len(self.fiscal_years)
+
+	def get(self, name):
+		return self.by_name.get(name)
+
+	def resolve(self, value):
+		"""Fiscal Year containing ``value``, or None"""
+		value = getdate(value)
+		position = bisect_right(self.starts, value) - 1
+		if position < 0:
+			return None
+
+		fiscal_year = self.fiscal_years[position]
+		return fiscal_year if value <= fiscal_year.to_date else None
+
+	def resolve_many(self, values):
+		"""Fiscal Year (or None) for every date, in input order"""
+		resolved = {}
+		for value in values:
+			if value and value not in resolved:
+				resolved[value] = self.resolve(value)
+		return [resolved.get(value) for value in values]
+
+	def previous(self, fiscal_year):
+		"""Fiscal Year ending right before ``fiscal_year`` starts, or None"""
+		return self.resolve(fiscal_year.from_date - timedelta(days=1))
+
+	def overlapping(self, from_date, to_date, exclude=None):
+		"""Fiscal Years, disabled ones included, sharing at least one day with ``from_date``..``to_date``"""
+		from_date, to_date = getdate(from_date), getdate(to_date)
+		# Only years starting on or before to_date can overlap
+		end = bisect_right(self.all_starts, to_date)
+		return [
+			fy for fy in self.all_fiscal_years[:end] if fy.to_date >= from_date and fy.name != exclude
+		]
+
+
+def get_fiscal_year_index():
+	index = getattr(frappe.local, "stewardpro_fiscal_year_index", None)
+	if index is None:
+		index = FiscalYearIndex(get_fiscal_year_rows())
+		frappe.local.stewardpro_fiscal_year_index = index
+	return index
+
+
+def get_fiscal_year_rows():
+	cache = frappe.cache()
+	rows = cache.get_value(FISCAL_YEARS_KEY)
+	if rows is None:
+		rows = [
+			{
+				"name": fy.name,
+				"from_date": getdate(fy.year_start_date),
+				"to_date": getdate(fy.year_end_date),
+				"disabled": cint(fy.disabled),
+			}
+			for fy in frappe.get_all(
+				"Fiscal Year", fields=["name", "year_start_date", "year_end_date", "disabled"]
+			)
+		]
+		cache.set_value(FISCAL_YEARS_KEY, rows)
+	return [frappe._dict(row) for row in rows]
+
+
+def clear_fiscal_year_cache(on_rollback=False):
+	"""Drop the cached Fiscal Years; with ``on_rollback`` also once the transaction is rolled back,
+	so rows cached from it meanwhile do not outlive it"""
+	frappe.cache().delete_value(FISCAL_YEARS_KEY)
+	frappe.local.stewardpro_fiscal_year_index = None
+	if on_rollback:
+		frappe.db.after_rollback.add(clear_fiscal_year_cache)
+
+
+def get_fiscal_year(value):
+	"""Enabled Fiscal Year (name, from_date, to_date, disabled) containing a date, or None"""
+	return get_fiscal_year_index().resolve(value)
+
+
+def get_fiscal_years(values):
+	"""Fiscal Year name (or None) for every date, in input order"""
+	return [fy.name if fy else None for fy in get_fiscal_year_index().resolve_many(values)]
+
+
+def get_fiscal_year_dates(fiscal_year):
+	"""(from_date, to_date) of a Fiscal Year by name, or None"""
+	fy = get_fiscal_year_index().get(fiscal_year)
+	return (fy.from_date, fy.to_date) if fy else None
+
+
+def get_year_dates(year):
+	"""(from_date, to_date) reports use for the calendar ``year`` filter"""
+	year = cint(year)
+	return date(year, 1, 1), date(year, 12, 31)
+
+
+def get_current_and_previous_dates(value=None):
+	"""Date ranges of the period containing ``value`` (default today) and the one before it"""
+	value = getdate(value)
+	index = get_fiscal_year_index()
+	fy = index.resolve(value)
+	if not fy:
+		return get_year_dates(value.year), get_year_dates(value.year - 1)
+
+	previous = index.previous(fy)
+	if previous:
+		previous_dates = (previous.from_date, previous.to_date)
+	else:
+		# Assume a twelve month year before the first configured one
+		previous_dates = (add_months(fy.from_date, -12), fy.from_date - timedelta(days=1))
+	return (fy.from_date, fy.to_date), previous_dates
+
+
+def fiscal_year_case(date_field):
+	"""SQL CASE mapping a date column to its Fiscal Year name (NULL outside any year)"""
+	case = Case()
+	for fy in get_fiscal_year_index().fiscal_years:
+		case = case.when(date_field[fy.from_date : fy.to_date], fy.name)
+	return case.else_(None)
+
+
+@frappe.whitelist()
+def get_fiscal_period(year=None, date=None):
+	"""Date range and Fiscal Year for a calendar year filter or a date"""
+	if year:
+		from_date, to_date = get_year_dates(year)
+	else:
+		(from_date, to_date), _previous = get_current_and_previous_dates(date)
+
+	fy = get_fiscal_year(from_date)
+	return {
+		"fiscal_year": fy.name if fy else None,
+		"from_date": from_date,
+		"to_date": to_date,
+	}
@@ -2,7 +2,13 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
-from datetime import timedelta
+from frappe.utils import getdate
+
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import (
+	clear_fiscal_year_cache,
+	get_fiscal_year_dates,
+	get_fiscal_year_index,
+)
 
 class FiscalYear(Document):
 	def validate(self):
@@ -11,75 +17,79 @@ class FiscalYear(Document):
 		self.disallow_date_change()
 
 	def validate_dates(self):
+		start, end = getdate(self.year_start_date), getdate(self.year_end_date)
+		if end < start:
+			frappe.throw(_("Year End Date cannot be before Year Start Date."))
+
 		if not self.is_short_year:
-			expected_end = frappe.utils.add_days(
-				frappe.utils.add_months(self.year_start_date, 12), -1
-			)
-			if self.year_end_date != expected_end:
+			expected_end = frappe.utils.add_days(frappe.utils.add_months(start, 12), -1)
+			if end != getdate(expected_end):
 				frappe.throw(_("Year End Date must be exactly 12 months minus 1 day from Start Date unless 'Is Short/Long Year' is checked."))
 
 	def validate_overlap(self):
-		overlaps = frappe.db.sql("""
-			SELECT name FROM `tabFiscal Year`
-			WHERE (
-				(year_start_date <= %s AND year_end_date >= %s)
-				OR (year_start_date <= %s AND year_end_date >= %s)
-				OR (year_start_date >= %s AND year_end_date <= %s)
-			) AND name != %s
-		""", (self.year_start_date, self.year_start_date, self.year_end_date, self.year_end_date, self.year_start_date, self.year_end_date, self.name))
-		if overlaps:
-			frappe.throw(_("Fiscal Year dates overlap with another Fiscal Year."))
+		# Checked against the table, not the cached index, so rows of a rolled back
+		# transaction can never block a valid year
+		overlap = frappe.db.exists(
+			"Fiscal Year",
+			{
+				"year_start_date": ("<=", self.year_end_date),
+				"year_end_date": (">=", self.year_start_date),
+				"name": ("!=", self.name),
+			},
+		)
+		if overlap:
+			frappe.throw(_("Fiscal Year dates overlap with Fiscal Year {0}.").format(overlap))
 
 	def disallow_date_change(self):
-		if not self.is_new():
-			old = frappe.get_doc("Fiscal Year", self.name)
-			if old.year_start_date != self.year_start_date or old.year_end_date != self.year_end_date:
-				frappe.throw(_("Cannot change Start or End Date after creation."))
+		if self.is_new():
+			return
+
+		old_start, old_end = frappe.db.get_value(
+			"Fiscal Year", self.name, ["year_start_date", "year_end_date"]
+		) or (None, None)
+		if old_start and (
+			getdate(old_start) != getdate(self.year_start_date)
+			or getdate(old_end) != getdate(self.year_end_date)
+		):
+			frappe.throw(_("Cannot change Start or End Date after creation."))
 
 	def on_update(self):
-		self.check_duplicate_fiscal_year()
-		frappe.cache().delete_value("fiscal_years")
+		clear_fiscal_year_cache(on_rollback=True)
 
 	def on_trash(self):
-		frappe.cache().delete_value("fiscal_years")
-
-	def check_duplicate_fiscal_year(self):
-		exists = frappe.db.exists("Fiscal Year", {
-			"year_start_date": self.year_start_date,
-			"year_end_date": self.year_end_date,
-			"name": ["!=", self.name]
-		})
-		if exists:
-			frappe.throw(_("Duplicate Fiscal Year with same start and end dates exists."))
+		clear_fiscal_year_cache(on_rollback=True)
 
 @frappe.whitelist()
 def get_from_and_to_date(fiscal_year):
-	cached = frappe.cache().get_value("fiscal_years")
-	if not cached:
-		cached = {}
-		for fy in frappe.get_all("Fiscal Year", fields=["name", "year_start_date", "year_end_date"]):
-			cached[fy.name] = {"from_date": fy.year_start_date, "to_date": fy.year_end_date}
-		frappe.cache().set_value("fiscal_years", cached)
-	return cached.get(fiscal_year)
+	dates = get_fiscal_year_dates(fiscal_year)
+	if dates:
+		return {"from_date": dates[0], "to_date": dates[1]}
 
 
 def auto_create_fiscal_year():
-	today = frappe.utils.nowdate()
-	ending_soon = frappe.db.get_all("Fiscal Year", fields=["name", "year_end_date"], filters={
-		"year_end_date": ["=", frappe.utils.add_days(today, 3)]
-	})
-	for fy in ending_soon:
-		doc = frappe.get_doc("Fiscal Year", fy.name)
-		next_start = frappe.utils.add_days(doc.year_end_date, 1)
-		next_end = frappe.utils.add_days(frappe.utils.add_months(next_start, 12), -1)
+	"""Create the next twelve month Fiscal Year for every year ending in three days"""
+	ending_on = getdate(frappe.utils.add_days(frappe.utils.nowdate(), 3))
+	index = get_fiscal_year_index()
+
+	for fy in index.fiscal_years:
+		if fy.to_date != ending_on:
+			continue
+
+		next_start = getdate(frappe.utils.add_days(fy.to_date, 1))
+		next_end = getdate(frappe.utils.add_days(frappe.utils.add_months(next_start, 12), -1))
+		if index.overlapping(next_start, next_end):
+			# The next period (or part of it) is already configured
+			continue
+
 		next_year = f"{next_start.year}-{next_end.year}" if next_start.year != next_end.year else str(next_start.year)
-		if not frappe.db.exists("Fiscal Year", next_year):
-			new_fy = frappe.get_doc({
-				"doctype": "Fiscal Year",
-				"year": next_year,
-				"year_start_date": next_start,
-				"year_end_date": next_end,
-				"auto_created": 1
-			})
-			new_fy.insert(ignore_permissions=True)
-			frappe.msgprint(_(f"Auto-created Fiscal Year: {next_year}"))
+		if index.get(next_year):
+			continue
+
+		frappe.get_doc({
+			"doctype": "Fiscal Year",
+			"year": next_year,
+			"year_start_date": next_start,
+			"year_end_date": next_end,
+			"auto_created": 1
+		}).insert(ignore_permissions=True)
+		frappe.msgprint(_("Auto-created Fiscal Year: {0}").format(next_year))
@@ -1,9 +1,97 @@
 # Copyright (c) 2025, Innocent P Metumba and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate
+
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import (
+	clear_fiscal_year_cache,
+	get_fiscal_year,
+	get_year_dates,
+)
+
+
+def make_fiscal_year(year, start, end, is_short_year=0):
+	return frappe.get_doc({
+		"doctype": "Fiscal Year",
+		"year": year,
+		"year_start_date": start,
+		"year_end_date": end,
+		"is_short_year": is_short_year,
+	}).insert()
 
 
 class TestFiscalYear(FrappeTestCase):
-	pass
+	def setUp(self):
+		# Far future years keep the tests clear of real Fiscal Years
+		frappe.db.delete("Fiscal Year", {"year": ["like", "209%"]})
+		clear_fiscal_year_cache()
+
+	def tearDown(self):
+		frappe.db.delete("Fiscal Year", {"year": ["like", "209%"]})
+		clear_fiscal_year_cache()
+
+	def test_twelve_month_year(self):
+		make_fiscal_year("2091", "2091-01-01", "2091-12-31")
+		self.assertEqual(get_fiscal_year("2091-06-15").name, "2091")
+
+	def test_year_must_be_twelve_months_unless_short(self):
+		self.assertRaises(frappe.ValidationError, make_fiscal_year, "2091", "2091-01-01", "2091-06-30")
+
+	def test_short_year(self):
+		make_fiscal_year("2091", "2091-01-01", "2091-06-30", is_short_year=1)
+		make_fiscal_year("2091-2092", "2091-07-01", "2092-06-30")
+
+		self.assertEqual(get_fiscal_year("2091-06-30").name, "2091")
+		self.assertEqual(get_fiscal_year("2091-07-01").name, "2091-2092")
+
+	def test_long_year(self):
+		make_fiscal_year("2091-2092", "2091-01-01", "2092-06-30", is_short_year=1)
+
+		self.assertEqual(get_fiscal_year("2092-03-01").name, "2091-2092")
+		# The year filter stays a calendar year whatever the Fiscal Years are
+		self.assertEqual(get_year_dates(2091), (getdate("2091-01-01"), getdate("2091-12-31")))
+
+	def test_disabled_year_does_not_resolve(self):
+		fiscal_year = make_fiscal_year("2091", "2091-01-01", "2091-12-31")
+		fiscal_year.db_set("disabled", 1)
+		clear_fiscal_year_cache()
+
+		self.assertIsNone(get_fiscal_year("2091-06-15"))
+		# It still blocks overlapping years
+		self.assertRaises(frappe.ValidationError, make_fiscal_year, "2091-2092", "2091-07-01", "2092-06-30")
+
+	def test_end_before_start(self):
+		self.assertRaises(
+			frappe.ValidationError, make_fiscal_year, "2091", "2091-06-30", "2091-01-01", is_short_year=1
+		)
+
+	def test_overlap(self):
+		make_fiscal_year("2091-2092", "2091-07-01", "2092-06-30")
+
+		# Overlapping the end, the start, or enclosing an existing year
+		self.assertRaises(frappe.ValidationError, make_fiscal_year, "2092", "2092-01-01", "2092-12-31")
+		self.assertRaises(frappe.ValidationError, make_fiscal_year, "2091", "2091-01-01", "2091-12-31")
+		self.assertRaises(
+			frappe.ValidationError, make_fiscal_year, "2090-2093", "2090-01-01", "2093-12-31", is_short_year=1
+		)
+
+		# Touching ranges do not overlap
+		make_fiscal_year("2090-2091", "2090-07-01", "2091-06-30")
+		make_fiscal_year("2092-2093", "2092-07-01", "2093-06-30")
+
+	def test_dates_cannot_change(self):
+		fiscal_year = make_fiscal_year("2091", "2091-01-01", "2091-12-31")
+		fiscal_year.year_start_date = "2091-02-01"
+		fiscal_year.year_end_date = "2092-01-31"
+		self.assertRaises(frappe.ValidationError, fiscal_year.save)
+
+	def test_overlap_ignores_rolled_back_years(self):
+		frappe.db.savepoint("fiscal_year")
+		make_fiscal_year("2091", "2091-01-01", "2091-12-31")
+		# Caches the year that is about to be rolled back
+		get_fiscal_year("2091-06-15")
+		frappe.db.rollback(save_point="fiscal_year")
+
+		make_fiscal_year("2091", "2091-01-01", "2091-12-31")
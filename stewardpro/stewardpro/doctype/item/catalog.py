@@ -0,0 +1,126 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Versioned, department-keyed catalog of active Items for form pickers.
+
+Each catalog (one per department plus ``ALL_DEPARTMENTS``) has a version token
+``"<epoch>:<counter>"`` and a bounded changelog of the item names touched by each
+version. Clients send the version they hold and get back ``not_modified``, a
+``delta`` with only the changed items, or the ``full`` list. The epoch changes
+whenever the changelog is recreated (e.g. after a cache flush), so a stale client
+version can never be mistaken for a current one.
+"""
+
+import frappe
+from frappe.utils import cint
+
+CATALOG_ITEMS_KEY = "stewardpro:item_catalog:items"
+CATALOG_CHANGELOG_KEY = "stewardpro:item_catalog:changelog"
+CATALOG_LOCK_KEY = "stewardpro:item_catalog:lock"
+ALL_DEPARTMENTS = "__all__"
+
+# Versions kept in the changelog; older clients get the full list
+MAX_CHANGES = 100
+
+CATALOG_FIELDS = ["name", "item_name", "department", "standard_cost", "unit_of_measure", "description"]
+
+
+@frappe.whitelist()
+def get_item_catalog(department=None, version=None):
+	"""Active items of a department (or all departments) relative to the client's version"""
+	key = department or ALL_DEPARTMENTS
+	changelog = get_changelog(key)
+	current = changelog["version"]
+
+	if version == current:
+		return {"status": "not_modified", "version": current}
+
+	changed = get_changed_items(changelog, version)
+	if changed is not None:
+		items = get_items(department, names=changed) if changed else []
+		present = {item.name for item in items}
+		return {
+			"status": "delta",
+			"version": current,
+			"items": items,
+			"removed": [name for name in changed if name not in present],
+		}
+
+	return {"status": "full", "version": current, "items": get_catalog_items(department)}
+
+
+def get_catalog_items(department=None):
+	"""Full catalog list, cached per department until an Item in it changes"""
+	key = department or ALL_DEPARTMENTS
+	cache = frappe.cache()
+	items = cache.hget(CATALOG_ITEMS_KEY, key)
+	if items is None:
+		items = get_items(department)
+		cache.hset(CATALOG_ITEMS_KEY, key, items)
+	return items
+
+
+def get_items(department=None, names=None):
+	filters = {"is_active": 1}
+	if department:
+		filters["department"] = department
+	if names:
+		filters["name"] = ["in", names]
+
+	return frappe.get_all("Item", filters=filters, fields=CATALOG_FIELDS, order_by="item_name")
+
+
+def get_changelog(key):
+	cache = frappe.cache()
+	changelog = cache.hget(CATALOG_CHANGELOG_KEY, key)
+	if changelog is None:
+		changelog = {"epoch": frappe.generate_hash(length=8), "counter": 0, "changes": []}
+		changelog["version"] = make_version(changelog)
+		cache.hset(CATALOG_CHANGELOG_KEY, key, changelog)
+	return changelog
+
+
+def make_version(changelog):
+	return f"{changelog['epoch']}:{changelog['counter']}"
+
+
+def get_changed_items(changelog, version):
+	"""Item names changed since ``version``, or None when a full reload is needed"""
+	if not version or ":" not in version:
+		return None
+
+	epoch, counter = version.split(":", 1)
+	counter = cint(counter)
+	if epoch != changelog["epoch"] or counter > changelog["counter"]:
+		return None
+
+	changes = changelog["changes"]
+	if not changes or changes[0][0] > counter + 1:
+		# The changelog no longer reaches back to the client's version
+		return None
+
+	changed = []
+	for change_counter, name in changes:
+		if change_counter > counter and name not in changed:
+			changed.append(name)
+	return changed
+
+
+def record_item_change(item_name, departments):
+	"""Bump the version of every affected catalog and drop its cached list"""
+	cache = frappe.cache()
+	keys = [department for department in dict.fromkeys(departments) if department]
+	keys.append(ALL_DEPARTMENTS)
+
+	# Concurrent saves would otherwise read the same changelog and drop each other's entries
+	with cache.lock(cache.make_key(CATALOG_LOCK_KEY), timeout=10, blocking_timeout=10):
+		for key in keys:
+			changelog = get_changelog(key)
+			changelog["counter"] += 1
+			changelog["changes"].append((changelog["counter"], item_name))
+			changelog["changes"] = changelog["changes"][-MAX_CHANGES:]
+			changelog["version"] = make_version(changelog)
+			cache.hset(CATALOG_CHANGELOG_KEY, key, changelog)
+
+	cache.hdel(CATALOG_ITEMS_KEY, *keys)
+
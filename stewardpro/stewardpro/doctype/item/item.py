@@ -4,6 +4,16 @@
 import frappe
 from frappe.model.document import Document
 
+from stewardpro.stewardpro.doctype.department_budget.budget_items import (
+	clear_budget_items_cache,
+	get_budgets_with_item,
+)
+from stewardpro.stewardpro.doctype.department_budget.budget_variance import (
+	clear_budget_variance_cache,
+	get_budgets_using_item,
+)
+from stewardpro.stewardpro.doctype.item.catalog import get_catalog_items, record_item_change
+
 
 class Item(Document):
 	# begin: auto-generated types
@@ -49,29 +59,51 @@ class Item(Document):
 		if self.item_name:
 			self.item_name = self.item_name.strip()
 
+	def on_update(self):
+		"""Cached budget lines and variance lines carry the item name"""
+		if self.has_value_changed("item_name"):
+			budgets, variance_budgets = get_budgets_with_item(self.name), get_budgets_using_item(self.name)
+			frappe.db.after_commit.add(lambda: clear_budget_items_cache(*budgets))
+			frappe.db.after_commit.add(lambda: clear_budget_variance_cache(*variance_budgets))
+
+		previous = self.get_doc_before_save()
+		self.record_catalog_change(self.name, [self.department, previous and previous.department])
+
+	def on_trash(self):
+		self.record_catalog_change(self.name, [self.department])
+
+	def after_rename(self, old, new, merge=False):
+		self.record_catalog_change(old, [self.department])
+		self.record_catalog_change(new, [self.department])
+
+	def record_catalog_change(self, item_name, departments):
+		# Once committed: a client refetching earlier would cache the old item under the new version
+		frappe.db.after_commit.add(lambda: record_item_change(item_name, departments))
+
+
+def get_item_departments(items):
+	"""Map item name -> department for all given items in a single query"""
+	items = list({item for item in items if item})
+	if not items:
+		return {}
+
+	return dict(
+		frappe.get_all(
+			"Item",
+			filters={"name": ["in", items]},
+			fields=["name", "department"],
+			as_list=True
+		)
+	)
+
 
 @frappe.whitelist()
 def get_items_by_department(department):
 	"""Get active items filtered by department"""
-	filters = {
-		"department": department,
-		"is_active": 1
-	}
-
-	return frappe.get_all(
-		"Item",
-		filters=filters,
-		fields=["name", "item_name", "standard_cost", "unit_of_measure"],
-		order_by="item_name"
-	)
+	return get_catalog_items(department)
 
 
 @frappe.whitelist()
 def get_active_items():
 	"""Get all active items"""
-	return frappe.get_all(
-		"Item",
-		filters={"is_active": 1},
-		fields=["name", "item_name", "department", "standard_cost"],
-		order_by="item_name"
-	)
+	return get_catalog_items()
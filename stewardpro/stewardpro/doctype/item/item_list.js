@@ -31,40 +31,37 @@ frappe.listview_settings['Item'] = {
 };
 
 function show_items_by_department() {
-	frappe.call({
-		method: "'stewardpro.stewardpro.doctype.item.item.get_active_items",
-		callback: function(r) {
-			if (r.message) {
-				let items_by_dept = {};
-				r.message.forEach(function(item) {
-					if (!items_by_dept[item.department]) {
-						items_by_dept[item.department] = [];
-					}
-					items_by_dept[item.department].push(item);
-				});
+	stewardpro.item_catalog.get().then(function(items) {
+		if (items) {
+			let items_by_dept = {};
+			items.forEach(function(item) {
+				if (!items_by_dept[item.department]) {
+					items_by_dept[item.department] = [];
+				}
+				items_by_dept[item.department].push(item);
+			});
 
-				let html = '<div class="row">';
-				Object.keys(items_by_dept).forEach(function(dept) {
-					html += '<div class="col-md-6">';
-					html += '<h5>' + dept + '</h5>';
-					html += '<ul>';
-					items_by_dept[dept].forEach(function(item) {
-						html += '<li>' + item.item_name;
-						if (item.standard_cost) {
-							html += ' - ' + format_currency(item.standard_cost);
-						}
-						html += '</li>';
-					});
-					html += '</ul></div>';
+			let html = '<div class="row">';
+			Object.keys(items_by_dept).forEach(function(dept) {
+				html += '<div class="col-md-6">';
+				html += '<h5>' + dept + '</h5>';
+				html += '<ul>';
+				items_by_dept[dept].forEach(function(item) {
+					html += '<li>' + item.item_name;
+					if (item.standard_cost) {
+						html += ' - ' + format_currency(item.standard_cost);
+					}
+					html += '</li>';
 				});
-				html += '</div>';
+				html += '</ul></div>';
+			});
+			html += '</div>';
 
-				frappe.msgprint({
-					title: __("Items by Department"),
-					message: html,
-					wide: true
-				});
-			}
+			frappe.msgprint({
+				title: __("Items by Department"),
+				message: html,
+				wide: true
+			});
 		}
 	});
 }
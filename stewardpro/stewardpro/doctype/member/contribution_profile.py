@@ -0,0 +1,187 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Per-member giving aggregates kept in Redis.
+
+Each cache entry holds the raw aggregate state of one member (totals per year and
+category, gift count, first and last gift date). Profiles are derived from that
+state on read, so a cached entry stays valid across the year boundary. Entries are
+built lazily from one grouped query for all missing members and dropped once a
+submit or cancel of one of the member's contributions is committed. They also
+expire after ``PROFILE_TTL`` seconds, so an entry rebuilt from data read just
+before such a commit cannot stay wrong.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Count, Max, Min, Sum
+from frappe.utils import date_diff, flt, getdate, nowdate
+from pypika.enums import DatePart
+from pypika.functions import Extract
+
+PROFILE_CACHE_KEY = "stewardpro:member_contribution_profile"
+PROFILE_TTL = 24 * 60 * 60
+
+CONTRIBUTION_CATEGORIES = (
+	"tithe_amount",
+	"offering_amount",
+	"offering_to_field",
+	"offering_to_church",
+	"campmeeting_offering",
+	"church_building_offering",
+)
+
+
+@frappe.whitelist()
+def get_member_contribution_profile(member):
+	"""Lifetime/YTD totals, last gift, giving frequency and category mix of a member"""
+	check_permission()
+	return get_profiles([member])[member]
+
+
+@frappe.whitelist()
+def get_member_contribution_profiles(members):
+	"""Profiles for a list of members (e.g. one list view page) in a single call"""
+	check_permission()
+
+	if isinstance(members, str):
+		members = frappe.parse_json(members)
+
+	return get_profiles(members or [])
+
+
+def check_permission():
+	if not frappe.has_permission("Tithes and Offerings", "read"):
+		frappe.throw(_("Not permitted to view contribution history"), frappe.PermissionError)
+
+
+def get_profile_key(member):
+	return f"{PROFILE_CACHE_KEY}::{member}"
+
+
+def get_profiles(members):
+	members = list(dict.fromkeys(members))
+	cache = frappe.cache()
+
+	# ``expires`` skips the per-request copy, so an entry dropped by another worker is rebuilt
+	states = {member: cache.get_value(get_profile_key(member), expires=True) for member in members}
+	missing = [member for member, state in states.items() if state is None]
+
+	if missing:
+		built = build_states(missing)
+		for member in missing:
+			states[member] = built[member]
+			cache.set_value(get_profile_key(member), built[member], expires_in_sec=PROFILE_TTL)
+
+	return {member: make_profile(member, states[member]) for member in members}
+
+
+def new_state():
+	return {"years": {}, "first_gift_date": None, "last_gift_date": None}
+
+
+def build_states(members):
+	"""Aggregate state for several members from one query grouped by member and year"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	year = Extract(DatePart.year, TithesOfferings.date)
+
+	rows = (
+		frappe.qb.from_(TithesOfferings)
+		.select(
+			TithesOfferings.member,
+			year.as_("year"),
+			Count(TithesOfferings.name).as_("gift_count"),
+			Sum(TithesOfferings.total_amount).as_("total_amount"),
+			*[Sum(TithesOfferings[fieldname]).as_(fieldname) for fieldname in CONTRIBUTION_CATEGORIES],
+			Min(TithesOfferings.date).as_("first_gift_date"),
+			Max(TithesOfferings.date).as_("last_gift_date"),
+		)
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.member.isin(members))
+		.groupby(TithesOfferings.member, year)
+	).run(as_dict=True)
+
+	states = {member: new_state() for member in members}
+	for row in rows:
+		state = states[row.member]
+		state["years"][str(int(row.year))] = {
+			"gift_count": row.gift_count,
+			"total_amount": flt(row.total_amount),
+			"categories": {fieldname: flt(row.get(fieldname)) for fieldname in CONTRIBUTION_CATEGORIES},
+		}
+		update_gift_dates(state, row.first_gift_date)
+		update_gift_dates(state, row.last_gift_date)
+
+	return states
+
+
+def update_gift_dates(state, gift_date):
+	gift_date = str(getdate(gift_date))
+	if not state["first_gift_date"] or gift_date < state["first_gift_date"]:
+		state["first_gift_date"] = gift_date
+	if not state["last_gift_date"] or gift_date > state["last_gift_date"]:
+		state["last_gift_date"] = gift_date
+
+
+def make_profile(member, state):
+	today = getdate(nowdate())
+	years = state["years"]
+	current_year = years.get(str(today.year), {})
+
+	lifetime_total = sum(year["total_amount"] for year in years.values())
+	gift_count = sum(year["gift_count"] for year in years.values())
+
+	category_totals = dict.fromkeys(CONTRIBUTION_CATEGORIES, 0.0)
+	for year in years.values():
+		for fieldname, amount in year["categories"].items():
+			category_totals[fieldname] += amount
+
+	category_mix = {
+		fieldname: {
+			"amount": amount,
+			"percentage": (amount / lifetime_total * 100) if lifetime_total else 0,
+		}
+		for fieldname, amount in category_totals.items()
+	}
+
+	gifts_per_month = 0
+	if state["first_gift_date"]:
+		months_active = max(date_diff(today, state["first_gift_date"]) / 30.44, 1)
+		gifts_per_month = gift_count / months_active
+
+	return {
+		"member": member,
+		"lifetime_total": lifetime_total,
+		"ytd_total": current_year.get("total_amount", 0),
+		"gift_count": gift_count,
+		"ytd_gift_count": current_year.get("gift_count", 0),
+		"first_gift_date": state["first_gift_date"],
+		"last_gift_date": state["last_gift_date"],
+		"days_since_last_gift": date_diff(today, state["last_gift_date"]) if state["last_gift_date"] else None,
+		"gifts_per_month": gifts_per_month,
+		"category_mix": category_mix,
+	}
+
+
+def clear_profile(member):
+	frappe.cache().delete_value(get_profile_key(member))
+
+
+def handle_contribution_submit(doc, method=None):
+	if doc.member:
+		# Dropped rather than updated in place: a read-modify-write from two workers would lose one
+		frappe.db.after_commit.add(lambda: clear_profile(doc.member))
+
+
+def handle_contribution_cancel(doc, method=None):
+	if doc.member:
+		frappe.db.after_commit.add(lambda: clear_profile(doc.member))
+
+
+def clear_member_profile(doc, method=None, *args, **kwargs):
+	"""Drop the cached profile of a deleted or renamed member"""
+	clear_profile(doc.name)
+	if args:
+		# after_rename passes (old, new, merge)
+		clear_profile(args[0])
@@ -9,9 +9,41 @@ frappe.ui.form.on("Member", {
 				send_welcome_sms_manual(frm);
 			}, __('SMS'));
 		}
+
+		if (!frm.doc.__islocal && frappe.model.can_read('Tithes and Offerings')) {
+			show_contribution_profile(frm);
+		}
 	},
 });
 
+function show_contribution_profile(frm) {
+	frappe.call({
+		method: "stewardpro.stewardpro.doctype.member.contribution_profile.get_member_contribution_profile",
+		args: {
+			member: frm.doc.name
+		},
+		callback: function(r) {
+			let profile = r.message;
+			if (!profile || !profile.gift_count) {
+				return;
+			}
+
+			frm.dashboard.add_indicator(
+				__('YTD Giving: {0}', [format_currency(profile.ytd_total)]),
+				profile.ytd_gift_count ? 'green' : 'orange'
+			);
+			frm.dashboard.add_indicator(
+				__('Lifetime Giving: {0}', [format_currency(profile.lifetime_total)]),
+				'blue'
+			);
+			frm.dashboard.add_indicator(
+				__('Last Gift: {0}', [frappe.datetime.str_to_user(profile.last_gift_date)]),
+				profile.days_since_last_gift > 90 ? 'red' : 'green'
+			);
+		}
+	});
+}
+
 function send_welcome_sms_manual(frm) {
 	if (!frm.doc.contact) {
 		frappe.msgprint({
@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+from stewardpro.stewardpro.utils.phone_numbers import normalize_phone
+
 
 class Member(Document):
 	# begin: auto-generated types
@@ -27,6 +29,7 @@ class Member(Document):
 		gender: DF.Literal["", "Male", "Female"]
 		member_id: DF.Data
 		membership_date: DF.Date | None
+		normalized_contact: DF.Data | None
 		notes: DF.Text | None
 		occupation: DF.Data | None
 		relationship: DF.Data | None
@@ -42,6 +45,7 @@ class Member(Document):
 	
 	def validate_contact(self):
 		"""Validate contact information format"""
+		self.normalized_contact = normalize_phone(self.contact)
 		if self.contact:
 			# Basic validation for contact format
 			if len(self.contact) < 10:
@@ -80,7 +84,7 @@ class Member(Document):
 	def after_insert(self):
 		"""Actions after inserting a new member"""
 		# Send welcome SMS if phone number is available
-		if self.contact:
+		if self.contact and not frappe.flags.mute_sms:
 			self.send_welcome_sms()
 
 	def send_welcome_sms(self):
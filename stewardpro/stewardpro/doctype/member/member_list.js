@@ -10,6 +10,12 @@ frappe.listview_settings['Member'] = {
 		});
 	},
 
+	refresh: function(listview) {
+		if (frappe.model.can_read('Tithes and Offerings')) {
+			show_contribution_profiles(listview);
+		}
+	},
+
 	get_indicator: function(doc) {
 		// Add status indicators
 		if (doc.status === "Active") {
@@ -24,6 +30,41 @@ frappe.listview_settings['Member'] = {
 	}
 };
 
+function show_contribution_profiles(listview) {
+	let members = (listview.data || []).map(member => member.name);
+	if (members.length === 0) {
+		return;
+	}
+
+	// One call for the whole page instead of one per row
+	frappe.call({
+		method: "stewardpro.stewardpro.doctype.member.contribution_profile.get_member_contribution_profiles",
+		args: {
+			members: members
+		},
+		callback: function(r) {
+			let profiles = r.message || {};
+			Object.keys(profiles).forEach(function(member) {
+				let profile = profiles[member];
+				let $row = listview.$result
+					.find(`.list-row-checkbox[data-name="${CSS.escape(member)}"]`)
+					.closest('.list-row');
+
+				$row.find('.contribution-profile').remove();
+				if (!profile.gift_count) {
+					return;
+				}
+
+				$row.find('.list-row-activity').prepend(
+					`<span class="contribution-profile text-muted" title="${__('Year to date giving')}">
+						${format_currency(profile.ytd_total)}
+					</span>`
+				);
+			});
+		}
+	});
+}
+
 function send_bulk_welcome_sms(listview) {
 	// Get selected members
 	let selected_members = listview.get_checked_items();
@@ -23,3 +23,10 @@ class SMSLog(Document):
 			clean_type = "".join(c for c in sms_type if c.isalnum() or c in (' ', '-', '_')).strip()
 			clean_type = clean_type.replace(' ', '-')[:20]
 			self.name = f"{clean_type}-{timestamp}"
+
+
+def on_doctype_update():
+	# Failed-delivery lists and resends filter on status over a date range;
+	# delivery reports look messages up by provider id and number
+	frappe.db.add_index("SMS Log", ["delivery_status", "sent_on"])
+	frappe.db.add_index("SMS Log", ["provider_message_id", "receiver"])
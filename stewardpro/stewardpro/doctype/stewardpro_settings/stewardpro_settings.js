@@ -11,6 +11,8 @@ frappe.ui.form.on('StewardPro Settings', {
 		frm.add_custom_button(__('Test Mobile Money'), function() {
 			test_mobile_money_connection(frm);
 		}, __('Actions'));
+
+		show_sms_sending_status(frm);
 	},
 
 	enable_sms_integration: function(frm) {
@@ -110,6 +112,34 @@ function test_mobile_money_connection(frm) {
 	});
 }
 
+function show_sms_sending_status(frm) {
+	if (!frm.doc.enable_sms_integration || frm.doc.sms_circuit_status !== 'Open') {
+		return;
+	}
 
+	frappe.call({
+		method: 'stewardpro.stewardpro.api.sms_campaign.get_sms_sending_status',
+		callback: function(r) {
+			let status = r.message || {};
+			let message = status.circuit
+				? __('SMS sending is paused until {0}: {1}', [frappe.datetime.str_to_user(status.circuit.retry_after), status.circuit.reason])
+				: __('SMS sending will resume with the next message: {0}', [frm.doc.sms_circuit_reason]);
+			if (status.deferred) {
+				message += ' ' + __('{0} messages are waiting to be sent.', [status.deferred]);
+			}
+			frm.dashboard.set_headline_alert(message, 'orange');
+		}
+	});
 
-
+	frm.add_custom_button(__('Resume SMS Sending'), function() {
+		frappe.confirm(__('Resume SMS sending now and send the waiting messages?'), function() {
+			frappe.call({
+				method: 'stewardpro.stewardpro.api.sms_throttle.resume_sms_sending',
+				callback: function() {
+					frappe.show_alert({ message: __('SMS sending resumed'), indicator: 'green' });
+					frm.reload_doc();
+				}
+			});
+		});
+	}, __('Actions'));
+}
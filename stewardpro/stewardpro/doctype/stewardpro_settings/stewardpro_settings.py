@@ -18,19 +18,49 @@ class StewardProSettings(Document):
 
 		enable_mobile_money_integration: DF.Check
 		enable_sms_integration: DF.Check
+		enforce_budget_limits: DF.Check
 		mobile_money_base_url: DF.Data | None
 		money_api_key: DF.Password | None
 		money_public_key: DF.Password | None
+		provider_test_phone: DF.Phone | None
 		sms_api_key: DF.Password | None
 		sms_api_secret: DF.Password | None
 		sms_base_url: DF.Data | None
+		sms_campaign_department_heads: DF.Check
+		sms_campaign_lapsed_givers: DF.Check
+		sms_campaign_weekly_givers: DF.Check
+		sms_circuit_opened_on: DF.Datetime | None
+		sms_circuit_reason: DF.SmallText | None
+		sms_circuit_retry_after: DF.Datetime | None
+		sms_circuit_status: DF.Literal["Closed", "Open"]
+		sms_cost_per_segment: DF.Currency
+		sms_default_country_code: DF.Data | None
+		sms_delivery_report_token: DF.Password | None
+		sms_lapsed_giving_weeks: DF.Int
+		sms_messages_per_second: DF.Int
+		sms_pause_minutes: DF.Int
+		sms_receipt_mode: DF.Literal["Per Contribution", "Daily Digest", "Sabbath Digest"]
 		sms_sender_id: DF.Data | None
 		supported_providers: DF.Data | None
 	# end: auto-generated types
 
 	def validate(self):
 		"""Validate StewardPro Settings"""
-		pass
+		if self.sms_default_country_code:
+			self.sms_default_country_code = self.sms_default_country_code.strip().lstrip("+")
+			if not self.sms_default_country_code.isdigit():
+				frappe.throw("Default Country Calling Code must contain digits only")
+
+	def on_update(self):
+		"""Phone numbers entered without a country code depend on the default one"""
+		if self.has_value_changed("sms_default_country_code"):
+			frappe.enqueue(
+				"stewardpro.stewardpro.utils.phone_numbers.update_member_normalized_contacts",
+				country_code=self.sms_default_country_code,
+				queue="long",
+				job_id="update_member_normalized_contacts",
+				deduplicate=True,
+			)
 
 
 @frappe.whitelist()
@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+from stewardpro.stewardpro.api.sms_receipts import is_digest_mode
+
 
 class TithesandOfferings(Document):
 	# begin: auto-generated types
@@ -25,6 +27,7 @@ class TithesandOfferings(Document):
 		offering_to_field: DF.Currency
 		payment_mode: DF.Literal["Cash", "Mpesa", "Bank Transfer", "Other"]
 		receipt_number: DF.Data | None
+		receipt_sms_sent: DF.Check
 		tithe_amount: DF.Currency
 		total_amount: DF.Currency
 	# end: auto-generated types
@@ -109,8 +112,9 @@ class TithesandOfferings(Document):
 
 	def after_submit(self):
 		"""Actions after submitting the document"""
-		# Send receipt SMS if member has phone number
-		if self.member:
+		# Send receipt SMS if member has phone number; in digest mode the
+		# evening digest job sends one combined receipt per member instead
+		if self.member and not frappe.flags.mute_sms and not is_digest_mode():
 			self.send_receipt_sms()
 
 	def send_receipt_sms(self):
@@ -139,6 +143,8 @@ class TithesandOfferings(Document):
 				timeout=60,
 				is_async=True
 			)
+			# Not picked up again if receipts switch to digest mode
+			self.db_set("receipt_sms_sent", 1, update_modified=False)
 
 			frappe.msgprint(
 				f"Receipt SMS will be sent to {member_doc.full_name} at {member_doc.contact}",
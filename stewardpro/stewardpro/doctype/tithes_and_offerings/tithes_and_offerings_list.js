@@ -8,6 +8,16 @@ frappe.listview_settings['Tithes and Offerings'] = {
 		listview.page.add_action_item(__('Send Receipt SMS'), function() {
 			send_bulk_receipt_sms(listview);
 		});
+
+		listview.page.add_menu_item(__('Send Receipt SMS for Filtered Records'), function() {
+			send_bulk_receipt_sms(listview, true);
+		});
+
+		if (frappe.user.has_role(['System Manager', 'Treasurer'])) {
+			listview.page.add_inner_button(__('Giving Statements'), function() {
+				generate_giving_statements();
+			});
+		}
 	},
 
 	get_indicator: function(doc) {
@@ -22,191 +32,164 @@ frappe.listview_settings['Tithes and Offerings'] = {
 	}
 };
 
-function send_bulk_receipt_sms(listview) {
-	// Get selected records
-	let selected_records = listview.get_checked_items();
-	
-	if (selected_records.length === 0) {
-		frappe.msgprint({
-			title: __('No Records Selected'),
-			message: __('Please select tithe/offering records to send receipt SMS.'),
-			indicator: 'orange'
-		});
-		return;
-	}
-	
-	// Filter submitted records only
-	let submitted_records = selected_records.filter(record => record.docstatus === 1);
-	let non_submitted_records = selected_records.filter(record => record.docstatus !== 1);
-	
-	if (submitted_records.length === 0) {
-		frappe.msgprint({
-			title: __('No Submitted Records'),
-			message: __('Only submitted tithe/offering records can have receipt SMS sent. Please submit the records first.'),
-			indicator: 'orange'
-		});
-		return;
-	}
-	
-	// Filter records with members who have phone numbers
-	let records_with_phone = [];
-	let records_without_phone = [];
-	let records_without_member = [];
-	
-	// We need to check each record for member and phone number
-	let promises = submitted_records.map(record => {
-		return new Promise((resolve) => {
-			if (!record.member) {
-				records_without_member.push(record);
-				resolve();
-				return;
-			}
-			
-			frappe.call({
-				method: 'frappe.client.get_value',
-				args: {
-					doctype: 'Member',
-					filters: {'name': record.member},
-					fieldname: ['contact', 'full_name']
-				},
-				callback: function(r) {
-					if (r.message && r.message.contact) {
-						records_with_phone.push({
-							...record,
-							member_phone: r.message.contact,
-							member_name: r.message.full_name
-						});
-					} else {
-						records_without_phone.push(record);
-					}
-					resolve();
-				},
-				error: function() {
-					records_without_phone.push(record);
-					resolve();
-				}
-			});
-		});
-	});
-	
-	Promise.all(promises).then(() => {
-		if (records_with_phone.length === 0) {
-			let message = __('None of the selected records have members with phone numbers.');
-			if (records_without_member.length > 0) {
-				message += '<br><br>' + __('<strong>Records without members:</strong> {0}', [records_without_member.length]);
-			}
-			if (records_without_phone.length > 0) {
-				message += '<br><br>' + __('<strong>Members without phone numbers:</strong> {0}', [records_without_phone.length]);
-			}
-			
+function send_bulk_receipt_sms(listview, use_filters) {
+	let args = {};
+	if (use_filters) {
+		args.filters = listview.get_filters_for_args();
+	} else {
+		let selected_records = listview.get_checked_items();
+		if (selected_records.length === 0) {
 			frappe.msgprint({
-				title: __('No Phone Numbers'),
-				message: message,
+				title: __('No Records Selected'),
+				message: __('Please select tithe/offering records to send receipt SMS.'),
 				indicator: 'orange'
 			});
 			return;
 		}
-		
-		// Show confirmation dialog
-		let message = __('Send receipt SMS for {0} tithe/offering record(s)?', [records_with_phone.length]);
-		
-		let skipped_count = records_without_phone.length + records_without_member.length + non_submitted_records.length;
-		if (skipped_count > 0) {
-			message += '<br><br>' + __('<strong>Note:</strong> {0} record(s) will be skipped:', [skipped_count]);
-			if (non_submitted_records.length > 0) {
-				message += '<br>• ' + __('Not submitted: {0}', [non_submitted_records.length]);
+		args.names = selected_records.map(record => record.name);
+	}
+
+	// Member and phone checks for the whole selection run on the server in one query
+	frappe.call({
+		method: 'stewardpro.stewardpro.api.sms_receipts.get_receipt_eligibility',
+		args: args,
+		freeze: true,
+		callback: function(r) {
+			if (!r.message) {
+				return;
 			}
-			if (records_without_member.length > 0) {
-				message += '<br>• ' + __('No member assigned: {0}', [records_without_member.length]);
+			let eligibility = r.message;
+
+			let skipped = '';
+			if (eligibility.ineligible.length > 0) {
+				skipped = '<br><br>' + __('<strong>Note:</strong> {0} record(s) will be skipped:', [eligibility.total - eligibility.eligible]);
+				eligibility.ineligible.forEach(function(row) {
+					skipped += '<br>• ' + frappe.utils.escape_html(row.label) + ': ' + row.count;
+				});
 			}
-			if (records_without_phone.length > 0) {
-				message += '<br>• ' + __('Member has no phone: {0}', [records_without_phone.length]);
+
+			if (eligibility.eligible === 0) {
+				frappe.msgprint({
+					title: __('No Phone Numbers'),
+					message: __('None of the selected records can be sent a receipt SMS.') + skipped,
+					indicator: 'orange'
+				});
+				return;
 			}
+
+			frappe.confirm(
+				__('Send receipt SMS for {0} tithe/offering record(s)?', [eligibility.eligible]) + skipped,
+				function() {
+					start_receipt_sms(listview, args);
+				}
+			);
 		}
-		
-		frappe.confirm(
-			message,
-			function() {
-				// Show progress alert
+	});
+}
+
+function start_receipt_sms(listview, args) {
+	frappe.call({
+		method: 'stewardpro.stewardpro.api.sms_receipts.send_selected_receipts',
+		args: args,
+		callback: function(r) {
+			if (r.message && r.message.queued) {
 				frappe.show_alert({
-					message: __('Sending receipt SMS for {0} record(s)...', [records_with_phone.length]),
+					message: __('Sending receipt SMS in the background...'),
 					indicator: 'blue'
 				});
-				
-				// Extract record names
-				let record_names = records_with_phone.map(record => record.name);
-				
-				// Send bulk SMS
-				frappe.call({
-					method: "stewardpro.stewardpro.api.sms.send_bulk_receipt_sms",
-					args: {
-						record_names: record_names
-					},
-					callback: function(r) {
-						if (r.message && r.message.success) {
-							let result = r.message;
-							
-							frappe.show_alert({
-								message: __('Receipt SMS sent for {0} record(s), {1} failed', [result.successful, result.failed]),
-								indicator: result.failed > 0 ? 'orange' : 'green'
-							});
-							
-							// Show detailed results
-							let details_html = `
-								<div class="sms-results">
-									<h5>Receipt SMS Results</h5>
-									<p><strong>Total:</strong> ${result.total}</p>
-									<p><strong>Successful:</strong> ${result.successful}</p>
-									<p><strong>Failed:</strong> ${result.failed}</p>
-							`;
-							
-							if (result.failed > 0) {
-								details_html += '<h6>Failed Records:</h6><ul>';
-								result.results.forEach(function(res) {
-									if (!res.success) {
-										details_html += `<li>${res.record}: ${res.error}</li>`;
-									}
-								});
-								details_html += '</ul>';
-							}
-							
-							details_html += '</div>';
-							
-							frappe.msgprint({
-								title: __('Bulk Receipt SMS Results'),
-								message: details_html,
-								indicator: result.failed > 0 ? 'orange' : 'green'
-							});
-							
-							// Refresh the list view
-							listview.refresh();
-						} else {
-							frappe.show_alert({
-								message: __('Failed to send bulk receipt SMS'),
-								indicator: 'red'
-							});
-							
-							frappe.msgprint({
-								title: __('SMS Error'),
-								message: __('Failed to send bulk receipt SMS: ') + (r.message ? r.message.error : 'Unknown error'),
-								indicator: 'red'
-							});
-						}
-					},
-					error: function(r) {
-						frappe.show_alert({
-							message: __('Bulk receipt SMS error'),
-							indicator: 'red'
-						});
-						
-						frappe.msgprint({
-							title: __('SMS Error'),
-							message: __('Failed to send bulk receipt SMS. Please check your internet connection and try again.'),
-							indicator: 'red'
-						});
-					}
+				poll_receipt_sms_progress(listview, r.message.job_id);
+			}
+		}
+	});
+}
+
+function poll_receipt_sms_progress(listview, job_id) {
+	frappe.call({
+		method: 'stewardpro.stewardpro.api.sms_receipts.get_receipt_progress',
+		args: { job_id: job_id },
+		callback: function(r) {
+			let progress = r.message || {};
+
+			if (progress.status === 'done') {
+				frappe.hide_progress();
+				frappe.msgprint({
+					title: __('Bulk Receipt SMS Results'),
+					message: `
+						<div class="sms-results">
+							<p><strong>${__('Total')}:</strong> ${progress.total}</p>
+							<p><strong>${__('Successful')}:</strong> ${progress.sent}</p>
+							<p><strong>${__('Failed')}:</strong> ${progress.failed}</p>
+							${progress.deferred ? `<p><strong>${__('Waiting for SMS sending to resume')}:</strong> ${progress.deferred}</p>` : ''}
+							<p><strong>${__('SMS Segments')}:</strong> ${progress.segments}</p>
+						</div>`,
+					indicator: progress.failed > 0 || progress.deferred > 0 ? 'orange' : 'green'
 				});
+				listview.refresh();
+				return;
+			}
+
+			if (progress.status === 'sending' && progress.total) {
+				frappe.show_progress(__('Sending Receipt SMS'), progress.done, progress.total,
+					__('{0} of {1} sent', [progress.done, progress.total]));
+			}
+
+			if (progress.status !== 'unknown') {
+				setTimeout(() => poll_receipt_sms_progress(listview, job_id), 2000);
 			}
-		);
+		}
 	});
 }
+
+function generate_giving_statements() {
+	frappe.prompt([
+		{
+			fieldname: 'year',
+			fieldtype: 'Int',
+			label: __('Year'),
+			reqd: 1,
+			default: new Date().getFullYear() - 1
+		},
+		{
+			fieldname: 'output',
+			fieldtype: 'Select',
+			label: __('Output'),
+			options: [
+				{ value: 'archive', label: __('Single ZIP archive') },
+				{ value: 'per_member', label: __('Attach to each Member') }
+			],
+			default: 'archive'
+		}
+	], function(values) {
+		frappe.call({
+			method: 'stewardpro.stewardpro.api.statements.generate_giving_statements',
+			args: values,
+			callback: function(r) {
+				if (r.message && r.message.queued) {
+					frappe.show_alert({
+						message: __('Generating giving statements for {0}...', [r.message.year]),
+						indicator: 'blue'
+					});
+				} else if (r.message) {
+					frappe.show_alert({
+						message: __('Giving statements for {0} are already being generated', [r.message.year]),
+						indicator: 'orange'
+					});
+				}
+			}
+		});
+
+		frappe.realtime.off('giving_statements_ready');
+		frappe.realtime.on('giving_statements_ready', function(result) {
+			let message = __('{0} giving statement(s) generated for {1}.', [result.count, result.year]);
+			if (result.file_url) {
+				message += '<br><br><a href="' + result.file_url + '" target="_blank">' + __('Download archive') + '</a>';
+			}
+
+			frappe.msgprint({
+				title: __('Giving Statements Ready'),
+				message: message,
+				indicator: 'green'
+			});
+		});
+	}, __('Generate Giving Statements'), __('Generate'));
+}
@@ -0,0 +1,125 @@
+// Copyright (c) 2025, Innocent P Metumba and contributors
+// For license information, please see license.txt
+
+frappe.pages['stewardpro-performance'].on_page_load = function(wrapper) {
+	let page = frappe.ui.make_app_page({
+		parent: wrapper,
+		title: __('StewardPro Performance'),
+		single_column: true
+	});
+
+	page.limit_field = page.add_field({
+		fieldname: 'limit',
+		label: __('Top N'),
+		fieldtype: 'Int',
+		default: 20,
+		change: function() {
+			load_performance_summary(page);
+		}
+	});
+
+	page.set_primary_action(__('Refresh'), function() {
+		load_performance_summary(page);
+	}, 'refresh');
+
+	page.add_inner_button(__('Clear Log'), function() {
+		frappe.confirm(__('Clear all recorded calls?'), function() {
+			frappe.call({
+				method: 'stewardpro.stewardpro.page.stewardpro_performance.stewardpro_performance.clear_performance_log',
+				callback: function() {
+					load_performance_summary(page);
+				}
+			});
+		});
+	});
+
+	page.$content = $('<div class="stewardpro-performance"></div>').appendTo(page.body);
+	load_performance_summary(page);
+};
+
+function load_performance_summary(page) {
+	frappe.call({
+		method: 'stewardpro.stewardpro.page.stewardpro_performance.stewardpro_performance.get_performance_summary',
+		args: {
+			limit: page.limit_field.get_value() || 20
+		},
+		callback: function(r) {
+			if (r.message) {
+				render_performance_summary(page, r.message);
+			}
+		}
+	});
+}
+
+function format_ms(value) {
+	return (value || 0).toFixed(1);
+}
+
+function render_performance_summary(page, data) {
+	let html = '';
+
+	if (!data.enabled) {
+		html += `<div class="alert alert-warning">
+			${__('Instrumentation is disabled. Enable it with')}
+			<code>bench --site ${frappe.boot.sitename} set-config stewardpro_instrumentation 1</code>
+		</div>`;
+	}
+
+	html += `<p class="text-muted">${__('{0} recorded call(s)', [data.recorded])}</p>`;
+
+	html += `<h5>${__('Slowest Calls (by p95)')}</h5>
+		<table class="table table-bordered table-sm">
+			<thead><tr>
+				<th>${__('Call')}</th>
+				<th class="text-right">${__('Count')}</th>
+				<th class="text-right">${__('p50 ms')}</th>
+				<th class="text-right">${__('p95 ms')}</th>
+				<th class="text-right">${__('Max ms')}</th>
+				<th class="text-right">${__('Avg Queries')}</th>
+				<th class="text-right">${__('Avg SQL ms')}</th>
+				<th class="text-right">${__('Avg Python ms')}</th>
+				<th class="text-right">${__('Avg Rows')}</th>
+			</tr></thead><tbody>`;
+
+	data.summary.forEach(function(row) {
+		html += `<tr>
+			<td>${frappe.utils.escape_html(row.call)}</td>
+			<td class="text-right">${row.count}</td>
+			<td class="text-right">${format_ms(row.p50_ms)}</td>
+			<td class="text-right">${format_ms(row.p95_ms)}</td>
+			<td class="text-right">${format_ms(row.max_ms)}</td>
+			<td class="text-right">${row.avg_queries.toFixed(1)}</td>
+			<td class="text-right">${format_ms(row.avg_sql_ms)}</td>
+			<td class="text-right">${format_ms(row.avg_python_ms)}</td>
+			<td class="text-right">${row.avg_rows.toFixed(0)}</td>
+		</tr>`;
+	});
+	html += '</tbody></table>';
+
+	html += `<h5>${__('Slowest Requests')}</h5>
+		<table class="table table-bordered table-sm">
+			<thead><tr>
+				<th>${__('Time')}</th>
+				<th>${__('Call')}</th>
+				<th>${__('User')}</th>
+				<th class="text-right">${__('Elapsed ms')}</th>
+				<th class="text-right">${__('Queries')}</th>
+				<th class="text-right">${__('SQL ms')}</th>
+				<th class="text-right">${__('Rows')}</th>
+			</tr></thead><tbody>`;
+
+	data.slowest.forEach(function(row) {
+		html += `<tr>
+			<td>${frappe.datetime.str_to_user(row.timestamp)}</td>
+			<td>${frappe.utils.escape_html(row.call)}</td>
+			<td>${frappe.utils.escape_html(row.user || '')}</td>
+			<td class="text-right">${format_ms(row.elapsed_ms)}</td>
+			<td class="text-right">${row.queries}</td>
+			<td class="text-right">${format_ms(row.sql_ms)}</td>
+			<td class="text-right">${row.rows}</td>
+		</tr>`;
+	});
+	html += '</tbody></table>';
+
+	page.$content.html(html);
+}
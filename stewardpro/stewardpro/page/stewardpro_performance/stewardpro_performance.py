@@ -0,0 +1,29 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import cint
+
+from stewardpro.stewardpro.utils.instrumentation import clear_calls, get_calls, is_enabled, summarize_calls
+
+
+@frappe.whitelist()
+def get_performance_summary(limit=20):
+	"""Top-N slowest StewardPro calls and the slowest individual requests"""
+	frappe.only_for("System Manager")
+
+	limit = cint(limit) or 20
+	calls = get_calls()
+
+	return {
+		"enabled": is_enabled(),
+		"recorded": len(calls),
+		"summary": summarize_calls(calls, limit=limit),
+		"slowest": sorted(calls, key=lambda entry: entry["elapsed_ms"], reverse=True)[:limit],
+	}
+
+
+@frappe.whitelist()
+def clear_performance_log():
+	frappe.only_for("System Manager")
+	clear_calls()
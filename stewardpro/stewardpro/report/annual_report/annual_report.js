@@ -8,8 +8,14 @@ frappe.query_reports["Annual Report"] = {
 			"label": __("Year"),
 			"fieldtype": "Select",
 			"options": get_year_options(),
-			"default": new Date().getFullYear().toString(),
-			"reqd": 1
+			"default": new Date().getFullYear().toString()
+		},
+		{
+			"fieldname": "fiscal_year",
+			"label": __("Fiscal Year"),
+			"fieldtype": "Link",
+			"options": "Fiscal Year",
+			"description": __("Compares the selected Fiscal Year with the one before it instead of the calendar year")
 		}
 	],
 	
@@ -111,12 +117,29 @@ frappe.query_reports["Annual Report"] = {
 		
 		// Add button to view detailed breakdown
 		report.page.add_inner_button(__("Detailed Breakdown"), function() {
-			let year = report.get_values().year;
-			
-			// Open multiple related reports in new tabs
-			frappe.set_route("query-report", "Tithes and Offerings Report", {
-				from_date: `${year}-01-01`,
-				to_date: `${year}-12-31`
+			let filters = report.get_values();
+			let open_breakdown = function(from_date, to_date) {
+				frappe.set_route("query-report", "Tithes and Offerings Report", {
+					from_date: from_date,
+					to_date: to_date
+				});
+			};
+
+			// Open the related report over the same period
+			if (filters.fiscal_year) {
+				frappe.db.get_value("Fiscal Year", filters.fiscal_year, ["year_start_date", "year_end_date"], function(r) {
+					if (r) open_breakdown(r.year_start_date, r.year_end_date);
+				});
+				return;
+			}
+
+			frappe.call({
+				method: "stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods.get_fiscal_period",
+				args: { year: filters.year },
+				callback: function(r) {
+					if (!r.message) return;
+					open_breakdown(r.message.from_date, r.message.to_date);
+				}
 			});
 		});
 	}
@@ -5,7 +5,20 @@ import frappe
 from frappe import _
 from frappe.query_builder import DocType
 from frappe.query_builder.functions import Sum
-from frappe.utils import getdate, flt
+from frappe.utils import add_days, flt, getdate
+
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import (
+	get_current_and_previous_dates,
+	get_fiscal_year_dates,
+	get_year_dates,
+)
+from stewardpro.stewardpro.utils.charts import (
+	SeriesAccumulator,
+	accumulate,
+	is_label_row,
+	load_rows,
+	make_chart,
+)
 
 def execute(filters=None):
 	if not filters:
@@ -64,14 +77,13 @@ def get_columns():
 
 
 def get_data(filters):
-	year = int(filters.get("year", getdate().year))
-	previous_year = year - 1
+	current_dates, previous_dates = get_report_periods(filters)
 
 	# Get current year data
-	current_data = get_year_data(year)
+	current_data = get_period_data(*current_dates)
 
 	# Get previous year data for comparison
-	previous_data = get_year_data(previous_year)
+	previous_data = get_period_data(*previous_dates)
 
 	# Calculate total income for percentage calculations
 	total_income = (
@@ -226,11 +238,22 @@ def get_data(filters):
 	return data
 
 
-def get_year_data(year):
-	"""Get financial data for a specific year using Frappe QB"""
-	# Create date range for the year
-	year_start = getdate(f"{year}-01-01")
-	year_end = getdate(f"{year}-12-31")
+def get_report_periods(filters):
+	"""Date ranges of the selected Fiscal Year (or calendar year) and of the one before it"""
+	if filters.get("fiscal_year"):
+		fiscal_year_dates = get_fiscal_year_dates(filters.get("fiscal_year"))
+		if not fiscal_year_dates:
+			frappe.throw(_("Fiscal Year {0} not found").format(filters.get("fiscal_year")))
+		# The period containing the day before it starts is the previous Fiscal Year
+		previous_dates = get_current_and_previous_dates(add_days(fiscal_year_dates[0], -1))[0]
+		return fiscal_year_dates, previous_dates
+
+	year = int(filters.get("year") or getdate().year)
+	return get_year_dates(year), get_year_dates(year - 1)
+
+
+def get_period_data(year_start, year_end):
+	"""Get financial data for a date range using Frappe QB"""
 
 	contrib_data = {}
 	expense_data = {}
@@ -289,213 +312,111 @@ def get_chart_data(data, filters):
 		return None
 
 	# Extract income categories for chart
-	income_categories = []
-	income_amounts = []
-	previous_year_amounts = []
-
-	for row in data:
-		category = row.get("category", "")
-		if category and not category.startswith("<b>") and category.strip():
-			if any(keyword in category.upper() for keyword in ["TITHE", "OFFERING", "INCOME"]):
-				income_categories.append(category)
-				income_amounts.append(row.get("amount", 0))
-				previous_year_amounts.append(row.get("previous_year_amount", 0))
-
-	if not income_categories:
+	income = SeriesAccumulator(("amount", "previous_year_amount"))
+	accumulate(data, [(income, income_category_key(("TITHE", "OFFERING", "INCOME")))])
+
+	if not income:
 		return None
 
-	return {
-		"data": {
-			"labels": income_categories,
-			"datasets": [
-				{
-					"name": "Current Year",
-					"values": income_amounts
-				},
-				{
-					"name": "Previous Year",
-					"values": previous_year_amounts
-				}
-			]
-		},
-		"type": "bar",
-		"height": 300,
-		"colors": ["#2E7D32", "#1976D2"]
-	}
+	return make_chart(
+		income.labels,
+		[
+			("Current Year", income.values("amount")),
+			("Previous Year", income.values("previous_year_amount")),
+		],
+		colors=["#2E7D32", "#1976D2"],
+	)
 
 
-def parse_amount(value):
-	"""Parse amount from potentially HTML-formatted string"""
-	import re
-	if value is None or value == "":
-		return 0
-	if isinstance(value, (int, float)):
-		return float(value)
-	# Remove HTML tags
-	value = re.sub(r'<[^>]+>', '', str(value))
-	# Remove currency symbols and formatting
-	value = re.sub(r'[^\d.-]', '', value)
-	try:
-		return float(value) if value else 0
-	except (ValueError, TypeError):
-		return 0
+def income_category_key(keywords):
+	"""Row key for data rows whose category mentions one of the keywords"""
+
+	def get_key(row):
+		category = row.get("category") or ""
+		if is_label_row(category) or not any(keyword in category.upper() for keyword in keywords):
+			return None
+		return category
+
+	return get_key
 
 
 @frappe.whitelist()
 def get_category_breakdown_chart(data, filters):
 	"""Generate category breakdown pie chart"""
-	if not data:
-		return None
-
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
+	rows = load_rows(data)
+	if not rows:
 		return None
 
-	categories = []
-	amounts = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		category = row.get("category", "")
-		amount = parse_amount(row.get("amount"))
+	categories = SeriesAccumulator(("amount",))
+	accumulate(rows, [(categories, income_category_key(("TITHE", "OFFERING", "CAMP", "BUILDING")))])
 
-		if (category and not category.startswith("<b>") and
-			category.strip() and amount > 0 and
-			any(keyword in category.upper() for keyword in ["TITHE", "OFFERING", "CAMP", "BUILDING"])):
-			categories.append(category)
-			amounts.append(amount)
-
-	if not categories:
+	labels = [
+		label for label, amount in zip(categories.labels, categories.values("amount"), strict=True) if amount > 0
+	]
+	if not labels:
 		return None
 
-	return {
-		"data": {
-			"labels": categories,
-			"datasets": [{
-				"values": amounts
-			}]
-		},
-		"type": "pie",
-		"height": 300,
-		"colors": ["#4CAF50", "#2196F3", "#FF9800", "#9C27B0"]
-	}
+	return make_chart(
+		labels,
+		[(None, categories.values("amount", labels))],
+		chart_type="pie",
+		colors=["#4CAF50", "#2196F3", "#FF9800", "#9C27B0"],
+	)
 
 
 @frappe.whitelist()
 def get_year_comparison_chart(data, filters):
 	"""Generate year-over-year comparison chart"""
-	if not data:
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
-		return None
+	comparison = SeriesAccumulator(("amount", "previous_year_amount"))
+	accumulate(rows, [(comparison, lambda row: None if is_label_row(row.get("category")) else row["category"])])
 
-	categories = []
-	current_amounts = []
-	previous_amounts = []
-	changes = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		category = row.get("category", "")
-
-		# Convert amounts to float, handling empty strings and None values
-		try:
-			current = float(row.get("amount", 0) or 0)
-		except (ValueError, TypeError):
-			current = 0
-
-		try:
-			previous = float(row.get("previous_year_amount", 0) or 0)
-		except (ValueError, TypeError):
-			previous = 0
-
-		if (category and not category.startswith("<b>") and
-			category.strip() and (current > 0 or previous > 0)):
-			categories.append(category)
-			current_amounts.append(current)
-			previous_amounts.append(previous)
-
-			# Calculate percentage change
-			if previous > 0:
-				change = ((current - previous) / previous) * 100
-			else:
-				change = 100 if current > 0 else 0
-			changes.append(change)
+	labels = [
+		label
+		for label, current, previous in zip(
+			comparison.labels,
+			comparison.values("amount"),
+			comparison.values("previous_year_amount"),
+			strict=True,
+		)
+		if current > 0 or previous > 0
+	]
 
-	return {
-		"data": {
-			"labels": categories,
-			"datasets": [
-				{
-					"name": "Current Year",
-					"values": current_amounts
-				},
-				{
-					"name": "Previous Year",
-					"values": previous_amounts
-				}
-			]
-		},
-		"type": "bar",
-		"height": 350,
-		"colors": ["#4CAF50", "#FF5722"]
-	}
+	return make_chart(
+		labels,
+		[
+			("Current Year", comparison.values("amount", labels)),
+			("Previous Year", comparison.values("previous_year_amount", labels)),
+		],
+		height=350,
+		colors=["#4CAF50", "#FF5722"],
+	)
 
 
 @frappe.whitelist()
 def get_financial_health_metrics(data, filters):
 	"""Calculate financial health metrics"""
-	if not data:
+	rows = load_rows(data)
+	if not rows:
 		return {}
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return {}
-
-	if not isinstance(data, list):
-		return {}
-
-	total_income = 0
-	total_expenses = 0
-	previous_income = 0
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
+	def get_bucket(row):
+		category = (row.get("category") or "").upper()
+		if "INCOME" in category or any(keyword in category for keyword in ["TITHE", "OFFERING"]):
+			return "income"
+		if "EXPENSE" in category:
+			return "expense"
+		return None
 
-		category = row.get("category", "")
-		current = parse_amount(row.get("amount"))
-		previous = parse_amount(row.get("previous_year_amount"))
+	buckets = SeriesAccumulator(("amount", "previous_year_amount"))
+	accumulate(rows, [(buckets, get_bucket)])
 
-		if "INCOME" in category.upper() or any(keyword in category.upper() for keyword in ["TITHE", "OFFERING"]):
-			total_income += current
-			previous_income += previous
-		elif "EXPENSE" in category.upper():
-			total_expenses += current
+	total_income = buckets.values("amount", ["income"])[0] if "income" in buckets.labels else 0
+	previous_income = buckets.values("previous_year_amount", ["income"])[0] if "income" in buckets.labels else 0
+	total_expenses = buckets.values("amount", ["expense"])[0] if "expense" in buckets.labels else 0
 
 	net_income = total_income - total_expenses
 	income_growth = ((total_income - previous_income) / previous_income * 100) if previous_income > 0 else 0
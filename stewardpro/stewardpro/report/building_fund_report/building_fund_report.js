@@ -10,6 +10,20 @@ frappe.query_reports["Building Fund Report"] = {
 			"options": get_year_options(),
 			"default": new Date().getFullYear().toString()
 		},
+		{
+			"fieldname": "fiscal_year",
+			"label": __("Fiscal Year"),
+			"fieldtype": "Link",
+			"options": "Fiscal Year",
+			"on_change": function() {
+				// Both filters narrow the period; a calendar year would cut the Fiscal Year short
+				if (frappe.query_report.get_filter_value("fiscal_year")) {
+					frappe.query_report.set_filter_value("year", "");
+				} else {
+					frappe.query_report.refresh();
+				}
+			}
+		},
 		{
 			"fieldname": "from_date",
 			"label": __("From Date"),
@@ -5,15 +5,16 @@ import frappe
 from frappe import _
 from frappe.query_builder import DocType
 from frappe.query_builder.functions import Avg, Count, Max, Min, Sum
-from frappe.utils import getdate, flt
+from frappe.utils import flt, getdate
+from pypika import analytics as an
 
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import get_fiscal_year_dates
+from stewardpro.stewardpro.utils.periods import (
+	apply_date_filters,
+	get_contribution_period_summary,
+	get_filter_year_dates,
+)
 
-# Define custom functions for date operations - commented out to avoid CustomFunction issues
-# def Year(field):
-# 	return CustomFunction("YEAR", [field])
-
-# def Month(field):
-# 	return CustomFunction("MONTH", [field])
 
 def execute(filters=None):
 	if not filters:
@@ -80,7 +81,19 @@ def get_columns():
 def get_data(filters):
 	TithesOfferings = DocType("Tithes and Offerings")
 	Member = DocType("Member")
-	
+
+	# Running total in chronological order; name breaks ties within a day so
+	# every row gets a stable cumulative value
+	running_total = (
+		an.Sum(TithesOfferings.church_building_offering)
+		.orderby(TithesOfferings.date, TithesOfferings.name)
+		.rows(an.Preceding(), an.CURRENT_ROW)
+	)
+
+	opening_balance = get_opening_balance(filters)
+	if opening_balance:
+		running_total = running_total + opening_balance
+
 	# Build main query
 	query = (
 		frappe.qb.from_(TithesOfferings)
@@ -92,46 +105,65 @@ def get_data(filters):
 			Member.full_name.as_("member_name"),
 			TithesOfferings.church_building_offering,
 			TithesOfferings.payment_mode,
-			TithesOfferings.receipt_number
+			TithesOfferings.receipt_number,
+			running_total.as_("running_total")
 		)
 		.where(TithesOfferings.docstatus == 1)
 		.where(TithesOfferings.church_building_offering > 0)
-		.orderby(TithesOfferings.date, order=frappe.qb.desc)
+		.orderby(TithesOfferings.date, TithesOfferings.name)
 	)
-	
+
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
-	
+	query = apply_date_filters(query, TithesOfferings.date, filters)
+
 	if filters.get("contributor"):
 		query = query.where(TithesOfferings.member == filters.get("contributor"))
-	
+
 	data = query.run(as_dict=True)
-	
-	# Calculate running total and handle anonymous contributions
-	running_total = 0
+
+	# Handle anonymous contributions
 	for row in data:
 		if not row.get("member"):
 			row["member"] = ""
 			row["member_name"] = "Anonymous"
-		
-		running_total += flt(row.get("church_building_offering", 0))
-		row["running_total"] = running_total
-	
+
 	return data
 
+
+def get_opening_balance(filters):
+	"""Building fund total carried forward from before the start of the filtered period"""
+	period_start = get_period_start(filters)
+	if not period_start:
+		return 0
+
+	TithesOfferings = DocType("Tithes and Offerings")
+	query = (
+		frappe.qb.from_(TithesOfferings)
+		.select(Sum(TithesOfferings.church_building_offering))
+		.where(TithesOfferings.docstatus == 1)
+		.where(TithesOfferings.church_building_offering > 0)
+		.where(TithesOfferings.date < period_start)
+	)
+
+	if filters.get("contributor"):
+		query = query.where(TithesOfferings.member == filters.get("contributor"))
+
+	result = query.run()
+	return flt(result[0][0]) if result else 0
+
+
+def get_period_start(filters):
+	"""Latest of the year, fiscal_year and from_date filter starts, or None when unbounded"""
+	starts = []
+	for dates in (get_filter_year_dates(filters), get_fiscal_year_dates(filters.get("fiscal_year"))):
+		if dates:
+			starts.append(dates[0])
+	if filters.get("from_date"):
+		starts.append(getdate(filters.get("from_date")))
+
+	return max(starts) if starts else None
+
+
 @frappe.whitelist()
 def get_contributor_summary(filters):
 	"""Get building fund contributions summary by contributor"""
@@ -165,20 +197,7 @@ def get_contributor_summary(filters):
 	)
 	
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
+	query = apply_date_filters(query, TithesOfferings.date, filters)
 	
 	data = query.run(as_dict=True)
 	
@@ -193,15 +212,14 @@ def get_contributor_summary(filters):
 
 @frappe.whitelist()
 def get_monthly_summary(filters):
-	"""Get building fund contributions summary by month - simplified version"""
+	"""Get building fund contributions summary by month"""
 	import json
 	if isinstance(filters, str):
 		filters = json.loads(filters)
 	if not filters:
 		filters = {}
-	# Temporarily return empty data to avoid Year/Month function issues
-	# TODO: Implement proper monthly grouping without SQL date functions
-	return []
+
+	return get_contribution_period_summary("church_building_offering", filters, member_filter="contributor")
 
 
 @frappe.whitelist()
@@ -230,20 +248,7 @@ def get_project_progress(filters):
 	)
 
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
+	query = apply_date_filters(query, TithesOfferings.date, filters)
 	
 	result = query.run(as_dict=True)
 	return result[0] if result else {}
@@ -265,29 +270,24 @@ def get_contribution_trends(filters):
 		.select(
 			TithesOfferings.date,
 			TithesOfferings.church_building_offering,
-			Sum(TithesOfferings.church_building_offering).over(
-				order_by=TithesOfferings.date
-			).as_("cumulative_total")
+			an.Sum(TithesOfferings.church_building_offering)
+			.orderby(TithesOfferings.date, TithesOfferings.name)
+			.rows(an.Preceding(), an.CURRENT_ROW)
+			.as_("cumulative_total")
 		)
 		.where(TithesOfferings.docstatus == 1)
 		.where(TithesOfferings.church_building_offering > 0)
-		.orderby(TithesOfferings.date)
+		.orderby(TithesOfferings.date, TithesOfferings.name)
 	)
 
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
-	
-	return query.run(as_dict=True)
+	query = apply_date_filters(query, TithesOfferings.date, filters)
+
+	data = query.run(as_dict=True)
+
+	opening_balance = get_opening_balance(filters)
+	if opening_balance:
+		for row in data:
+			row["cumulative_total"] = flt(row.get("cumulative_total")) + opening_balance
+
+	return data
@@ -76,6 +76,40 @@ frappe.query_reports["Camp Meeting Contributions Report"] = {
 				}
 			});
 		});
+
+		// Add custom button to show monthly summary
+		report.page.add_inner_button(__("Monthly Summary"), function() {
+			let filters = report.get_values();
+			frappe.call({
+				method: "stewardpro.stewardpro.report.camp_meeting_contributions_report.camp_meeting_contributions_report.get_monthly_summary",
+				args: {
+					filters: filters
+				},
+				callback: function(r) {
+					if (r.message) {
+						let data = r.message;
+						let html = "<table class='table table-striped'>";
+						html += "<thead><tr><th>Month</th><th>Contributions</th><th>Total Amount</th></tr></thead><tbody>";
+						
+						data.forEach(function(row) {
+							html += `<tr>
+								<td>${row.month_name} ${row.year}</td>
+								<td>${row.contribution_count}</td>
+								<td>${format_currency(row.total_contribution)}</td>
+							</tr>`;
+						});
+						
+						html += "</tbody></table>";
+						
+						frappe.msgprint({
+							title: __("Monthly Camp Meeting Summary"),
+							message: html,
+							wide: true
+						});
+					}
+				}
+			});
+		});
 	}
 };
 
@@ -5,14 +5,8 @@ import frappe
 from frappe import _
 from frappe.query_builder import DocType
 from frappe.query_builder.functions import Sum, Count, Avg, Min, Max
-from frappe.utils import getdate
 
-# Define custom functions for date operations - commented out to avoid CustomFunction issues
-# def Year(field):
-# 	return frappe.qb.CustomFunction("YEAR", [field])
-
-# def Month(field):
-# 	return frappe.qb.CustomFunction("MONTH", [field])
+from stewardpro.stewardpro.utils.periods import apply_date_filters, get_contribution_period_summary
 
 
 def execute(filters=None):
@@ -94,20 +88,7 @@ def get_data(filters):
 	)
 	
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
+	query = apply_date_filters(query, TithesOfferings.date, filters)
 	
 	if filters.get("member"):
 		query = query.where(TithesOfferings.member == filters.get("member"))
@@ -154,20 +135,7 @@ def get_member_summary(filters=None):
 	)
 	
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
+	query = apply_date_filters(query, TithesOfferings.date, filters)
 	
 	data = query.run(as_dict=True)
 	
@@ -180,18 +148,30 @@ def get_member_summary(filters=None):
 	return data
 
 
-def get_yearly_summary(filters):
-	"""Get camp meeting contributions summary by year - simplified version"""
-	# Temporarily return empty data to avoid Year/Month function issues
-	# TODO: Implement proper yearly grouping without SQL date functions
-	return []
+@frappe.whitelist()
+def get_yearly_summary(filters=None):
+	"""Get camp meeting contributions summary by fiscal year"""
+	if not filters:
+		filters = {}
+
+	if isinstance(filters, str):
+		import json
+		filters = json.loads(filters)
+
+	return get_contribution_period_summary("campmeeting_offering", filters, by_month=False)
+
 
+@frappe.whitelist()
+def get_monthly_summary(filters=None):
+	"""Get camp meeting contributions summary by month"""
+	if not filters:
+		filters = {}
 
-def get_monthly_summary(filters):
-	"""Get camp meeting contributions summary by month - simplified version"""
-	# Temporarily return empty data to avoid Year/Month function issues
-	# TODO: Implement proper monthly grouping without SQL date functions
-	return []
+	if isinstance(filters, str):
+		import json
+		filters = json.loads(filters)
+
+	return get_contribution_period_summary("campmeeting_offering", filters)
 
 
 def get_top_contributors(filters, limit=10):
@@ -219,20 +199,7 @@ def get_contribution_statistics(filters):
 	)
 	
 	# Apply filters
-	if filters.get("year"):
-		year = int(filters.get("year"))
-		year_start = getdate(f"{year}-01-01")
-		year_end = getdate(f"{year}-12-31")
-		query = query.where(
-			(TithesOfferings.date >= year_start) &
-			(TithesOfferings.date <= year_end)
-		)
-	
-	if filters.get("from_date"):
-		query = query.where(TithesOfferings.date >= getdate(filters.get("from_date")))
-	
-	if filters.get("to_date"):
-		query = query.where(TithesOfferings.date <= getdate(filters.get("to_date")))
+	query = apply_date_filters(query, TithesOfferings.date, filters)
 	
 	result = query.run(as_dict=True)
 	return result[0] if result else {}
@@ -21,6 +21,13 @@ frappe.query_reports["Departmental Budget Report"] = {
 			"label": __("Status"),
 			"fieldtype": "Select",
 			"options": "\nDraft\nSubmitted\nApproved\nActive\nClosed"
+		},
+		{
+			"fieldname": "view",
+			"label": __("View"),
+			"fieldtype": "Select",
+			"options": "Summary\nItem Lines",
+			"default": "Summary"
 		}
 	],
 	
@@ -38,7 +45,9 @@ frappe.query_reports["Departmental Budget Report"] = {
 		}
 		
 		if (column.fieldname == "status") {
-			if (value == "Active") {
+			if (value == "Over Budget" || value == "Unbudgeted") {
+				value = `<span class="indicator red">${value}</span>`;
+			} else if (value == "Active") {
 				value = `<span class="indicator green">${value}</span>`;
 			} else if (value == "Approved") {
 				value = `<span class="indicator blue">${value}</span>`;
@@ -124,6 +133,16 @@ frappe.query_reports["Departmental Budget Report"] = {
 											${format_currency(data.total_remaining || 0)}
 										</td>
 									</tr>
+									<tr>
+										<td><strong>Committed (Pending Approval / Approved):</strong></td>
+										<td>${format_currency(data.total_committed || 0)}</td>
+									</tr>
+									<tr>
+										<td><strong>Available:</strong></td>
+										<td class="${(data.total_available || 0) < 0 ? 'text-danger' : 'text-success'}">
+											${format_currency(data.total_available || 0)}
+										</td>
+									</tr>
 									<tr>
 										<td><strong>Overall Utilization:</strong></td>
 										<td class="${overall_utilization > 100 ? 'text-danger' : overall_utilization > 80 ? 'text-warning' : 'text-success'}">
@@ -139,6 +158,11 @@ frappe.query_reports["Departmental Budget Report"] = {
 			});
 		});
 		
+		// Drill into the expense lines behind a budget line
+		report.page.add_inner_button(__("Line Details"), function() {
+			show_line_details_dialog(report);
+		});
+
 		// Add button to create new budget
 		report.page.add_inner_button(__("New Budget"), function() {
 			frappe.new_doc("Department Budget");
@@ -467,3 +491,80 @@ function get_budget_utilization_trend(data, smooth = false) {
 		colors: ['#2196F3']
 	};
 }
+
+function show_line_details_dialog(report) {
+	const filters = report.get_values();
+	const dialog = new frappe.ui.Dialog({
+		title: __("Budget Line Details"),
+		fields: [
+			{
+				fieldname: "budget",
+				label: __("Budget"),
+				fieldtype: "Link",
+				options: "Department Budget",
+				reqd: 1
+			},
+			{
+				fieldname: "item",
+				label: __("Item"),
+				fieldtype: "Link",
+				options: "Item",
+				description: __("Leave empty for expense lines without an item")
+			},
+			{
+				fieldname: "expense_category",
+				label: __("Expense Category"),
+				fieldtype: "Select",
+				options: "\nEquipment\nSupplies\nEvents\nTraining\nTravel\nUtilities\nMaintenance\nSalaries\nRent\nInsurance\nOther"
+			},
+			{
+				fieldname: "details_html",
+				fieldtype: "HTML"
+			}
+		],
+		primary_action_label: __("Show"),
+		primary_action: function(values) {
+			frappe.call({
+				method: "stewardpro.stewardpro.doctype.department_budget.budget_variance.get_variance_drilldown",
+				args: {
+					budget: values.budget,
+					item: values.item,
+					expense_category: values.expense_category,
+					fiscal_year: filters.fiscal_year
+				},
+				callback: function(r) {
+					const rows = r.message || [];
+					let html = `<p class="text-muted">${__("No submitted expenses for this line")}</p>`;
+					if (rows.length) {
+						html = `
+							<table class="table table-bordered table-sm">
+								<thead>
+									<tr>
+										<th>${__("Expense")}</th>
+										<th>${__("Date")}</th>
+										<th>${__("Category")}</th>
+										<th>${__("Description")}</th>
+										<th class="text-right">${__("Amount")}</th>
+									</tr>
+								</thead>
+								<tbody>
+									${rows.map(row => `
+										<tr>
+											<td><a href="/app/department-expense/${encodeURIComponent(row.expense)}">${row.expense}</a></td>
+											<td>${frappe.datetime.str_to_user(row.expense_date)}</td>
+											<td>${row.expense_category || ""}</td>
+											<td>${frappe.utils.escape_html(row.expense_description || "")}</td>
+											<td class="text-right">${format_currency(row.amount || 0)}</td>
+										</tr>
+									`).join("")}
+								</tbody>
+							</table>
+						`;
+					}
+					dialog.fields_dict.details_html.$wrapper.html(html);
+				}
+			});
+		}
+	});
+	dialog.show();
+}
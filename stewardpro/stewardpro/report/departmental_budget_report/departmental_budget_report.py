@@ -7,6 +7,12 @@ from frappe.query_builder import DocType
 from frappe.query_builder.functions import Avg, Count, Sum
 from frappe.utils import flt, nowdate, getdate
 
+from stewardpro.stewardpro.doctype.department_budget.budget_variance import get_variance_dataset
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import get_fiscal_year_dates
+from stewardpro.stewardpro.utils.charts import SeriesAccumulator, accumulate, load_rows, make_chart
+
+ITEM_LINES_VIEW = "Item Lines"
+
 
 # Define custom functions for date operations - commented out to avoid CustomFunction issues
 # def Year(field):
@@ -19,7 +25,7 @@ def execute(filters=None):
 	if not filters:
 		filters = {}
 
-	columns = get_columns()
+	columns = get_columns(filters)
 	data = get_data(filters)
 
 	# Ensure data is not None for Excel export
@@ -30,8 +36,8 @@ def execute(filters=None):
 	return columns, data, None, chart
 
 
-def get_columns():
-	return [
+def get_columns(filters=None):
+	columns = [
 		{
 			"label": _("Department"),
 			"fieldname": "department_name",
@@ -51,6 +57,13 @@ def get_columns():
 			"options": "Fiscal Year",
 			"width": 100
 		},
+		{
+			"label": _("Budget"),
+			"fieldname": "budget_name",
+			"fieldtype": "Link",
+			"options": "Department Budget",
+			"width": 140
+		},
 		{
 			"label": _("Allocated Amount"),
 			"fieldname": "allocated_amount",
@@ -69,6 +82,18 @@ def get_columns():
 			"fieldtype": "Currency",
 			"width": 150
 		},
+		{
+			"label": _("Committed"),
+			"fieldname": "committed_amount",
+			"fieldtype": "Currency",
+			"width": 130
+		},
+		{
+			"label": _("Available"),
+			"fieldname": "available_amount",
+			"fieldtype": "Currency",
+			"width": 130
+		},
 		{
 			"label": _("Utilization %"),
 			"fieldname": "utilization_percentage",
@@ -83,92 +108,34 @@ def get_columns():
 		}
 	]
 
+	if filters and filters.get("view") == ITEM_LINES_VIEW:
+		# Item lines carry the budgeted amount of the item in allocated_amount
+		columns[4:4] = [
+			{
+				"label": _("Item"),
+				"fieldname": "item",
+				"fieldtype": "Link",
+				"options": "Item",
+				"width": 120
+			},
+			{
+				"label": _("Item Name"),
+				"fieldname": "item_name",
+				"fieldtype": "Data",
+				"width": 160
+			},
+		]
+		columns[6]["label"] = _("Budgeted Amount")
+
+	return columns
 
-def get_data(filters):
-	DepartmentBudget = DocType("Department Budget")
-	Department = DocType("Department")
-	Expense = DocType("Department Expense")
 
-	# Get budget allocations from Department Budget doctype
-	budget_query = (
-		frappe.qb.from_(DepartmentBudget)
-		.left_join(Department)
-		.on(DepartmentBudget.department == Department.name)
-		.select(
-			DepartmentBudget.department,
-			Department.department_name,
-			Department.department_code,
-			DepartmentBudget.total_budget_amount.as_("allocated_amount"),
-			DepartmentBudget.fiscal_year,
-			DepartmentBudget.name.as_("budget_name")
-		)
-		.where(DepartmentBudget.docstatus >= 0)
-		.where(Department.is_active == 1)
-		.orderby(Department.department_name)
-	)
-
-	# Apply filters
-	if filters.get("fiscal_year"):
-		budget_query = budget_query.where(DepartmentBudget.fiscal_year == filters.get("fiscal_year"))
-
-	if filters.get("department"):
-		budget_query = budget_query.where(DepartmentBudget.department == filters.get("department"))
-
-	if filters.get("church"):
-		budget_query = budget_query.where(DepartmentBudget.church == filters.get("church"))
-
-	budget_data = budget_query.run(as_dict=True)
-	
-	# Calculate actual expenses for each department
-	for row in budget_data:
-		# Get actual expenses for this department and fiscal year
-		expense_query = (
-			frappe.qb.from_(Expense)
-			.select(Sum(Expense.total_amount).as_("total_expenses"))
-			.where(Expense.docstatus == 1)
-			.where(Expense.department == row.get("department"))
-		)
-		
-		# Filter by budget reference if available
-		if row.get("budget_name"):
-			expense_query = expense_query.where(Expense.budget_reference == row.get("budget_name"))
-		
-		# Filter by fiscal year if specified
-		if filters.get("fiscal_year"):
-			# Get fiscal year dates from Fiscal Year doctype
-			fiscal_year_doc = frappe.get_doc("Fiscal Year", filters.get("fiscal_year"))
-			expense_query = expense_query.where(
-				(Expense.expense_date >= fiscal_year_doc.year_start_date) &
-				(Expense.expense_date <= fiscal_year_doc.year_end_date)
-			)
-		
-		expense_result = expense_query.run(as_dict=True)
-		actual_expenses = flt(expense_result[0]["total_expenses"]) if expense_result and expense_result[0]["total_expenses"] else 0
-		
-		# Calculate derived fields
-		allocated_amount = flt(row.get("allocated_amount", 0))
-		balance = allocated_amount - actual_expenses
-		utilization_percentage = (actual_expenses / allocated_amount * 100) if allocated_amount > 0 else 0
-		
-		# Determine status
-		if utilization_percentage > 100:
-			status = "Over Budget"
-		elif utilization_percentage > 90:
-			status = "Near Limit"
-		elif utilization_percentage > 50:
-			status = "On Track"
-		else:
-			status = "Under Utilized"
-		
-		# Update row with calculated values
-		row.update({
-			"actual_expenses": actual_expenses,
-			"balance": balance,
-			"utilization_percentage": utilization_percentage,
-			"status": status
-		})
-	
-	return budget_data
+def get_data(filters):
+	"""Per-budget rows, or per-item lines for the Item Lines view, from the variance dataset"""
+	dataset = get_variance_dataset(filters)
+	if filters.get("view") == ITEM_LINES_VIEW:
+		return [dict(line) for line in dataset["lines"]]
+	return [dict(budget) for budget in dataset["budgets"]]
 
 
 def get_department_summary(filters):
@@ -225,7 +192,8 @@ def get_summary_data(filters=None):
 		frappe.qb.from_(DepartmentBudget)
 		.select(
 			Count(DepartmentBudget.name).as_("total_budgets"),
-			Sum(DepartmentBudget.total_budget_amount).as_("total_allocated")
+			Sum(DepartmentBudget.total_budget_amount).as_("total_allocated"),
+			Sum(DepartmentBudget.committed_amount).as_("total_committed")
 		)
 		.where(DepartmentBudget.docstatus >= 0)
 	)
@@ -240,7 +208,7 @@ def get_summary_data(filters=None):
 	budget_result = budget_query.run(as_dict=True)
 	budget_data = budget_result[0] if budget_result else {}
 
-	# Get expense summary
+	# All submitted expenses count as spent, with or without a budget reference
 	expense_query = (
 		frappe.qb.from_(Expense)
 		.select(Sum(Expense.total_amount).as_("total_spent"))
@@ -252,28 +220,27 @@ def get_summary_data(filters=None):
 		expense_query = expense_query.where(Expense.department == filters.get("department"))
 
 	# Apply fiscal year filter for expenses (approximate by date range)
-	if filters.get("fiscal_year"):
-		# Get fiscal year dates
-		fiscal_year_doc = frappe.get_doc("Fiscal Year", filters.get("fiscal_year"))
-		expense_query = expense_query.where(
-			(Expense.expense_date >= fiscal_year_doc.year_start_date) &
-			(Expense.expense_date <= fiscal_year_doc.year_end_date)
-		)
+	fiscal_year_dates = get_fiscal_year_dates(filters.get("fiscal_year"))
+	if fiscal_year_dates:
+		expense_query = expense_query.where(Expense.expense_date[fiscal_year_dates[0] : fiscal_year_dates[1]])
 
 	expense_result = expense_query.run(as_dict=True)
 	expense_data = expense_result[0] if expense_result else {}
 
 	# Calculate summary
 	total_budgets = budget_data.get("total_budgets", 0)
-	total_allocated = budget_data.get("total_allocated", 0) or 0
-	total_spent = expense_data.get("total_spent", 0) or 0
+	total_allocated = flt(budget_data.get("total_allocated"))
+	total_spent = flt(expense_data.get("total_spent"))
 	total_remaining = total_allocated - total_spent
+	total_committed = flt(budget_data.get("total_committed"))
 
 	return {
 		"total_budgets": total_budgets,
 		"total_allocated": total_allocated,
 		"total_spent": total_spent,
 		"total_remaining": total_remaining,
+		"total_committed": total_committed,
+		"total_available": total_remaining - total_committed,
 		"utilization_percentage": (total_spent / total_allocated * 100) if total_allocated > 0 else 0
 	}
 
@@ -284,178 +251,98 @@ def get_chart_data(data, filters):
 		return None
 
 	# Extract department budget data
-	departments = []
-	allocated_amounts = []
-	spent_amounts = []
-
-	for row in data:
-		if row.get("department_name") and row.get("allocated_amount"):
-			departments.append(row["department_name"])
-			allocated_amounts.append(row["allocated_amount"])
-			spent_amounts.append(row.get("actual_expenses", 0))
+	departments = SeriesAccumulator(("allocated_amount", "actual_expenses"))
+	accumulate(
+		data,
+		[(departments, lambda row: row["department_name"] if row.get("department_name") and row.get("allocated_amount") else None)],
+	)
 
 	if not departments:
 		return None
 
-	return {
-		"data": {
-			"labels": departments,
-			"datasets": [
-				{
-					"name": "Allocated",
-					"values": allocated_amounts
-				},
-				{
-					"name": "Spent",
-					"values": spent_amounts
-				}
-			]
-		},
-		"type": "bar",
-		"height": 300,
-		"colors": ["#4CAF50", "#FF5722"]
-	}
+	return make_chart(
+		departments.labels,
+		[
+			("Allocated", departments.values("allocated_amount")),
+			("Spent", departments.values("actual_expenses")),
+		],
+		colors=["#4CAF50", "#FF5722"],
+	)
+
+
+def get_department_series(rows):
+	"""Per-department allocation/spending and per-status allocation in one pass"""
+	departments = SeriesAccumulator(("allocated_amount", "actual_expenses"))
+	statuses = SeriesAccumulator(("allocated_amount",))
+	accumulate(
+		rows,
+		[
+			(departments, lambda row: row.get("department_name") or None),
+			(statuses, lambda row: row.get("status") or "Unknown"),
+		],
+	)
+	return departments, statuses
 
 
 @frappe.whitelist()
 def get_utilization_chart_data(data, filters):
 	"""Generate budget utilization chart data"""
-	if not data:
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
+	rows = [row for row in rows if row.get("utilization_percentage") is not None]
+	departments, _statuses = get_department_series(rows)
 
-	if not isinstance(data, list):
-		return None
-
-	departments = []
-	utilization_rates = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		if row.get("department_name") and row.get("utilization_percentage") is not None:
-			departments.append(row["department_name"])
-			# Convert utilization percentage to float
-			try:
-				utilization = float(row.get("utilization_percentage", 0) or 0)
-			except (ValueError, TypeError):
-				utilization = 0
-			utilization_rates.append(utilization)
+	# Percentages do not add up across budgets, so take them from the department totals
+	utilization = [
+		flt(spent / allocated * 100, 2) if allocated > 0 else 0
+		for allocated, spent in zip(
+			departments.values("allocated_amount"), departments.values("actual_expenses"), strict=True
+		)
+	]
 
-	return {
-		"data": {
-			"labels": departments,
-			"datasets": [{
-				"values": utilization_rates
-			}]
-		},
-		"type": "bar",
-		"height": 300,
-		"colors": ["#2196F3"]
-	}
+	return make_chart(
+		departments.labels,
+		[(None, utilization)],
+		colors=["#2196F3"],
+	)
 
 
 @frappe.whitelist()
 def get_department_comparison_chart(data, filters):
 	"""Generate department comparison pie chart"""
-	if not data:
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
-		return None
-
-	departments = []
-	allocated_amounts = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		# Convert allocated amount to float
-		try:
-			allocated_amount = float(row.get("allocated_amount", 0) or 0)
-		except (ValueError, TypeError):
-			allocated_amount = 0
-
-		if row.get("department_name") and allocated_amount > 0:
-			departments.append(row["department_name"])
-			allocated_amounts.append(allocated_amount)
+	departments, _statuses = get_department_series(rows)
+	labels = [
+		label
+		for label, allocated in zip(departments.labels, departments.values("allocated_amount"), strict=True)
+		if allocated > 0
+	]
 
-	return {
-		"data": {
-			"labels": departments,
-			"datasets": [{
-				"values": allocated_amounts
-			}]
-		},
-		"type": "pie",
-		"height": 300,
-		"colors": ["#4CAF50", "#2196F3", "#FF9800", "#9C27B0", "#F44336", "#795548"]
-	}
+	return make_chart(
+		labels,
+		[(None, departments.values("allocated_amount", labels))],
+		chart_type="pie",
+		colors=["#4CAF50", "#2196F3", "#FF9800", "#9C27B0", "#F44336", "#795548"],
+	)
 
 
 @frappe.whitelist()
 def get_budget_status_breakdown(data, filters):
 	"""Generate budget status breakdown chart"""
-	if not data:
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
-		return None
+	_departments, statuses = get_department_series(rows)
 
-	status_counts = {}
-	status_amounts = {}
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		status = row.get("status", "Unknown")
-		# Convert amount to float, handling empty strings and None values
-		try:
-			amount = float(row.get("allocated_amount", 0) or 0)
-		except (ValueError, TypeError):
-			amount = 0
-
-		if status not in status_counts:
-			status_counts[status] = 0
-			status_amounts[status] = 0
-
-		status_counts[status] += 1
-		status_amounts[status] += amount
-
-	return {
-		"data": {
-			"labels": list(status_amounts.keys()),
-			"datasets": [{
-				"values": list(status_amounts.values())
-			}]
-		},
-		"type": "donut",
-		"height": 300,
-		"colors": ["#4CAF50", "#2196F3", "#FF9800", "#F44336", "#9E9E9E"]
-	}
+	return make_chart(
+		statuses.labels,
+		[(None, statuses.values("allocated_amount"))],
+		chart_type="donut",
+		colors=["#4CAF50", "#2196F3", "#FF9800", "#F44336", "#9E9E9E"],
+	)
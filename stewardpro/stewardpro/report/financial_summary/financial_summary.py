@@ -6,6 +6,9 @@ from frappe import _
 from frappe.utils import flt, getdate
 from frappe.query_builder.functions import Sum
 
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import get_current_and_previous_dates
+from stewardpro.stewardpro.utils.charts import SeriesAccumulator, accumulate, is_label_row, load_rows, make_chart
+
 
 def execute(filters=None):
 	columns = get_columns()
@@ -73,9 +76,8 @@ def get_data(filters):
 	previous_month_start = get_first_day(add_months(today, -1))
 	previous_month_end = get_last_day(add_months(today, -1))
 	
-	year_start = getdate(f"{today.year}-01-01")
-	previous_year_start = getdate(f"{today.year - 1}-01-01")
-	previous_year_end = getdate(f"{today.year - 1}-12-31")
+	# Current and previous Fiscal Year, or calendar years when none is configured
+	(year_start, _year_end), (previous_year_start, previous_year_end) = get_current_and_previous_dates(today)
 	
 	data = []
 	
@@ -523,216 +525,103 @@ def calculate_percentage_change(current, previous):
 	return ((current - previous) / previous) * 100
 
 
+INCOME_CATEGORIES = ("Tithes", "Regular Offerings", "Special Offerings")
+
+
+def get_summary_bucket(row):
+	"""Chart bucket for a summary row: its income category, its expense department, or None"""
+	category = row.get("category") or ""
+	if is_label_row(category):
+		return None
+	if category in INCOME_CATEGORIES:
+		return ("income", category)
+	if "Expenses" in category:
+		return ("expense", category.replace(" Expenses", ""))
+	return None
+
+
+def get_summary_series(rows):
+	"""Accumulate income and expense rows of the summary in one pass"""
+	series = SeriesAccumulator(("current_month", "previous_month", "year_to_date"))
+	accumulate(rows, [(series, get_summary_bucket)])
+	income = [label for label in series.labels if label[0] == "income"]
+	expense = [label for label in series.labels if label[0] == "expense"]
+	return series, income, expense
+
+
 def get_chart_data(data, filters):
 	"""Generate chart data for financial summary"""
 	if not data:
 		return None
 
-	# Extract income and expense data
-	income_data = []
-	expense_data = []
-
-	for row in data:
-		category = row.get("category", "")
-		if not category or category.startswith("<b>") or not category.strip():
-			continue
-
-		current_month = row.get("current_month", 0)
-		year_to_date = row.get("year_to_date", 0)
-
-		if category in ["Tithes", "Regular Offerings", "Special Offerings"]:
-			income_data.append({
-				"category": category,
-				"current_month": current_month,
-				"year_to_date": year_to_date
-			})
-		elif "Expenses" in category:
-			expense_data.append({
-				"category": category,
-				"current_month": current_month,
-				"year_to_date": year_to_date
-			})
-
 	# Create chart data for income vs expenses comparison
-	income_total = sum(item["current_month"] for item in income_data)
-	expense_total = sum(item["current_month"] for item in expense_data)
-
-	return {
-		"data": {
-			"labels": ["Income", "Expenses"],
-			"datasets": [{
-				"values": [income_total, expense_total]
-			}]
-		},
-		"type": "pie",
-		"height": 300,
-		"colors": ["#4CAF50", "#F44336"]
-	}
+	series, income, expense = get_summary_series(data)
+
+	return make_chart(
+		["Income", "Expenses"],
+		[
+			(
+				None,
+				[
+					sum(series.values("current_month", income)),
+					sum(series.values("current_month", expense)),
+				],
+			)
+		],
+		chart_type="pie",
+		colors=["#4CAF50", "#F44336"],
+	)
 
 
 @frappe.whitelist()
 def get_income_breakdown_chart(data, filters):
 	"""Generate income breakdown chart data"""
-	if not data:
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
-		return None
-
-	income_categories = []
-	income_values = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		category = row.get("category", "")
-		if category in ["Tithes", "Regular Offerings", "Special Offerings"]:
-			income_categories.append(category)
-			# Convert to float, handling empty strings and None values
-			try:
-				value = float(row.get("current_month", 0) or 0)
-			except (ValueError, TypeError):
-				value = 0
-			income_values.append(value)
+	series, income, _expense = get_summary_series(rows)
 
-	return {
-		"data": {
-			"labels": income_categories,
-			"datasets": [{
-				"values": income_values
-			}]
-		},
-		"type": "donut",
-		"height": 300,
-		"colors": ["#2E7D32", "#1976D2", "#F57C00"]
-	}
+	return make_chart(
+		[label[1] for label in income],
+		[(None, series.values("current_month", income))],
+		chart_type="donut",
+		colors=["#2E7D32", "#1976D2", "#F57C00"],
+	)
 
 
 @frappe.whitelist()
 def get_expense_breakdown_chart(data, filters):
 	"""Generate expense breakdown chart data"""
-	if not data:
-		return None
-
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	expense_categories = []
-	expense_values = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
+	series, _income, expense = get_summary_series(rows)
 
-		category = row.get("category", "")
-		if "Expenses" in category:
-			expense_categories.append(category.replace(" Expenses", ""))
-			# Convert to float, handling empty strings and None values
-			try:
-				value = float(row.get("current_month", 0) or 0)
-			except (ValueError, TypeError):
-				value = 0
-			expense_values.append(value)
-
-	return {
-		"data": {
-			"labels": expense_categories,
-			"datasets": [{
-				"values": expense_values
-			}]
-		},
-		"type": "bar",
-		"height": 300,
-		"colors": ["#D32F2F", "#7B1FA2", "#F57C00", "#388E3C"]
-	}
+	return make_chart(
+		[label[1] for label in expense],
+		[(None, series.values("current_month", expense))],
+		colors=["#D32F2F", "#7B1FA2", "#F57C00", "#388E3C"],
+	)
 
 
 @frappe.whitelist()
 def get_trend_comparison_chart(data, filters):
 	"""Generate trend comparison chart data"""
-	if not data:
-		return None
-
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
+	rows = load_rows(data)
+	if rows is None:
 		return None
 
-	categories = []
-	current_month_values = []
-	previous_month_values = []
-	ytd_values = []
-
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		category = row.get("category", "")
-		if category in ["Tithes", "Regular Offerings", "Special Offerings"]:
-			categories.append(category)
-			# Convert to float, handling empty strings and None values
-			try:
-				current_value = float(row.get("current_month", 0) or 0)
-			except (ValueError, TypeError):
-				current_value = 0
-			current_month_values.append(current_value)
-
-			# Convert previous month value
-			try:
-				previous_value = float(row.get("previous_month", 0) or 0)
-			except (ValueError, TypeError):
-				previous_value = 0
-			previous_month_values.append(previous_value)
-
-			# Convert YTD value
-			try:
-				ytd_value = float(row.get("year_to_date", 0) or 0)
-			except (ValueError, TypeError):
-				ytd_value = 0
-			ytd_values.append(ytd_value)
-
-	return {
-		"data": {
-			"labels": categories,
-			"datasets": [
-				{
-					"name": "Current Month",
-					"values": current_month_values
-				},
-				{
-					"name": "Previous Month",
-					"values": previous_month_values
-				},
-				{
-					"name": "Year to Date",
-					"values": ytd_values
-				}
-			]
-		},
-		"type": "bar",
-		"height": 350,
-		"colors": ["#4CAF50", "#FF9800", "#2196F3"]
-	}
+	series, income, _expense = get_summary_series(rows)
+
+	return make_chart(
+		[label[1] for label in income],
+		[
+			("Current Month", series.values("current_month", income)),
+			("Previous Month", series.values("previous_month", income)),
+			("Year to Date", series.values("year_to_date", income)),
+		],
+		height=350,
+		colors=["#4CAF50", "#FF9800", "#2196F3"],
+	)
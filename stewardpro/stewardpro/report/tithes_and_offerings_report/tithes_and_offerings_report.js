@@ -195,7 +195,6 @@ function show_member_contributions_chart(report) {
 	frappe.call({
 		method: 'stewardpro.stewardpro.report.tithes_and_offerings_report.tithes_and_offerings_report.get_member_chart_data',
 		args: {
-			data: JSON.stringify(report.data),
 			filters: report.get_values()
 		},
 		callback: function(r) {
@@ -219,7 +218,6 @@ function show_payment_mode_chart(report) {
 	frappe.call({
 		method: 'stewardpro.stewardpro.report.tithes_and_offerings_report.tithes_and_offerings_report.get_payment_mode_chart_data',
 		args: {
-			data: JSON.stringify(report.data),
 			filters: report.get_values()
 		},
 		callback: function(r) {
@@ -5,6 +5,8 @@ import frappe
 from frappe import _
 from frappe.utils import getdate
 
+from stewardpro.stewardpro.utils.charts import SeriesAccumulator, accumulate, load_rows, make_chart
+
 
 def execute(filters=None):
 	columns = get_columns()
@@ -80,7 +82,7 @@ def get_columns():
 	]
 
 
-def get_data(filters):
+def get_conditions(filters):
 	conditions = ["t.docstatus = 1"]
 	values = []
 
@@ -100,6 +102,12 @@ def get_data(filters):
 		conditions.append("t.payment_mode = %s")
 		values.append(filters.get("payment_mode"))
 
+	return " AND ".join(conditions), values
+
+
+def get_data(filters):
+	conditions, values = get_conditions(filters)
+
 	query = f"""
 		SELECT
 			t.member,
@@ -114,7 +122,7 @@ def get_data(filters):
 			t.receipt_number
 		FROM `tabTithes and Offerings` t
 		LEFT JOIN `tabMember` m ON t.member = m.name
-		WHERE {' AND '.join(conditions)}
+		WHERE {conditions}
 		ORDER BY t.date DESC
 	"""
 
@@ -129,164 +137,90 @@ def get_data(filters):
 	return data
 
 
+def get_grouped_totals(filters, group_by, limit=None):
+	"""Sum total_amount per member or payment mode in the database"""
+	group_fields = {
+		"member_name": ("t.member, m.full_name", "COALESCE(m.full_name, 'Anonymous')"),
+		"payment_mode": ("t.payment_mode", "t.payment_mode"),
+	}
+	group_clause, label = group_fields[group_by]
+	conditions, values = get_conditions(filters)
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			{label} as {group_by},
+			SUM(t.total_amount) as total_amount
+		FROM `tabTithes and Offerings` t
+		LEFT JOIN `tabMember` m ON t.member = m.name
+		WHERE {conditions}
+		GROUP BY {group_clause}
+		ORDER BY total_amount DESC
+		{f"LIMIT {int(limit)}" if limit else ""}
+	""",
+		values,
+		as_dict=True,
+	)
+
+
 def get_chart_data(data, filters):
 	"""Generate chart data for the report"""
 	if not data:
 		return None
 
 	# Group by month for trend chart
-	monthly_data = {}
-	member_totals = {}
-	payment_mode_totals = {}
+	monthly = SeriesAccumulator(("tithe_amount", "offering_amount", ("campmeeting_offering", "church_building_offering")))
+	accumulate(data, [(monthly, lambda row: row.get("date").strftime("%Y-%m") if row.get("date") else "Unknown")])
 
-	for row in data:
-		# Monthly trends
-		month = row.get("date").strftime("%Y-%m") if row.get("date") else "Unknown"
-		if month not in monthly_data:
-			monthly_data[month] = {
-				"tithe": 0,
-				"offering": 0,
-				"special": 0,
-				"total": 0
-			}
-
-		monthly_data[month]["tithe"] += row.get("tithe_amount", 0)
-		monthly_data[month]["offering"] += row.get("offering_amount", 0)
-		monthly_data[month]["special"] += (
-			row.get("campmeeting_offering", 0) +
-			row.get("church_building_offering", 0)
-		)
-		monthly_data[month]["total"] += row.get("total_amount", 0)
-
-		# Member contributions
-		member = row.get("member_name", "Anonymous")
-		if member not in member_totals:
-			member_totals[member] = 0
-		member_totals[member] += row.get("total_amount", 0)
-
-		# Payment mode breakdown
-		payment_mode = row.get("payment_mode", "Unknown")
-		if payment_mode not in payment_mode_totals:
-			payment_mode_totals[payment_mode] = 0
-		payment_mode_totals[payment_mode] += row.get("total_amount", 0)
-
-	months = sorted(monthly_data.keys())
+	months = monthly.sorted_labels()
 
-	# Get top 10 contributors
-	top_members = sorted(member_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-
-	return {
-		"data": {
-			"labels": months,
-			"datasets": [
-				{
-					"name": "Tithes",
-					"values": [monthly_data[month]["tithe"] for month in months]
-				},
-				{
-					"name": "Offerings",
-					"values": [monthly_data[month]["offering"] for month in months]
-				},
-				{
-					"name": "Special Offerings",
-					"values": [monthly_data[month]["special"] for month in months]
-				}
-			]
-		},
-		"type": "bar",
-		"height": 300,
-		"colors": ["#2E7D32", "#1976D2", "#F57C00"]
-	}
+	return make_chart(
+		months,
+		[
+			("Tithes", monthly.values("tithe_amount", months)),
+			("Offerings", monthly.values("offering_amount", months)),
+			("Special Offerings", monthly.values(monthly.fields[2], months)),
+		],
+		colors=["#2E7D32", "#1976D2", "#F57C00"],
+	)
 
 
-@frappe.whitelist()
-def get_member_chart_data(data, filters):
-	"""Generate member contribution chart data"""
-	if not data:
-		return None
+def get_totals_source(data, filters, group_by, limit=None):
+	"""Pre-aggregated rows from the database when filters are given, else the posted rows"""
+	filters = frappe.parse_json(filters) if filters else None
+	if filters:
+		return get_grouped_totals(frappe._dict(filters), group_by, limit=limit)
+	return load_rows(data)
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
 
-	if not isinstance(data, list):
+@frappe.whitelist()
+def get_member_chart_data(data=None, filters=None):
+	"""Generate member contribution chart data"""
+	rows = get_totals_source(data, filters, "member_name", limit=10)
+	if not rows:
 		return None
 
-	member_totals = {}
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		member = row.get("member_name", "Anonymous")
-		if member not in member_totals:
-			member_totals[member] = 0
-
-		# Convert amount to float, handling empty strings and None values
-		try:
-			amount = float(row.get("total_amount", 0) or 0)
-		except (ValueError, TypeError):
-			amount = 0
-		member_totals[member] += amount
+	member_totals = SeriesAccumulator(("total_amount",))
+	accumulate(rows, [(member_totals, lambda row: row.get("member_name") or "Anonymous")])
 
 	# Get top 10 contributors
-	top_members = sorted(member_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-
-	return {
-		"data": {
-			"labels": [member[0] for member in top_members],
-			"datasets": [{
-				"values": [member[1] for member in top_members]
-			}]
-		},
-		"type": "pie",
-		"height": 300
-	}
+	top_members = member_totals.top_labels("total_amount", 10)
+
+	return make_chart(top_members, [(None, member_totals.values("total_amount", top_members))], chart_type="pie")
 
 
 @frappe.whitelist()
-def get_payment_mode_chart_data(data, filters):
+def get_payment_mode_chart_data(data=None, filters=None):
 	"""Generate payment mode breakdown chart data"""
-	if not data:
+	rows = get_totals_source(data, filters, "payment_mode")
+	if not rows:
 		return None
 
-	# Parse JSON data if it's a string
-	import json
-	if isinstance(data, str):
-		try:
-			data = json.loads(data)
-		except:
-			return None
-
-	if not isinstance(data, list):
-		return None
+	payment_mode_totals = SeriesAccumulator(("total_amount",))
+	accumulate(rows, [(payment_mode_totals, lambda row: row.get("payment_mode") or "Unknown")])
 
-	payment_mode_totals = {}
-	for row in data:
-		if not isinstance(row, dict):
-			continue
-
-		payment_mode = row.get("payment_mode", "Unknown")
-		if payment_mode not in payment_mode_totals:
-			payment_mode_totals[payment_mode] = 0
-
-		# Convert amount to float, handling empty strings and None values
-		try:
-			amount = float(row.get("total_amount", 0) or 0)
-		except (ValueError, TypeError):
-			amount = 0
-		payment_mode_totals[payment_mode] += amount
-
-	return {
-		"data": {
-			"labels": list(payment_mode_totals.keys()),
-			"datasets": [{
-				"values": list(payment_mode_totals.values())
-			}]
-		},
-		"type": "donut",
-		"height": 300
-	}
+	return make_chart(
+		payment_mode_totals.labels,
+		[(None, payment_mode_totals.values("total_amount"))],
+		chart_type="donut",
+	)
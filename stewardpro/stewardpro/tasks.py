@@ -5,6 +5,9 @@ import frappe
 from frappe import _
 from datetime import datetime
 
+from stewardpro.stewardpro.api.sms_campaign import run_weekly_campaigns
+from stewardpro.stewardpro.api.sms_receipts import is_digest_mode, send_receipt_digests
+
 
 def send_weekly_sms_notification():
 	"""
@@ -25,13 +28,26 @@ def send_weekly_sms_notification():
 			frappe.logger().warning("SMS configuration is incomplete. Skipping weekly SMS job.")
 			return
 		
-		frappe.logger().info("Weekly SMS notification job executed successfully.")
-		
-		# TODO: Add your SMS sending logic here
-		# Example: Send reminders, notifications, etc.
-		
+		queued = run_weekly_campaigns()
+		frappe.logger().info(f"Weekly SMS notification job queued campaigns: {queued}")
+
 	except frappe.DoesNotExistError:
 		frappe.logger().warning("StewardPro Settings not found. Skipping weekly SMS job.")
 	except Exception as e:
 		frappe.logger().error(f"Error in weekly SMS notification job: {str(e)}")
 
+
+def send_receipt_sms_digest():
+	"""
+	Scheduled job to send combined receipt SMS every evening at 20:00
+	Runs only when Receipt SMS is set to a digest mode in StewardPro Settings
+	"""
+	try:
+		if not frappe.db.get_single_value('StewardPro Settings', 'enable_sms_integration') or not is_digest_mode():
+			return
+
+		queued = send_receipt_digests()
+		frappe.logger().info(f"Receipt SMS digest job queued {queued} messages.")
+
+	except Exception as e:
+		frappe.logger().error(f"Error in receipt SMS digest job: {str(e)}")
@@ -0,0 +1,309 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Benchmark harness for StewardPro reports, whitelisted APIs and bulk SMS paths.
+
+Every case is run a number of times inside a ``QueryCounter``; results report query
+count and p50/p95 latency so regressions can be compared between runs (ideally on
+data produced by ``stewardpro.stewardpro.utils.synthetic_data``). The transaction is
+rolled back after every sample; only what the code under test commits itself (such
+as SMS Log entries) is kept. SMS and Mobile Money cases talk to the bundled
+provider simulator, over local HTTP or in-process, whose latency, error rate and
+balance are set per run; their results include the simulator's counters (server
+errors, insufficient balance answers, delivery reports).
+"""
+
+import importlib
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import add_months, getdate, nowdate
+
+from stewardpro.stewardpro.api.sms_campaign import DEFERRED_MESSAGES_KEY
+from stewardpro.stewardpro.api.sms_throttle import CIRCUIT_TRIPPED_KEY, close_circuit
+from stewardpro.stewardpro.utils.profiling import QueryCounter, percentile
+from stewardpro.stewardpro.utils.provider_simulator import InProcessTransport, SimulatorServer
+
+REPORTS = (
+	"annual_report",
+	"building_fund_report",
+	"camp_meeting_contributions_report",
+	"department_balance_report",
+	"department_income_report",
+	"departmental_budget_report",
+	"expense_report",
+	"financial_summary",
+	"tithes_and_offerings_report",
+)
+
+SMS_BATCH_SIZE = 20
+BENCHMARK_SMS_TYPE = "Benchmark"
+
+# Groups whose cases call the SMS or Mobile Money provider
+PROVIDER_GROUPS = ("sms", "money")
+
+
+def get_method(path):
+	module, method = path.rsplit(".", 1)
+	return getattr(importlib.import_module(module), method)
+
+
+def report_method(report, method):
+	return get_method(f"stewardpro.stewardpro.report.{report}.{report}.{method}")
+
+
+def get_default_filters():
+	today = getdate(nowdate())
+	fiscal_year = frappe.db.get_value(
+		"Fiscal Year", {"year_start_date": ["<=", today], "year_end_date": [">=", today]}
+	)
+	return frappe._dict(
+		year=str(today.year),
+		from_date=str(add_months(today, -12)),
+		to_date=str(today),
+		fiscal_year=fiscal_year,
+	)
+
+
+def get_report_filters(report, defaults):
+	if report in ("annual_report", "building_fund_report", "camp_meeting_contributions_report"):
+		return frappe._dict(year=defaults.year)
+	if report == "departmental_budget_report":
+		return frappe._dict(fiscal_year=defaults.fiscal_year)
+	if report == "financial_summary":
+		return frappe._dict()
+	return frappe._dict(from_date=defaults.from_date, to_date=defaults.to_date)
+
+
+def get_cases(groups=None):
+	"""(group, name, callable) for every benchmark case"""
+	defaults = get_default_filters()
+	filters_json = json.dumps(defaults)
+	cases = []
+
+	for report in REPORTS:
+		execute = report_method(report, "execute")
+		filters = get_report_filters(report, defaults)
+		cases.append(("report", report, lambda execute=execute, filters=filters: execute(frappe._dict(filters))))
+
+	members = frappe.get_all("Member", pluck="name", order_by="name", limit=SMS_BATCH_SIZE)
+	year_filters = json.dumps({"year": defaults.year})
+	api_calls = [
+		("tithes_and_offerings_report.get_member_chart_data", {"filters": filters_json}),
+		("tithes_and_offerings_report.get_payment_mode_chart_data", {"filters": filters_json}),
+		("building_fund_report.get_contributor_summary", {"filters": year_filters}),
+		("building_fund_report.get_monthly_summary", {"filters": year_filters}),
+		("building_fund_report.get_project_progress", {"filters": year_filters}),
+		("building_fund_report.get_contribution_trends", {"filters": year_filters}),
+		("camp_meeting_contributions_report.get_member_summary", {"filters": year_filters}),
+		("camp_meeting_contributions_report.get_yearly_summary", {"filters": "{}"}),
+		("department_income_report.get_income_summary", {"filters": filters_json}),
+		("expense_report.get_expense_summary", {"filters": filters_json}),
+		("departmental_budget_report.get_summary_data", {"filters": json.dumps({"fiscal_year": defaults.fiscal_year})}),
+	]
+	for path, kwargs in api_calls:
+		report, method = path.split(".")
+		function = report_method(report, method)
+		cases.append(("api", path, lambda function=function, kwargs=kwargs: function(**kwargs)))
+
+	cases.append(
+		(
+			"api",
+			"member.get_member_contribution_profiles",
+			lambda: get_method(
+				"stewardpro.stewardpro.doctype.member.contribution_profile.get_profiles"
+			)(members),
+		)
+	)
+	cases.append(
+		(
+			"api",
+			"statements.get_statement_totals",
+			lambda: get_method("stewardpro.stewardpro.api.statements.get_statement_totals")(defaults.year),
+		)
+	)
+
+	records = frappe.get_all(
+		"Tithes and Offerings",
+		filters={"docstatus": 1, "member": ["is", "set"]},
+		pluck="name",
+		order_by="date desc",
+		limit=SMS_BATCH_SIZE,
+	)
+	cases.append(
+		(
+			"sms",
+			"sms.send_bulk_receipt_sms",
+			lambda: get_method("stewardpro.stewardpro.api.sms.send_bulk_receipt_sms")(records),
+		)
+	)
+	cases.append(
+		(
+			"sms",
+			"sms.send_bulk_welcome_sms",
+			lambda: get_method("stewardpro.stewardpro.api.sms.send_bulk_welcome_sms")(members),
+		)
+	)
+
+	recipients = frappe.get_all(
+		"Member",
+		filters={"normalized_contact": ["is", "set"]},
+		fields=["full_name", "normalized_contact"],
+		order_by="name",
+		limit=SMS_BATCH_SIZE,
+	)
+	messages = [
+		{
+			"recipient_name": recipient.full_name,
+			"phone": recipient.normalized_contact,
+			"message": f"Dear {recipient.full_name}, this is a StewardPro benchmark message.",
+		}
+		for recipient in recipients
+	]
+	cases.append(
+		(
+			"sms",
+			"sms_campaign.dispatch_messages",
+			lambda: get_method("stewardpro.stewardpro.api.sms_campaign.dispatch_messages")(
+				BENCHMARK_SMS_TYPE, messages
+			),
+		)
+	)
+
+	def request_payments():
+		mobile_money_api = get_method("stewardpro.stewardpro.api.money.MobileMoneyAPI")()
+		for recipient in recipients:
+			mobile_money_api.send_payment_request(recipient.normalized_contact, "1000", "StewardPro benchmark")
+
+	cases.append(("money", "money.send_payment_request", request_payments))
+
+	if groups:
+		cases = [case for case in cases if case[0] in groups]
+
+	return cases
+
+
+@contextmanager
+def provider_simulator_settings(transport="http", sms_rate=None, **options):
+	"""Point StewardPro Settings at a provider simulator for the duration of the block.
+
+	``transport`` is "http" (a local server) or "inprocess"; ``sms_rate`` overrides
+	SMS Messages per Second; ``options`` go to ``ProviderSimulator``.
+	"""
+	fields = (
+		"enable_sms_integration",
+		"sms_api_key",
+		"sms_api_secret",
+		"sms_sender_id",
+		"sms_base_url",
+		"sms_messages_per_second",
+		"enable_mobile_money_integration",
+		"money_api_key",
+		"money_public_key",
+		"mobile_money_base_url",
+	)
+	original = {field: frappe.db.get_single_value("StewardPro Settings", field) for field in fields}
+
+	# The cache wrapper prefixes the keys itself
+	circuit_was_open = frappe.cache().exists(CIRCUIT_TRIPPED_KEY)
+
+	simulator = SimulatorServer(**options) if transport == "http" else InProcessTransport(**options)
+	with simulator:
+		settings = {
+			"enable_sms_integration": 1,
+			"sms_api_key": "benchmark",
+			"sms_api_secret": "benchmark",
+			"sms_sender_id": "StewardPro",
+			"sms_base_url": simulator.url,
+			"enable_mobile_money_integration": 1,
+			"money_api_key": "benchmark",
+			"money_public_key": "benchmark",
+			"mobile_money_base_url": simulator.money_url,
+		}
+		if sms_rate:
+			settings["sms_messages_per_second"] = sms_rate
+		frappe.db.set_single_value("StewardPro Settings", settings)
+		try:
+			yield simulator.simulator
+		finally:
+			frappe.db.set_single_value("StewardPro Settings", original)
+			# Neither a pause caused by simulated failures nor its deferred messages outlive the run
+			if not circuit_was_open:
+				close_circuit()
+			drop_benchmark_deferred_messages()
+			frappe.db.commit()
+
+
+def drop_benchmark_deferred_messages():
+	"""Remove the chunks benchmark cases deferred, leaving every other deferred message queued"""
+	cache = frappe.cache()
+	for chunk in cache.lrange(DEFERRED_MESSAGES_KEY, 0, -1):
+		if json.loads(chunk)["sms_type"] == BENCHMARK_SMS_TYPE:
+			# ``lrem`` is not wrapped, so it takes the prefixed key
+			cache.lrem(cache.make_key(DEFERRED_MESSAGES_KEY), 1, chunk)
+
+
+def run_case(function, iterations):
+	samples = []
+	for _index in range(iterations):
+		with QueryCounter() as counter:
+			function()
+		# Discard whatever the case wrote without committing
+		frappe.db.rollback()
+		samples.append(counter)
+
+	latencies = [sample.elapsed * 1000 for sample in samples]
+	return {
+		"iterations": iterations,
+		"queries": max(sample.queries for sample in samples),
+		"rows": max(sample.rows for sample in samples),
+		"p50_ms": percentile(latencies, 50),
+		"p95_ms": percentile(latencies, 95),
+		"sql_ms": percentile([sample.sql_time * 1000 for sample in samples], 50),
+	}
+
+
+def run(iterations=5, groups=None, sms_latency=0.0, transport="http", sms_rate=None, **simulator_options):
+	"""Run all (or the given groups of) benchmark cases and return one result per case
+
+	``sms_latency``, ``transport``, ``sms_rate`` and ``simulator_options`` configure
+	the provider simulator the SMS and Mobile Money cases talk to.
+	"""
+	cases = get_cases(groups)
+	results = []
+
+	def run_cases(selected, simulator=None):
+		for group, name, function in selected:
+			# Warm-up run so the first sample does not pay for imports and caches
+			run_case(function, 1)
+			stats = Counter(simulator.stats) if simulator else None
+			result = {"group": group, "case": name, **run_case(function, iterations)}
+			if simulator:
+				result["provider"] = dict(simulator.stats - stats)
+			results.append(result)
+
+	run_cases([case for case in cases if case[0] not in PROVIDER_GROUPS])
+
+	provider_cases = [case for case in cases if case[0] in PROVIDER_GROUPS]
+	if provider_cases:
+		with provider_simulator_settings(
+			transport=transport, sms_rate=sms_rate, latency=sms_latency, **simulator_options
+		) as simulator:
+			# Settings must be visible to the rolled back cases
+			frappe.db.commit()
+			run_cases(provider_cases, simulator)
+
+	return results
+
+
+def format_results(results):
+	header = f"{'case':<62} {'queries':>8} {'rows':>8} {'p50 ms':>10} {'p95 ms':>10} {'sql ms':>10}"
+	lines = [header, "-" * len(header)]
+	for result in results:
+		lines.append(
+			f"{result['group'] + ':' + result['case']:<62} {result['queries']:>8} {result['rows']:>8} "
+			f"{result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['sql_ms']:>10.1f}"
+		)
+	return "\n".join(lines)
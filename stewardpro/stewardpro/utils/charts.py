@@ -0,0 +1,156 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Shared chart-data builders for StewardPro reports.
+
+Reports feed their rows (or pre-aggregated GROUP BY results) through one or more
+``SeriesAccumulator`` objects in a single pass and then turn the accumulated columns
+into Frappe chart dicts with ``make_chart``.
+"""
+
+import json
+import re
+from array import array
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+_NON_NUMERIC = re.compile(r"[^\d.-]")
+
+
+def to_number(value):
+	"""Coerce a cell value to float, tolerating None, "" and formatted strings"""
+	if value is None or value == "":
+		return 0.0
+	if isinstance(value, (int, float)):
+		return float(value)
+	try:
+		return float(value)
+	except (ValueError, TypeError):
+		pass
+	# Formatted values posted back from the browser, e.g. "<b>TZS 1,200.00</b>"
+	value = _NON_NUMERIC.sub("", _HTML_TAG.sub("", str(value)))
+	try:
+		return float(value) if value else 0.0
+	except (ValueError, TypeError):
+		return 0.0
+
+
+def load_rows(data):
+	"""Decode report rows posted by the client; returns a list of dicts or None"""
+	if not data:
+		return None
+
+	if isinstance(data, str):
+		try:
+			data = json.loads(data)
+		except ValueError:
+			return None
+
+	if not isinstance(data, list):
+		return None
+
+	return [row for row in data if isinstance(row, dict)]
+
+
+def is_label_row(category):
+	"""Header, separator and total rows are rendered as <b>..</b> or left blank"""
+	return not category or not category.strip() or category.startswith("<b>")
+
+
+class SeriesAccumulator:
+	"""Sum several numeric fields per label, backed by one float array per field.
+
+	A field is either a column name or a tuple of column names that are summed
+	together (e.g. camp meeting + building offerings as "special").
+	"""
+
+	def __init__(self, fields):
+		self.fields = tuple(fields)
+		self.labels = []
+		self._slots = {}
+		self._columns = [array("d") for _ in self.fields]
+
+	def add(self, label, values):
+		slot = self._slots.get(label)
+		if slot is None:
+			slot = self._slots[label] = len(self.labels)
+			self.labels.append(label)
+			for column in self._columns:
+				column.append(0.0)
+
+		for column, value in zip(self._columns, values, strict=True):
+			column[slot] += value
+
+	def add_row(self, label, row):
+		values = []
+		for field in self.fields:
+			if isinstance(field, tuple):
+				values.append(sum(to_number(row.get(part)) for part in field))
+			else:
+				values.append(to_number(row.get(field)))
+		self.add(label, values)
+
+	def column(self, field):
+		return self._columns[self.fields.index(field)]
+
+	def values(self, field, labels=None):
+		column = self.column(field)
+		if labels is None:
+			return column.tolist()
+		return [column[self._slots[label]] for label in labels]
+
+	def sorted_labels(self):
+		return sorted(self.labels)
+
+	def top_labels(self, field, limit=10):
+		column = self.column(field)
+		order = sorted(range(len(self.labels)), key=column.__getitem__, reverse=True)
+		return [self.labels[slot] for slot in order[:limit]]
+
+	def total(self, field):
+		return sum(self.column(field))
+
+	def __len__(self):
+		return len(self.labels)
+
+
+def accumulate(rows, specs):
+	"""Feed every row into each ``(accumulator, key)`` pair in a single pass.
+
+	``key`` is a column name or a callable returning the label for a row; rows whose
+	key is None are skipped for that accumulator.
+	"""
+	getters = [
+		(accumulator, key if callable(key) else (lambda row, key=key: row.get(key))) for accumulator, key in specs
+	]
+
+	for row in rows:
+		for accumulator, get_key in getters:
+			label = get_key(row)
+			if label is not None:
+				accumulator.add_row(label, row)
+
+	return [accumulator for accumulator, _key in specs]
+
+
+def make_chart(labels, datasets, chart_type="bar", height=300, colors=None):
+	"""Build the chart dict returned by report ``execute`` and chart endpoints.
+
+	``datasets`` is a list of ``(name, values)`` pairs; pass ``None`` as the name for
+	single-series pie/donut charts.
+	"""
+	chart = {
+		"data": {
+			"labels": list(labels),
+			"datasets": [
+				{"name": name, "values": list(values)} if name else {"values": list(values)}
+				for name, values in datasets
+			],
+		},
+		"type": chart_type,
+		"height": height,
+	}
+
+	if colors:
+		chart["colors"] = colors
+
+	return chart
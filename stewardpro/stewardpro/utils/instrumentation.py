@@ -0,0 +1,129 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Opt-in query count and latency instrumentation for StewardPro calls.
+
+Enabled per site with ``bench --site <site> set-config stewardpro_instrumentation 1``.
+The ``before_request`` / ``after_request`` hooks wrap every ``/api/method`` call into
+a ``stewardpro.*`` whitelisted method and every query report run of a StewardPro
+report. Each call is pushed onto a Redis list capped at ``MAX_CALLS`` entries, which
+the StewardPro Performance page aggregates. When disabled the hooks cost one
+config lookup per request.
+"""
+
+import json
+
+import frappe
+from frappe.utils import now
+
+from stewardpro.stewardpro.utils.profiling import QueryCounter, percentile
+
+CALLS_KEY = "stewardpro:performance:calls"
+MAX_CALLS = 2000
+
+MODULE = "StewardPro"
+REPORT_METHODS = (
+	"frappe.desk.query_report.run",
+	"frappe.desk.query_report.export_query",
+)
+
+
+def is_enabled():
+	return bool(frappe.conf.get("stewardpro_instrumentation"))
+
+
+def get_call_name():
+	"""Name of the StewardPro call handled by this request, or None"""
+	path = frappe.request.path if getattr(frappe, "request", None) else ""
+	if "/api/method/" not in path:
+		return None
+
+	method = path.split("/api/method/", 1)[1].strip("/")
+	if method.startswith("stewardpro."):
+		return method
+
+	if method in REPORT_METHODS:
+		report_name = frappe.form_dict.get("report_name")
+		if report_name and frappe.get_cached_value("Report", report_name, "module") == MODULE:
+			return f"report:{report_name}"
+
+	return None
+
+
+def before_request():
+	if not is_enabled():
+		return
+
+	call = get_call_name()
+	if not call:
+		return
+
+	counter = QueryCounter()
+	counter.__enter__()
+	frappe.local.stewardpro_call = (call, counter)
+
+
+def after_request(response=None, request=None):
+	state = getattr(frappe.local, "stewardpro_call", None)
+	if not state:
+		return
+
+	frappe.local.stewardpro_call = None
+	call, counter = state
+	counter.__exit__(None, None, None)
+
+	record_call(
+		{
+			"call": call,
+			"user": frappe.session.user if getattr(frappe.local, "session", None) else None,
+			"timestamp": now(),
+			"status": getattr(response, "status_code", None),
+			"queries": counter.queries,
+			"rows": counter.rows,
+			"sql_ms": counter.sql_time * 1000,
+			"python_ms": counter.python_time * 1000,
+			"elapsed_ms": counter.elapsed * 1000,
+		}
+	)
+
+
+def record_call(entry):
+	cache = frappe.cache()
+	cache.lpush(CALLS_KEY, json.dumps(entry))
+	cache.ltrim(CALLS_KEY, 0, MAX_CALLS - 1)
+
+
+def get_calls():
+	return [json.loads(entry) for entry in frappe.cache().lrange(CALLS_KEY, 0, MAX_CALLS - 1) or []]
+
+
+def clear_calls():
+	frappe.cache().delete_value(CALLS_KEY)
+
+
+def summarize_calls(calls, limit=20):
+	"""Aggregate recorded calls per call name, slowest p95 first"""
+	grouped = {}
+	for entry in calls:
+		grouped.setdefault(entry["call"], []).append(entry)
+
+	summary = []
+	for call, entries in grouped.items():
+		latencies = [entry["elapsed_ms"] for entry in entries]
+		summary.append(
+			{
+				"call": call,
+				"count": len(entries),
+				"p50_ms": percentile(latencies, 50),
+				"p95_ms": percentile(latencies, 95),
+				"max_ms": max(latencies),
+				"avg_queries": sum(entry["queries"] for entry in entries) / len(entries),
+				"avg_sql_ms": sum(entry["sql_ms"] for entry in entries) / len(entries),
+				"avg_python_ms": sum(entry["python_ms"] for entry in entries) / len(entries),
+				"avg_rows": sum(entry["rows"] for entry in entries) / len(entries),
+			}
+		)
+
+	summary.sort(key=lambda row: row["p95_ms"], reverse=True)
+	return summary[:limit]
+
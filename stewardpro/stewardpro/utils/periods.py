@@ -0,0 +1,112 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Date filtering and date-bucketed aggregates shared by the contribution reports.
+
+Buckets use ``EXTRACT(YEAR/MONTH FROM ...)`` which renders the same on MariaDB and
+Postgres, so summaries are a single GROUP BY instead of rows pulled into Python.
+The ``year`` filter is a calendar year; yearly buckets follow the enabled Fiscal Years.
+"""
+
+import calendar
+from datetime import date
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Count, Min, Sum
+from frappe.utils import cint, flt, getdate
+from pypika.enums import DatePart
+from pypika.functions import Extract
+
+from stewardpro.stewardpro.doctype.fiscal_year.fiscal_periods import (
+	fiscal_year_case,
+	get_fiscal_year_dates,
+	get_fiscal_year_index,
+	get_year_dates,
+)
+
+
+def apply_date_filters(query, date_field, filters):
+	"""Apply the year / fiscal_year / from_date / to_date report filters to a query"""
+	for dates in (get_filter_year_dates(filters), get_fiscal_year_dates(filters.get("fiscal_year"))):
+		if dates:
+			query = query.where(date_field[dates[0] : dates[1]])
+
+	if filters.get("from_date"):
+		query = query.where(date_field >= getdate(filters.get("from_date")))
+
+	if filters.get("to_date"):
+		query = query.where(date_field <= getdate(filters.get("to_date")))
+
+	return query
+
+
+def get_filter_year_dates(filters):
+	"""(from_date, to_date) of the ``year`` filter, or None"""
+	if filters.get("year"):
+		return get_year_dates(filters.get("year"))
+	return None
+
+
+def get_contribution_period_summary(amount_field, filters, by_month=True, member_filter="member"):
+	"""Count and sum a Tithes and Offerings amount column per month, or per Fiscal Year.
+
+	Returns rows with year, fiscal_year, contribution_count, contributor_count and
+	total_contribution (plus month and month_name when ``by_month``), oldest period
+	first. Yearly buckets fall back to calendar years when no Fiscal Year exists.
+	``member_filter`` is the name of the report's filter holding the Member.
+	"""
+	TithesOfferings = DocType("Tithes and Offerings")
+	amount = TithesOfferings[amount_field]
+	index = get_fiscal_year_index()
+	by_fiscal_year = not by_month and len(index) > 0
+
+	if by_fiscal_year:
+		buckets = [fiscal_year_case(TithesOfferings.date).as_("fiscal_year")]
+	else:
+		buckets = [Extract(DatePart.year, TithesOfferings.date).as_("year")]
+		if by_month:
+			buckets.append(Extract(DatePart.month, TithesOfferings.date).as_("month"))
+	ordering = [Min(TithesOfferings.date)] if by_fiscal_year else buckets
+
+	query = (
+		frappe.qb.from_(TithesOfferings)
+		.select(
+			*buckets,
+			Count(TithesOfferings.name).as_("contribution_count"),
+			Count(TithesOfferings.member.distinct()).as_("contributor_count"),
+			Sum(amount).as_("total_contribution"),
+		)
+		.where(TithesOfferings.docstatus == 1)
+		.where(amount > 0)
+		.groupby(*buckets)
+		.orderby(*ordering)
+	)
+
+	if filters.get(member_filter):
+		query = query.where(TithesOfferings.member == filters.get(member_filter))
+
+	data = apply_date_filters(query, TithesOfferings.date, filters).run(as_dict=True)
+
+	for row in data:
+		if by_fiscal_year:
+			fiscal_year = index.get(row.get("fiscal_year"))
+			row["year"] = fiscal_year.from_date.year if fiscal_year else None
+		else:
+			# Postgres returns EXTRACT() as a double
+			row["year"] = cint(row.get("year"))
+		row["total_contribution"] = flt(row.get("total_contribution"))
+		row["average_contribution"] = (
+			row["total_contribution"] / row["contribution_count"] if row.get("contribution_count") else 0
+		)
+		if by_month:
+			row["month"] = cint(row.get("month"))
+			row["month_name"] = _(calendar.month_name[row["month"]])
+
+	if by_month:
+		fiscal_years = index.resolve_many([date(row["year"], row["month"], 1) for row in data])
+		for row, fiscal_year in zip(data, fiscal_years, strict=True):
+			row["fiscal_year"] = fiscal_year.name if fiscal_year else None
+
+	return data
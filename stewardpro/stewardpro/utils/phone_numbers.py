@@ -0,0 +1,110 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Phone numbers in E.164 form and recipient deduplication.
+
+Numbers are typed in many shapes ("0712 345 678", "+255712345678",
+"00255-712-345678", "712345678"). ``normalize_phones`` maps a whole list to
+``+<country code><subscriber number>`` in one pass, using the "Default Country
+Calling Code" of StewardPro Settings for national numbers, and returns None for
+anything that cannot be a phone number. Members keep the result in the indexed
+``normalized_contact`` column, so campaigns select and deduplicate recipients on
+it without normalizing every message again.
+"""
+
+import re
+
+import frappe
+from frappe.query_builder import DocType
+
+DEFAULT_COUNTRY_CODE = "255"
+
+# E.164 allows at most 15 digits; shorter than 8 cannot be a subscriber number
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+
+SEPARATORS = re.compile(r"[\s\-().\/]")
+
+
+def get_default_country_code():
+	code = frappe.db.get_single_value("StewardPro Settings", "sms_default_country_code", cache=True)
+	return (code or DEFAULT_COUNTRY_CODE).strip().lstrip("+")
+
+
+def normalize_phone(value, country_code=None):
+	"""``value`` in E.164 form (``+255712345678``) or None"""
+	return normalize_phones([value], country_code)[0]
+
+
+def normalize_phones(values, country_code=None):
+	"""E.164 form (or None) of every value, in input order"""
+	country_code = country_code or get_default_country_code()
+	normalized = {}
+	result = []
+
+	for value in values:
+		if value not in normalized:
+			normalized[value] = to_e164(value, country_code)
+		result.append(normalized[value])
+
+	return result
+
+
+def to_e164(value, country_code):
+	if not value:
+		return None
+
+	number = SEPARATORS.sub("", str(value))
+	if number.startswith("+"):
+		digits = number[1:]
+	elif number.startswith("00"):
+		digits = number[2:]
+	elif number.startswith("0"):
+		# National trunk prefix
+		digits = country_code + number[1:]
+	elif number.startswith(country_code) and len(number) > len(country_code) + 7:
+		digits = number
+	else:
+		digits = country_code + number
+
+	if not digits.isdigit() or not MIN_DIGITS <= len(digits) <= MAX_DIGITS:
+		return None
+	return "+" + digits
+
+
+def dedupe_recipients(entries, key="phone"):
+	"""Entries with a valid, not yet seen number; returns (unique, duplicates, invalid).
+
+	Numbers are normalized in one pass; kept entries get the E.164 number.
+	"""
+	numbers = normalize_phones([entry[key] for entry in entries])
+	seen = set()
+	unique, duplicates, invalid = [], [], []
+
+	for entry, number in zip(entries, numbers, strict=True):
+		if not number:
+			invalid.append(entry)
+		elif number in seen:
+			duplicates.append(entry)
+		else:
+			seen.add(number)
+			unique.append({**entry, key: number})
+
+	return unique, duplicates, invalid
+
+
+def update_member_normalized_contacts(country_code=None):
+	"""Recompute ``normalized_contact`` of every Member; returns the number changed"""
+	Member = DocType("Member")
+	members = frappe.qb.from_(Member).select(Member.name, Member.contact, Member.normalized_contact).run(as_dict=True)
+
+	numbers = normalize_phones([member.contact for member in members], country_code)
+	updates = {
+		member.name: {"normalized_contact": number}
+		for member, number in zip(members, numbers, strict=True)
+		if (member.normalized_contact or None) != number
+	}
+
+	if updates:
+		frappe.db.bulk_update("Member", updates, chunk_size=500, update_modified=False)
+	return len(updates)
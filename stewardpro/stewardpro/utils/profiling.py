@@ -0,0 +1,184 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Query counting and timing helpers shared by the benchmark and instrumentation code."""
+
+import functools
+import math
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+
+
+class QueryCounter:
+	"""Count queries, SQL time and returned rows issued through ``frappe.db.sql``.
+
+	Used as a context manager; counters can be nested, each one sees the queries
+	run while it is active::
+
+		with QueryCounter() as counter:
+			execute(filters)
+		counter.queries, counter.sql_time, counter.elapsed
+	"""
+
+	def __init__(self):
+		self.queries = 0
+		self.rows = 0
+		self.sql_time = 0.0
+		self.elapsed = 0.0
+		self._start = None
+		self._db = None
+		self._sql = None
+
+	def __enter__(self):
+		self._db = frappe.db
+		self._sql = self._db.sql
+		self._db.sql = self._counting_sql
+		self._start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.elapsed = time.perf_counter() - self._start
+		self._db.sql = self._sql
+		return False
+
+	@property
+	def python_time(self):
+		return max(self.elapsed - self.sql_time, 0.0)
+
+	def _counting_sql(self, *args, **kwargs):
+		start = time.perf_counter()
+		try:
+			result = self._sql(*args, **kwargs)
+		finally:
+			self.sql_time += time.perf_counter() - start
+			self.queries += 1
+
+		if isinstance(result, (list, tuple)):
+			self.rows += len(result)
+
+		return result
+
+	def as_dict(self):
+		return {
+			"queries": self.queries,
+			"rows": self.rows,
+			"sql_time": self.sql_time,
+			"python_time": self.python_time,
+			"elapsed": self.elapsed,
+		}
+
+
+def percentile(values, pct):
+	"""Nearest-rank percentile of a list of numbers"""
+	if not values:
+		return 0.0
+
+	ordered = sorted(values)
+	rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+	return ordered[min(rank, len(ordered)) - 1]
+
+
+class DocumentTrace:
+	"""Trace of the controller methods run while saving or submitting documents.
+
+	While active, every ``Document.run_method`` call (validate, on_submit, doc_events,
+	...) and every method decorated with ``@profiled`` becomes a span recording its
+	wall time and the queries it issued, nested the way the calls were.
+	"""
+
+	def __init__(self):
+		self.counter = QueryCounter()
+		self.spans = []
+		self._stack = [self.spans]
+
+	def __enter__(self):
+		install_run_method_hook()
+		self.counter.__enter__()
+		frappe.local.stewardpro_trace = self
+		return self
+
+	def __exit__(self, *exc_info):
+		frappe.local.stewardpro_trace = None
+		self.counter.__exit__(*exc_info)
+		return False
+
+	@contextmanager
+	def span(self, name, docname=None):
+		node = {"name": name, "docname": docname, "children": []}
+		self._stack[-1].append(node)
+		self._stack.append(node["children"])
+
+		queries, sql_time = self.counter.queries, self.counter.sql_time
+		start = time.perf_counter()
+		try:
+			yield node
+		finally:
+			node["elapsed_ms"] = (time.perf_counter() - start) * 1000
+			node["queries"] = self.counter.queries - queries
+			node["sql_ms"] = (self.counter.sql_time - sql_time) * 1000
+			self._stack.pop()
+
+	def as_dict(self):
+		return {
+			"elapsed_ms": self.counter.elapsed * 1000,
+			"queries": self.counter.queries,
+			"sql_ms": self.counter.sql_time * 1000,
+			"spans": self.spans,
+		}
+
+	def folded(self):
+		"""Folded stacks ("a;b;c <self time in microseconds>") for flamegraph.pl or speedscope"""
+		lines = []
+
+		def walk(nodes, prefix):
+			for node in nodes:
+				path = f"{prefix};{node['name']}" if prefix else node["name"]
+				self_time = node["elapsed_ms"] - sum(child["elapsed_ms"] for child in node["children"])
+				lines.append(f"{path} {max(int(self_time * 1000), 0)}")
+				walk(node["children"], path)
+
+		walk(self.spans, "")
+		return "\n".join(lines)
+
+
+def get_active_trace():
+	return getattr(frappe.local, "stewardpro_trace", None)
+
+
+def profiled(method):
+	"""Record a controller method as a span when a DocumentTrace is active"""
+
+	@functools.wraps(method)
+	def wrapper(*args, **kwargs):
+		trace = get_active_trace()
+		if trace is None:
+			return method(*args, **kwargs)
+
+		docname = getattr(args[0], "name", None) if args and isinstance(args[0], Document) else None
+		with trace.span(method.__qualname__, docname):
+			return method(*args, **kwargs)
+
+	return wrapper
+
+
+def install_run_method_hook():
+	"""Wrap Document.run_method once; the wrapper is a no-op unless a trace is active"""
+	if getattr(Document.run_method, "_stewardpro_traced", False):
+		return
+
+	run_method = Document.run_method
+
+	@functools.wraps(run_method)
+	def traced_run_method(self, method, *args, **kwargs):
+		trace = get_active_trace()
+		if trace is None:
+			return run_method(self, method, *args, **kwargs)
+
+		with trace.span(f"{self.doctype}.{method}", self.name):
+			return run_method(self, method, *args, **kwargs)
+
+	traced_run_method._stewardpro_traced = True
+	Document.run_method = traced_run_method
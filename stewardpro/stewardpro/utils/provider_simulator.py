@@ -0,0 +1,393 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""An offline stand-in for the SMS and Mobile Money providers.
+
+``ProviderSimulator`` answers the JSON payloads ``SMSAPI.send_sms`` and
+``MobileMoneyAPI.send_payment_request`` post with Beem-style responses, and can
+be made slow (``latency`` plus random ``jitter``), flaky (``error_rate`` of 503
+answers), run out of SMS balance (``balance`` in TZS at ``price_per_sms`` per
+recipient, answered like the provider's "Insufficient balance" error) and send
+delivery reports and payment callbacks after ``callback_delay``.
+
+It is reachable through either transport:
+
+- ``SimulatorServer``: a local HTTP service; set the SMS Base URL to its ``url``
+  and the Mobile Money Base URL to its ``money_url``. It also runs on its own::
+
+	python -m stewardpro.stewardpro.utils.provider_simulator --port 8765 --error-rate 0.05
+
+- ``InProcessTransport``: no socket at all; base URLs of the form
+  ``simulator://<name>/...`` are answered by the simulator installed under that
+  name in the same process (see ``get_provider_session``), so it only serves
+  code that runs in the process that installed it.
+
+Callbacks go to a URL (posted with the ``X-StewardPro-Token`` header the
+delivery report endpoint expects) or to a callable, which is called with the
+reports in the thread that handled the request.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+SMS_PATH = "/v1/send"
+MOBILE_MONEY_PATH = "/v1/checkout"
+IN_PROCESS_SCHEME = "simulator"
+
+# Simulators answering ``simulator://<name>`` URLs in this process
+_installed = {}
+
+
+class ProviderSimulator:
+	"""Beem-style SMS and Mobile Money answers with configurable latency and failures"""
+
+	def __init__(
+		self,
+		latency=0.0,
+		jitter=0.0,
+		error_rate=0.0,
+		balance=None,
+		price_per_sms=20.0,
+		delivery_url=None,
+		delivery_token=None,
+		delivery_failure_rate=0.0,
+		payment_url=None,
+		payment_failure_rate=0.0,
+		callback_delay=0.0,
+		seed=None,
+	):
+		self.latency = latency
+		self.jitter = jitter
+		self.error_rate = error_rate
+		# None for an unlimited balance
+		self.balance = balance
+		self.price_per_sms = price_per_sms
+		self.delivery_url = delivery_url
+		self.delivery_token = delivery_token
+		self.delivery_failure_rate = delivery_failure_rate
+		self.payment_url = payment_url
+		self.payment_failure_rate = payment_failure_rate
+		self.callback_delay = callback_delay
+
+		self.requests = []
+		self.stats = Counter()
+		self._random = random.Random(seed)
+		self._request_ids = itertools.count(1)
+		self._lock = threading.Lock()
+
+	def count(self, stat, number=1):
+		with self._lock:
+			self.stats[stat] += number
+
+	def chance(self, rate):
+		with self._lock:
+			return rate > 0 and self._random.random() < rate
+
+	def wait(self):
+		with self._lock:
+			delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+		if delay > 0:
+			time.sleep(delay)
+
+	def handle(self, path, payload):
+		"""(HTTP status, response body) for a request to ``path``"""
+		self.wait()
+
+		if self.chance(self.error_rate):
+			self.count("server_errors")
+			return 503, {"successful": False, "message": "Service temporarily unavailable"}
+
+		if path.rstrip("/") == SMS_PATH:
+			return self.send_sms(payload)
+		if path.rstrip("/") == MOBILE_MONEY_PATH:
+			return self.checkout(payload)
+		return 404, {"successful": False, "message": f"Unknown endpoint {path}"}
+
+	def send_sms(self, payload):
+		if not payload.get("api_key") or not payload.get("api_secret"):
+			return 401, {"successful": False, "code": 120, "message": "Invalid Authentication Parameters"}
+
+		recipients = payload.get("recipients") or []
+		if not recipients or not payload.get("message"):
+			return 400, {"successful": False, "code": 110, "message": "Missing message or recipients"}
+
+		with self._lock:
+			cost = self.price_per_sms * len(recipients)
+			if self.balance is not None and self.balance < cost:
+				balance = self.balance
+				self.stats["insufficient_balance"] += 1
+				exhausted = True
+			else:
+				if self.balance is not None:
+					self.balance -= cost
+				request_id = next(self._request_ids)
+				self.requests.append(payload)
+				self.stats["sms_requests"] += 1
+				self.stats["sms_messages"] += len(recipients)
+				exhausted = False
+
+		if exhausted:
+			# Same shape as the gateway's error, which ``clean_error_message`` parses
+			message = f"Insufficient balance. Current balance: {balance:.2f} TZS"
+			return 400, {"message": {"status": "error", "message": message}}
+
+		self.send_delivery_reports(request_id, recipients)
+		return 200, {
+			"successful": True,
+			"request_id": request_id,
+			"code": 100,
+			"message": "Message Submitted Successfully",
+			"valid": len(recipients),
+			"invalid": 0,
+			"duplicates": 0,
+		}
+
+	def checkout(self, payload):
+		if not payload.get("api_key") or not payload.get("public_key"):
+			return 401, {"successful": False, "code": 120, "message": "Invalid Authentication Parameters"}
+
+		if not payload.get("phone_number") or not payload.get("amount"):
+			return 400, {"successful": False, "code": 110, "message": "Missing phone number or amount"}
+
+		transaction_id = str(uuid.uuid4())
+		reference = f"SP{next(self._request_ids):08d}"
+		with self._lock:
+			self.requests.append(payload)
+			self.stats["payment_requests"] += 1
+
+		self.send_payment_result(transaction_id, reference, payload)
+		return 200, {
+			"successful": True,
+			"code": 100,
+			"message": "Payment request sent to the customer's phone",
+			"transaction_id": transaction_id,
+			"reference_number": reference,
+			"msisdn": payload["phone_number"],
+			"amount": payload["amount"],
+		}
+
+	def send_delivery_reports(self, request_id, recipients):
+		if not self.delivery_url:
+			return
+
+		reports = [
+			{
+				"request_id": request_id,
+				"dest_addr": recipient,
+				"status": "UNDELIVERED" if self.chance(self.delivery_failure_rate) else "DELIVERED",
+			}
+			for recipient in recipients
+		]
+		self.count("delivery_reports", len(reports))
+		self.callback(self.delivery_url, reports)
+
+	def send_payment_result(self, transaction_id, reference, payload):
+		if not self.payment_url:
+			return
+
+		result = {
+			"transaction_id": transaction_id,
+			"reference_number": reference,
+			"msisdn": payload["phone_number"],
+			"amount": payload["amount"],
+			"status": "failed" if self.chance(self.payment_failure_rate) else "success",
+		}
+		self.count("payment_callbacks")
+		self.callback(self.payment_url, result)
+
+	def callback(self, target, body):
+		if callable(target):
+			target(body)
+			return
+
+		timer = threading.Timer(self.callback_delay, self.post_callback, (target, body))
+		timer.daemon = True
+		timer.start()
+
+	def post_callback(self, url, body):
+		headers = {"X-StewardPro-Token": self.delivery_token} if self.delivery_token else {}
+		try:
+			requests.post(url, json=body, headers=headers, timeout=10)
+		except requests.RequestException:
+			self.count("failed_callbacks")
+
+
+class SimulatorServer(ThreadingHTTPServer):
+	"""A ``ProviderSimulator`` served over local HTTP"""
+
+	daemon_threads = True
+
+	def __init__(self, simulator=None, host="127.0.0.1", port=0, **options):
+		super().__init__((host, port), SimulatorHandler)
+		self.simulator = simulator or ProviderSimulator(**options)
+		self._thread = None
+
+	@property
+	def base_url(self):
+		host, port = self.server_address[:2]
+		return f"http://{host}:{port}"
+
+	@property
+	def url(self):
+		return self.base_url + SMS_PATH
+
+	@property
+	def money_url(self):
+		return self.base_url + MOBILE_MONEY_PATH
+
+	def start(self):
+		self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc_info):
+		self.stop()
+		return False
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+	def do_POST(self):
+		length = int(self.headers.get("Content-Length") or 0)
+		try:
+			payload = json.loads(self.rfile.read(length) or b"{}")
+		except ValueError:
+			self.reply(400, {"successful": False, "message": "Invalid JSON"})
+			return
+
+		self.reply(*self.server.simulator.handle(urlparse(self.path).path, payload))
+
+	def reply(self, status, body):
+		body = json.dumps(body).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		# Keep benchmark output clean
+		pass
+
+
+class InProcessTransport:
+	"""A ``ProviderSimulator`` answering ``simulator://<name>`` URLs in this process"""
+
+	def __init__(self, simulator=None, name="default", **options):
+		self.simulator = simulator or ProviderSimulator(**options)
+		self.name = name
+
+	@property
+	def base_url(self):
+		return f"{IN_PROCESS_SCHEME}://{self.name}"
+
+	@property
+	def url(self):
+		return self.base_url + SMS_PATH
+
+	@property
+	def money_url(self):
+		return self.base_url + MOBILE_MONEY_PATH
+
+	def start(self):
+		_installed[self.name] = self.simulator
+		return self
+
+	def stop(self):
+		if _installed.get(self.name) is self.simulator:
+			del _installed[self.name]
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc_info):
+		self.stop()
+		return False
+
+
+class SimulatorAdapter(BaseAdapter):
+	"""``requests`` transport handing ``simulator://`` requests to the installed simulator"""
+
+	def send(self, request, **kwargs):
+		url = urlparse(request.url)
+		simulator = _installed.get(url.netloc)
+		if not simulator:
+			raise requests.ConnectionError(f"No provider simulator installed as {url.netloc!r}", request=request)
+
+		try:
+			payload = json.loads(request.body or b"{}")
+		except ValueError:
+			status, body = 400, {"successful": False, "message": "Invalid JSON"}
+		else:
+			status, body = simulator.handle(url.path, payload)
+
+		response = requests.Response()
+		response.status_code = status
+		response._content = json.dumps(body).encode()
+		response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+		response.encoding = "utf-8"
+		response.url = request.url
+		response.request = request
+		return response
+
+	def close(self):
+		pass
+
+
+def get_provider_session(base_url):
+	"""A keep-alive ``requests.Session`` for a provider, in-process when ``base_url`` is ``simulator://``"""
+	session = requests.Session()
+	if (base_url or "").startswith(f"{IN_PROCESS_SCHEME}://"):
+		session.mount(f"{IN_PROCESS_SCHEME}://", SimulatorAdapter())
+	return session
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run the StewardPro SMS and Mobile Money provider simulator")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+	parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds, at random")
+	parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 503")
+	parser.add_argument("--balance", type=float, default=None, help="SMS balance in TZS (unlimited if not set)")
+	parser.add_argument("--price-per-sms", type=float, default=20.0)
+	parser.add_argument("--delivery-url", help="delivery report endpoint to call for every message")
+	parser.add_argument("--delivery-token", help="value of the X-StewardPro-Token header of callbacks")
+	parser.add_argument("--delivery-failure-rate", type=float, default=0.0)
+	parser.add_argument("--payment-url", help="endpoint to send payment results to")
+	parser.add_argument("--payment-failure-rate", type=float, default=0.0)
+	parser.add_argument("--callback-delay", type=float, default=0.0)
+	parser.add_argument("--seed", type=int, default=None)
+	args = vars(parser.parse_args())
+
+	server = SimulatorServer(host=args.pop("host"), port=args.pop("port"), **args)
+	print(f"SMS: {server.url}\nMobile Money: {server.money_url}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		print(dict(server.simulator.stats))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,63 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Giving statement rendering for worker processes.
+
+This module deliberately does not import frappe: it is loaded by the
+``ProcessPoolExecutor`` workers started from ``stewardpro.stewardpro.api.statements``,
+which only need jinja2 and the statement rows handed to them.
+"""
+
+import os
+import re
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "templates", "statements")
+TEMPLATE_NAME = "giving_statement.html"
+
+_UNSAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+# Compiled once per worker process by init_worker()
+_template = None
+_context = None
+
+
+def format_amount(value):
+	return f"{float(value or 0):,.2f}"
+
+
+def get_template():
+	environment = Environment(
+		loader=FileSystemLoader(os.path.abspath(TEMPLATE_DIR)),
+		autoescape=select_autoescape(["html"]),
+		trim_blocks=True,
+		lstrip_blocks=True,
+	)
+	environment.filters["amount"] = format_amount
+	return environment.get_template(TEMPLATE_NAME)
+
+
+def init_worker(context):
+	"""Pool initializer: compile the template and keep the shared context"""
+	global _template, _context
+	_template = get_template()
+	_context = context
+
+
+def get_statement_filename(statement, year):
+	member = _UNSAFE_FILENAME.sub("-", statement.get("member") or "anonymous").strip("-")
+	return f"giving-statement-{year}-{member}.html"
+
+
+def render_statement(statement):
+	return _template.render(statement=statement, **_context)
+
+
+def render_chunk(statements):
+	"""Render a chunk of statements; returns (member, filename, html) tuples"""
+	year = _context["year"]
+	return [
+		(statement.get("member"), get_statement_filename(statement, year), render_statement(statement))
+		for statement in statements
+	]
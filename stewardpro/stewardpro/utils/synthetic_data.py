@@ -0,0 +1,440 @@
+# Copyright (c) 2024, StewardPro Team and contributors
+# For license information, please see license.txt
+
+"""Seeded synthetic data for benchmarking StewardPro at realistic volumes.
+
+High-volume records (Members, weekly Tithes and Offerings, Department Income and
+Expenses) are written with ``frappe.db.bulk_insert``; the few Fiscal Years, Items
+and Department Budgets go through the ORM so their validations and hooks run.
+Every generated record carries ``SYNTHETIC_PREFIX`` in its name or
+``SYNTHETIC_MARKER`` in its notes so ``clear_synthetic_data`` can remove it again.
+"""
+
+import random
+from datetime import date, timedelta
+
+import frappe
+from frappe.utils import add_days, now_datetime
+
+SYNTHETIC_PREFIX = "SYN"
+SYNTHETIC_MARKER = "Synthetic benchmark data"
+
+FIRST_NAMES = [
+	"Amani", "Baraka", "Neema", "Upendo", "Imani", "Faraja", "Rehema", "Tumaini", "Zawadi", "Furaha",
+	"Joseph", "Mary", "John", "Grace", "Peter", "Esther", "Daniel", "Ruth", "David", "Sarah",
+	"Elia", "Anna", "Yohana", "Agnes", "Samweli", "Lucy", "Emmanuel", "Janeth", "Paulo", "Rose",
+	"Gabriel", "Happiness", "Isaya", "Catherine", "Musa", "Elizabeth", "Stephano", "Martha", "Petro", "Debora",
+]
+
+LAST_NAMES = [
+	"Mwakyusa", "Mollel", "Kimaro", "Massawe", "Mushi", "Lyimo", "Swai", "Mrema", "Shayo", "Temba",
+	"Mwakalinga", "Mbwambo", "Nyirenda", "Mwita", "Chacha", "Marwa", "Kisanga", "Mhando", "Mapunda", "Komba",
+	"Ngowi", "Urassa", "Minja", "Tarimo", "Macha", "Msuya", "Kweka", "Mallya", "Makundi", "Njau",
+	"Mwasaga", "Kahemela", "Lugendo", "Mtei", "Kiwelu", "Mosha", "Materu", "Lema", "Munisi", "Mlay",
+]
+
+CITIES = ["Arusha", "Moshi", "Dar es Salaam", "Dodoma", "Mwanza", "Mbeya", "Morogoro", "Tanga"]
+
+ITEM_TEMPLATES = [
+	("Stationery", "Box", 25000, "Supplies"),
+	("Transport", "Trip", 40000, "Travel"),
+	("Refreshments", "Event", 150000, "Events"),
+	("Training Materials", "Set", 80000, "Training"),
+	("Sound Equipment Repair", "Job", 300000, "Maintenance"),
+	("Electricity", "Month", 120000, "Utilities"),
+]
+
+TITHE_PAYMENT_MODES = ["Cash", "Cash", "Mobile Transfer", "Mobile Transfer", "Bank Transfer"]
+EXPENSE_PAYMENT_MODES = ["Cash", "Mpesa", "Bank Transfer", "Cheque"]
+INCOME_TYPES = ["Offering", "Donation", "Fund Raising", "Grant", "Other"]
+
+# (share of members, probability of giving on a given Sabbath)
+GIVER_PROFILES = [(0.45, 0.85), (0.35, 0.45), (0.20, 0.1)]
+
+
+def generate(seed=42, members=2000, years=3, expenses_per_department=24, incomes_per_department=36):
+	"""Generate a full synthetic data set and return the number of records per doctype"""
+	rng = random.Random(seed)
+	end_date = date.today()
+	start_date = date(end_date.year - years + 1, 1, 1)
+
+	from stewardpro.patches.import_departments import execute as import_departments
+
+	import_departments()
+	departments = frappe.get_all(
+		"Department", filters={"is_active": 1}, fields=["name", "department_code"], order_by="name"
+	)
+
+	fiscal_years = ensure_fiscal_years(start_date.year, end_date.year)
+	member_rows = create_members(rng, members)
+	summary = {
+		"Fiscal Year": len(fiscal_years),
+		"Member": len(member_rows),
+		"Tithes and Offerings": create_contributions(rng, member_rows, start_date, end_date),
+	}
+
+	items = create_items(departments)
+	budgets = create_budgets(rng, departments, fiscal_years, items)
+	summary["Item"] = sum(len(department_items) for department_items in items.values())
+	summary["Department Budget"] = len(budgets)
+	summary["Department Income"] = create_department_income(rng, departments, fiscal_years, incomes_per_department)
+	summary["Department Expense"] = create_department_expenses(
+		rng, departments, fiscal_years, items, budgets, expenses_per_department
+	)
+	update_budget_spent_amounts(list(budgets.values()))
+
+	frappe.db.commit()
+	return summary
+
+
+def clear_synthetic_data():
+	"""Delete every record created by ``generate``"""
+	prefix = f"{SYNTHETIC_PREFIX}-%"
+
+	expenses = frappe.get_all("Department Expense", filters={"name": ["like", prefix]}, pluck="name")
+	if expenses:
+		frappe.db.delete("Department Expense Detail", {"parent": ["in", expenses]})
+		frappe.db.delete("Department Expense", {"name": ["in", expenses]})
+
+	frappe.db.delete("Department Income", {"name": ["like", prefix]})
+	frappe.db.delete("Tithes and Offerings", {"name": ["like", prefix]})
+
+	budgets = frappe.get_all("Department Budget", filters={"notes": SYNTHETIC_MARKER}, pluck="name")
+	if budgets:
+		frappe.db.delete("Department Budget Item", {"parent": ["in", budgets]})
+		frappe.db.delete("Department Budget", {"name": ["in", budgets]})
+		frappe.db.delete("Treasury Budget Detail", {"department_budget": ["in", budgets]})
+
+	frappe.db.delete("Item", {"notes": SYNTHETIC_MARKER})
+	frappe.db.delete("Member", {"notes": SYNTHETIC_MARKER})
+	frappe.db.commit()
+
+
+STANDARD_FIELDS = ["name", "owner", "creation", "modified", "modified_by", "docstatus"]
+
+
+def standard_fields(name, docstatus=1, creation=None):
+	timestamp = creation or now_datetime()
+	return [name, "Administrator", timestamp, timestamp, "Administrator", docstatus]
+
+
+def ensure_fiscal_years(first_year, last_year):
+	"""Calendar fiscal years covering the generated period, reusing existing ones"""
+	fiscal_years = {}
+	for year in range(first_year, last_year + 1):
+		mid_year = date(year, 7, 1)
+		existing = frappe.db.get_value(
+			"Fiscal Year",
+			{"year_start_date": ["<=", mid_year], "year_end_date": [">=", mid_year]},
+			["name", "year_start_date", "year_end_date"],
+			as_dict=True,
+		)
+		if not existing:
+			doc = frappe.get_doc(
+				{
+					"doctype": "Fiscal Year",
+					"year": str(year),
+					"year_start_date": date(year, 1, 1),
+					"year_end_date": date(year, 12, 31),
+				}
+			).insert(ignore_permissions=True)
+			existing = frappe._dict(
+				name=doc.name, year_start_date=doc.year_start_date, year_end_date=doc.year_end_date
+			)
+		fiscal_years[existing.name] = existing
+
+	return fiscal_years
+
+
+def create_members(rng, count):
+	combinations = len(FIRST_NAMES) * len(FIRST_NAMES) * len(LAST_NAMES)
+	existing = set(frappe.get_all("Member", pluck="name"))
+
+	rows = []
+	for index in rng.sample(range(combinations), min(count, combinations)):
+		first, rest = divmod(index, len(FIRST_NAMES) * len(LAST_NAMES))
+		middle, last = divmod(rest, len(LAST_NAMES))
+		full_name = f"{FIRST_NAMES[first]} {FIRST_NAMES[middle]} {LAST_NAMES[last]}"
+		if full_name in existing:
+			continue
+
+		share = rng.random()
+		frequency = next(
+			probability for cumulative, probability in accumulate_shares(GIVER_PROFILES) if share <= cumulative
+		)
+		rows.append(
+			frappe._dict(
+				name=full_name,
+				gender=rng.choice(["Male", "Female"]),
+				date_of_birth=date(rng.randint(1950, 2008), rng.randint(1, 12), rng.randint(1, 28)),
+				membership_date=date(rng.randint(1990, date.today().year - 1), rng.randint(1, 12), rng.randint(1, 28)),
+				contact=f"2557{rng.randint(10000000, 99999999)}" if rng.random() < 0.9 else None,
+				city=rng.choice(CITIES),
+				status="Active" if rng.random() < 0.92 else "Inactive",
+				# Monthly income in TZS drives the tithe amount
+				income=rng.lognormvariate(13.1, 0.6),
+				frequency=frequency,
+			)
+		)
+
+	fields = [*STANDARD_FIELDS, "full_name", "status", "role", "gender", "date_of_birth", "membership_date", "contact", "normalized_contact", "city", "notes"]
+	values = [
+		(
+			*standard_fields(row.name, docstatus=0),
+			row.name, row.status, "Member", row.gender, row.date_of_birth,
+			row.membership_date, row.contact, row.contact and f"+{row.contact}", row.city, SYNTHETIC_MARKER,
+		)
+		for row in rows
+	]
+	frappe.db.bulk_insert("Member", fields, values)
+
+	return rows
+
+
+def accumulate_shares(profiles):
+	cumulative = 0
+	for share, probability in profiles:
+		cumulative += share
+		yield cumulative, probability
+	yield 1.0, profiles[-1][1]
+
+
+def round_amount(amount, step=500):
+	return max(int(amount / step) * step, 0)
+
+
+def iter_sabbaths(start_date, end_date):
+	day = start_date + timedelta(days=(5 - start_date.weekday()) % 7)
+	while day <= end_date:
+		yield day
+		day += timedelta(days=7)
+
+
+def create_contributions(rng, members, start_date, end_date):
+	"""Weekly Sabbath giving for every member according to their giving profile"""
+	fields = [
+		*STANDARD_FIELDS, "member", "memnber_name", "date", "payment_mode", "tithe_amount",
+		"offering_amount", "offering_to_field", "offering_to_church", "campmeeting_offering",
+		"church_building_offering", "total_amount", "receipt_number",
+	]
+
+	values = []
+	sequence = 0
+	for sabbath in iter_sabbaths(start_date, end_date):
+		camp_meeting_season = sabbath.month in (6, 7, 8)
+		for member in members:
+			if member.status != "Active" or rng.random() > member.frequency:
+				continue
+
+			tithe = round_amount(member.income * rng.uniform(0.08, 0.12) / 4 / member.frequency)
+			offering = round_amount(member.income * rng.uniform(0.01, 0.04) / 4)
+			camp_meeting = round_amount(rng.uniform(5000, 50000)) if camp_meeting_season and rng.random() < 0.2 else 0
+			building = round_amount(rng.uniform(2000, 100000)) if rng.random() < 0.15 else 0
+			total = tithe + offering + camp_meeting + building
+			if total <= 0:
+				continue
+
+			sequence += 1
+			name = f"{SYNTHETIC_PREFIX}-TAO-{sequence:07d}"
+			values.append(
+				(
+					*standard_fields(name, creation=f"{sabbath} 12:00:00"),
+					member.name, member.name, sabbath, rng.choice(TITHE_PAYMENT_MODES), tithe,
+					offering, offering * 0.58, offering * 0.42, camp_meeting, building, total,
+					f"{SYNTHETIC_PREFIX}-RCP-{sequence:07d}",
+				)
+			)
+
+	frappe.db.bulk_insert("Tithes and Offerings", fields, values)
+	return len(values)
+
+
+def create_items(departments):
+	items = {}
+	for department in departments:
+		department_items = items.setdefault(department.name, [])
+		for item_name, unit_of_measure, standard_cost, expense_category in ITEM_TEMPLATES:
+			name = frappe.db.get_value("Item", {"item_name": item_name, "department": department.name})
+			if not name:
+				name = (
+					frappe.get_doc(
+						{
+							"doctype": "Item",
+							"item_name": item_name,
+							"department": department.name,
+							"department_code": department.department_code,
+							"unit_of_measure": unit_of_measure,
+							"standard_cost": standard_cost,
+							"is_active": 1,
+							"notes": SYNTHETIC_MARKER,
+						}
+					)
+					.insert(ignore_permissions=True)
+					.name
+				)
+			department_items.append(frappe._dict(name=name, standard_cost=standard_cost, expense_category=expense_category))
+
+	return items
+
+
+def create_budgets(rng, departments, fiscal_years, items):
+	"""One submitted Department Budget per department and fiscal year"""
+	budgets = {}
+	for fiscal_year in fiscal_years:
+		for department in departments:
+			name = frappe.db.get_value(
+				"Department Budget",
+				{"department": department.name, "fiscal_year": fiscal_year, "docstatus": 1},
+			)
+			if not name:
+				budget_items = []
+				for item in items[department.name]:
+					quantity = rng.randint(4, 24)
+					budget_items.append(
+						{
+							"item": item.name,
+							"quantity": quantity,
+							"unit_price": item.standard_cost,
+							"budgeted_amount": quantity * item.standard_cost,
+						}
+					)
+
+				doc = frappe.get_doc(
+					{
+						"doctype": "Department Budget",
+						"department": department.name,
+						"fiscal_year": fiscal_year,
+						"budget_period": "Annual",
+						"total_budget_amount": sum(row["budgeted_amount"] for row in budget_items) * 1.1,
+						"budget_items": budget_items,
+						"notes": SYNTHETIC_MARKER,
+					}
+				)
+				doc.insert(ignore_permissions=True)
+				doc.submit()
+				name = doc.name
+
+			budgets[(department.name, fiscal_year)] = name
+
+	return budgets
+
+
+def random_date(rng, fiscal_year):
+	end = min(fiscal_year.year_end_date, date.today())
+	span = (end - fiscal_year.year_start_date).days
+	return add_days(fiscal_year.year_start_date, rng.randint(0, max(span, 0)))
+
+
+def create_department_income(rng, departments, fiscal_years, per_department):
+	fields = [*STANDARD_FIELDS, "date", "department", "department_code", "income_type", "amount", "payment_mode", "receipt_number"]
+
+	values = []
+	sequence = 0
+	for fiscal_year in fiscal_years.values():
+		for department in departments:
+			for _index in range(per_department):
+				sequence += 1
+				values.append(
+					(
+						*standard_fields(f"{SYNTHETIC_PREFIX}-DI-{sequence:07d}"),
+						random_date(rng, fiscal_year), department.name, department.department_code,
+						rng.choice(INCOME_TYPES), round_amount(rng.lognormvariate(11.5, 0.8)),
+						rng.choice(EXPENSE_PAYMENT_MODES), f"{SYNTHETIC_PREFIX}-DIR-{sequence:07d}",
+					)
+				)
+
+	frappe.db.bulk_insert("Department Income", fields, values)
+	return len(values)
+
+
+def create_department_expenses(rng, departments, fiscal_years, items, budgets, per_department):
+	"""Paid expenses against each department's budget, one to three detail rows each"""
+	parent_fields = [*STANDARD_FIELDS, "expense_date", "department", "budget_reference", "total_amount", "payment_mode", "status"]
+	child_fields = [
+		*STANDARD_FIELDS, "parent", "parenttype", "parentfield", "idx", "item", "expense_category",
+		"expense_description", "quantity", "unit_price", "amount",
+	]
+
+	parents, children = [], []
+	sequence = detail_sequence = 0
+	for fiscal_year in fiscal_years.values():
+		for department in departments:
+			for _index in range(per_department):
+				sequence += 1
+				name = f"{SYNTHETIC_PREFIX}-EXP-{sequence:07d}"
+				total = 0
+				for idx, item in enumerate(rng.sample(items[department.name], rng.randint(1, 3)), start=1):
+					detail_sequence += 1
+					quantity = rng.randint(1, 4)
+					unit_price = round_amount(item.standard_cost * rng.uniform(0.8, 1.25))
+					total += quantity * unit_price
+					children.append(
+						(
+							*standard_fields(f"{SYNTHETIC_PREFIX}-EXPD-{detail_sequence:08d}"),
+							name, "Department Expense", "expense_details", idx, item.name,
+							item.expense_category, item.name, quantity, unit_price, quantity * unit_price,
+						)
+					)
+
+				parents.append(
+					(
+						*standard_fields(name),
+						random_date(rng, fiscal_year), department.name,
+						budgets.get((department.name, fiscal_year.name)), total,
+						rng.choice(EXPENSE_PAYMENT_MODES), "Paid",
+					)
+				)
+
+	frappe.db.bulk_insert("Department Expense", parent_fields, parents)
+	frappe.db.bulk_insert("Department Expense Detail", child_fields, children)
+	return len(parents)
+
+
+def update_budget_spent_amounts(budgets):
+	"""Recompute budget and budget item spent/remaining amounts from submitted expenses"""
+	if not budgets:
+		return
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabDepartment Budget Item` budget_item
+		SET spent_amount = (
+			SELECT COALESCE(SUM(detail.amount), 0)
+			FROM `tabDepartment Expense Detail` detail
+			INNER JOIN `tabDepartment Expense` expense ON expense.name = detail.parent
+			WHERE expense.budget_reference = budget_item.parent
+				AND expense.docstatus = 1
+				AND detail.item = budget_item.item
+		)
+		WHERE budget_item.parent IN %(budgets)s
+		""",
+		{"budgets": budgets},
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabDepartment Budget Item`
+		SET remaining_amount = budgeted_amount - spent_amount
+		WHERE parent IN %(budgets)s
+		""",
+		{"budgets": budgets},
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabDepartment Budget` budget
+		SET spent_amount = (
+			SELECT COALESCE(SUM(budget_item.spent_amount), 0)
+			FROM `tabDepartment Budget Item` budget_item
+			WHERE budget_item.parent = budget.name
+		)
+		WHERE budget.name IN %(budgets)s
+		""",
+		{"budgets": budgets},
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabDepartment Budget`
+		SET remaining_amount = total_budget_amount - spent_amount
+		WHERE name IN %(budgets)s
+		""",
+		{"budgets": budgets},
+	)
@@ -0,0 +1,54 @@
+# Copyright (c) 2025, Innocent P Metumba and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from stewardpro.stewardpro.utils import phone_numbers
+from stewardpro.stewardpro.utils.phone_numbers import dedupe_recipients, normalize_phone, normalize_phones
+
+
+class TestPhoneNumbers(FrappeTestCase):
+	def test_national_and_international_forms(self):
+		for value in (
+			"0712345678",
+			"0712 345 678",
+			"712345678",
+			"255712345678",
+			"+255712345678",
+			"+255 (712) 345-678",
+			"00255-712-345678",
+		):
+			self.assertEqual(normalize_phone(value, "255"), "+255712345678", value)
+
+	def test_other_country_code_is_kept(self):
+		self.assertEqual(normalize_phone("+1 415 555 2671", "255"), "+14155552671")
+		self.assertEqual(normalize_phone("0712345678", "254"), "+254712345678")
+
+	def test_invalid_numbers(self):
+		for value in (None, "", "not a number", "123", "+1234567890123456", "0712-345-67x"):
+			self.assertIsNone(normalize_phone(value, "255"), value)
+
+	def test_normalize_phones_keeps_input_order(self):
+		self.assertEqual(
+			normalize_phones(["0712345678", "bad", "0712345678", "+254722000111"], "255"),
+			["+255712345678", None, "+255712345678", "+254722000111"],
+		)
+
+	def test_dedupe_recipients(self):
+		entries = [
+			{"name": "A", "phone": "0712345678"},
+			{"name": "B", "phone": "+255 712 345 678"},
+			{"name": "C", "phone": "n/a"},
+			{"name": "D", "phone": "0754000111"},
+		]
+		with patch.object(phone_numbers, "get_default_country_code", return_value="255"):
+			unique, duplicates, invalid = dedupe_recipients(entries)
+
+		self.assertEqual(
+			unique,
+			[{"name": "A", "phone": "+255712345678"}, {"name": "D", "phone": "+255754000111"}],
+		)
+		self.assertEqual([entry["name"] for entry in duplicates], ["B"])
+		self.assertEqual([entry["name"] for entry in invalid], ["C"])